@@ -0,0 +1,262 @@
+"""Admission control: per-client token buckets and adaptive load shedding.
+
+Each request is charged to its client IP and, when present, to its
+``X-API-Key`` (widget and SDK partners) and the ``user_address`` in the
+path or JSON body. Both of the latter are chosen by the caller, so they
+only add limits and never replace the IP bucket. Behind nginx the client
+IP is the one uvicorn resolves from X-Forwarded-For (``--proxy-headers``,
+trusting only the local proxy), not the proxy's own address. Identities get a token
+bucket each; a request is admitted only if every one of its buckets has a
+token, otherwise it is answered 429 with Retry-After before any endpoint
+code runs.
+
+Independently, while event-loop lag or the number of in-flight requests is
+over its threshold, low-priority routes (market data, stats, exports) are
+answered with an immediate 503 so the capacity that is left goes to quotes
+and swaps.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from loop_lag import LoopLagMonitor
+from metrics import route_template
+from token_registry import normalize_address
+
+API_KEY = "api_key"
+ADDRESS = "address"
+IP = "ip"
+
+# Only small JSON bodies are inspected for a user_address
+MAX_PEEK_BYTES = 4096
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token buckets per (kind, identity), kept in a bounded LRU.
+
+    ``limits`` maps an identity kind to ``(rate per second, burst)``; a kind
+    with a rate of 0 or less is not limited. Evicting an idle bucket only
+    refills it early, so the LRU bound never makes the limit stricter.
+    """
+
+    STATS_COUNTERS = ("allowed", "limited")
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], max_keys: int = 100_000):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, kind: str, identity: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token; returns ``(allowed, seconds until a token is available)``."""
+        return self.acquire_all([(kind, identity)], now)
+
+    def acquire_all(self, identities: Iterable[Tuple[str, str]], now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token from each bucket, or none unless all of them have one."""
+        now = time.monotonic() if now is None else now
+        buckets = []
+        retry_after = 0.0
+        for kind, identity in identities:
+            rate, burst = self.limits.get(kind, (0, 0))
+            if rate <= 0:
+                continue
+            bucket = self._bucket((kind, identity), rate, burst, now)
+            if bucket.tokens < 1:
+                retry_after = max(retry_after, (1 - bucket.tokens) / rate)
+            buckets.append(bucket)
+
+        if retry_after:
+            self.limited += 1
+            return False, retry_after
+        for bucket in buckets:
+            bucket.tokens -= 1
+        self.allowed += 1
+        return True, 0.0
+
+    def _bucket(self, key: Tuple[str, str], rate: float, burst: float, now: float) -> TokenBucket:
+        """The bucket for ``key``, refilled up to ``now``."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limits": {kind: {"rate": rate, "burst": burst} for kind, (rate, burst) in self.limits.items()},
+            "tracked_keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class LoadShedder:
+    """Decides whether low-priority routes are turned away under overload."""
+
+    STATS_COUNTERS = ("shed",)
+
+    def __init__(self, monitor: LoopLagMonitor, low_priority: Iterable[str],
+                 max_loop_lag: float = 0.1, max_in_flight: int = 500):
+        self.monitor = monitor
+        self.low_priority = set(low_priority)
+        self.max_loop_lag = max_loop_lag
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.shed = 0
+
+    def overloaded(self) -> bool:
+        return self.monitor.current > self.max_loop_lag or self.in_flight > self.max_in_flight
+
+    def should_shed(self, route: str) -> bool:
+        if route in self.low_priority and self.overloaded():
+            self.shed += 1
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "overloaded": self.overloaded(),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "loop_lag_seconds": round(self.monitor.current, 6),
+            "max_loop_lag_seconds": self.max_loop_lag,
+            "shed": self.shed,
+            "low_priority_routes": sorted(self.low_priority),
+        }
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _peek_body(receive):
+    """Read the whole request body and return it with a receive() that replays it."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client went away; the app sees the disconnect on its next receive()
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+async def identify(scope, route: str, receive):
+    """``(identities, receive)`` for the request; ``receive`` may replay a peeked body.
+
+    ``identities`` is a list of ``(kind, identity)`` that always starts with the client IP.
+    """
+    client = scope.get("client")
+    identities: List[Tuple[str, str]] = [(IP, client[0] if client else "unknown")]
+
+    api_key = _header(scope, b"x-api-key")
+    if api_key:
+        identities.append((API_KEY, api_key))
+
+    if "{user_address}" in route:
+        segments = scope["path"].split("/")
+        index = route.split("/").index("{user_address}")
+        if index < len(segments) and segments[index]:
+            identities.append((ADDRESS, normalize_address(segments[index])))
+            return identities, receive
+
+    if scope["method"] == "POST" and (_header(scope, b"content-type") or "").startswith("application/json"):
+        length = _header(scope, b"content-length")
+        if length is not None and length.isdigit() and int(length) <= MAX_PEEK_BYTES:
+            body, receive = await _peek_body(receive)
+            try:
+                payload = orjson.loads(body)
+            except orjson.JSONDecodeError:
+                payload = None
+            if isinstance(payload, dict) and isinstance(payload.get("user_address"), str) and payload["user_address"]:
+                identities.append((ADDRESS, normalize_address(payload["user_address"])))
+
+    return identities, receive
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying ``LoadShedder`` and ``RateLimiter``.
+
+    ``untracked`` routes (long-lived streams) are not counted as in flight,
+    since they would hold the count up for their whole lifetime.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, shedder: LoadShedder,
+                 exempt: Iterable[str] = ("/metrics", "/api/health"), untracked: Iterable[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.shedder = shedder
+        self.exempt = set(exempt)
+        self.untracked = set(untracked)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        route = scope.get("route_template") or route_template(scope["app"].router.routes, scope)
+        if self.shedder.should_shed(route):
+            await _reject(send, 503, "Server busy, try again shortly", 1)
+            return
+
+        identities, receive = await identify(scope, route, receive)
+        allowed, retry_after = self.limiter.acquire_all(identities)
+        if not allowed:
+            await _reject(send, 429, "Rate limit exceeded", retry_after)
+            return
+
+        if route in self.untracked:
+            await self.app(scope, receive, send)
+            return
+        self.shedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.in_flight -= 1
@@ -0,0 +1,142 @@
+"""Pub/sub backplane that carries WebSocket publishes between uvicorn workers.
+
+``ConnectionManager.publish`` hands each message to the backplane once,
+already serialized; every worker (including the publisher) receives it and
+fans it out to its own sockets. ``InMemoryBackplane`` is for a single
+process; ``RedisBackplane`` uses Redis pub/sub so any number of workers
+share one event stream.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from response_cache import dumps
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[List[str], str], Awaitable[None]]
+
+
+def encode_envelope(topics: List[str], data: str) -> str:
+    # Topics as a JSON array on the first line (escaping keeps it one line), payload after
+    return dumps(topics).decode() + "\n" + data
+
+
+def decode_envelope(envelope: str) -> Tuple[List[str], str]:
+    header, _, data = envelope.partition("\n")
+    return orjson.loads(header), data
+
+
+class Backplane:
+    name = "base"
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, topics: List[str], data: str):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"type": self.name}
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane: publishing is local delivery."""
+
+    name = "memory"
+
+    async def publish(self, topics: List[str], data: str):
+        if self._deliver is not None:
+            await self._deliver(topics, data)
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub backplane; every worker subscribes to one channel."""
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str = "sync:ws", reconnect_delay: float = 1.0):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio as redis
+
+        await super().start(deliver)
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        self._task = asyncio.create_task(self._listen())
+
+    async def publish(self, topics: List[str], data: str):
+        try:
+            await self._redis.publish(self.channel, encode_envelope(topics, data))
+            self.published += 1
+        except Exception as e:
+            # Keep this worker's own clients served while Redis is unavailable
+            self.errors += 1
+            logger.error(f"Backplane publish error: {str(e)}")
+            await self._deliver(topics, data)
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self.received += 1
+                    topics, data = decode_envelope(message["data"])
+                    await self._deliver(topics, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Backplane subscription error: {str(e)}")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "type": self.name,
+            "channel": self.channel,
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+def create_backplane(url: Optional[str], channel: str = "sync:ws") -> Backplane:
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackplane(url, channel=channel)
+    return InMemoryBackplane()
@@ -0,0 +1,260 @@
+"""WebSocket connection manager with per-connection outbound queues.
+
+Every connection gets a bounded queue drained by its own writer task, so a
+broadcast is a non-blocking enqueue and one slow client can never stall the
+request that triggered it. Clients subscribe to topics (``user:<address>``,
+``chain:<id>``, ``prices``) and a topic index keeps a publish at
+O(subscribers). Publishes travel through a backplane so that, with several
+uvicorn workers, sockets held by every worker receive them.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from backplane import Backplane, InMemoryBackplane
+from metrics import WS_CONNECTIONS, WS_SEND_SECONDS
+from response_cache import dumps
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+# Close code for evicted slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+PRICES_TOPIC = "prices"
+# Pseudo-topic every connection receives
+BROADCAST_TOPIC = "*"
+
+
+def user_topic(address: str) -> str:
+    # EVM addresses arrive in mixed case; Solana addresses are case-sensitive
+    return f"user:{address.lower() if address.startswith('0x') else address}"
+
+
+def chain_topic(chain_id: str) -> str:
+    return f"chain:{chain_id}"
+
+
+class Connection:
+    __slots__ = ("websocket", "queue", "writer", "topics", "sent", "dropped")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+        self.sent = 0
+        self.dropped = 0
+
+
+class ConnectionManager:
+    """Tracks sockets and fans messages out through per-connection writers.
+
+    ``slow_consumer_policy`` decides what happens when a client's queue is
+    full: ``drop_oldest`` discards its oldest pending message, ``disconnect``
+    evicts the client. A send that takes longer than ``send_timeout`` always
+    evicts.
+    """
+
+    STATS_COUNTERS = (
+        "messages_sent", "messages_dropped", "evictions", "send_errors", "backplane_published",
+        "backplane_received", "backplane_errors",
+    )
+
+    def __init__(self, queue_size: int = 256, slow_consumer_policy: str = DROP_OLDEST,
+                 send_timeout: float = 5.0, max_topics: int = 64,
+                 backplane: Optional[Backplane] = None):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.max_topics = max_topics
+        self.backplane = backplane or InMemoryBackplane()
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.subscribers: Dict[str, Set[Connection]] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.evictions = 0
+        self.send_errors = 0
+
+    async def start(self):
+        await self.backplane.start(self.deliver)
+
+    async def stop(self):
+        await self.backplane.stop()
+
+    async def connect(self, websocket: WebSocket) -> Connection:
+        await websocket.accept()
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.active_connections[websocket] = connection
+        WS_CONNECTIONS.inc()
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.active_connections.pop(websocket, None)
+        if connection is None:
+            return
+        WS_CONNECTIONS.dec()
+        self._unsubscribe(connection, list(connection.topics))
+        if connection.writer is not None:
+            connection.writer.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """Add topics to a connection; returns the topics that were newly added."""
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return []
+        added = []
+        for topic in topics:
+            if topic in connection.topics:
+                continue
+            if len(connection.topics) >= self.max_topics:
+                raise ValueError(f"At most {self.max_topics} topics per connection")
+            connection.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(connection)
+            added.append(topic)
+        return added
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            self._unsubscribe(connection, topics)
+
+    def topics_for(self, websocket: WebSocket) -> List[str]:
+        connection = self.active_connections.get(websocket)
+        return sorted(connection.topics) if connection is not None else []
+
+    def _unsubscribe(self, connection: Connection, topics: Iterable[str]):
+        for topic in topics:
+            connection.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    async def publish(self, topics: Iterable[str], message: Any):
+        """Send to every connection, on any worker, subscribed to any of ``topics``.
+
+        The message is serialized once here and travels through the backplane
+        as-is.
+        """
+        if isinstance(topics, str):
+            topics = [topics]
+        await self.backplane.publish(list(topics), self.serialize(message))
+
+    async def deliver(self, topics: List[str], data: str) -> int:
+        """Fan a serialized message out to this worker's subscribers, once each.
+
+        Returns the number of local connections it was queued for.
+        """
+        if BROADCAST_TOPIC in topics:
+            targets = set(self.active_connections.values())
+        else:
+            targets: Set[Connection] = set()
+            for topic in topics:
+                subscribers = self.subscribers.get(topic)
+                if subscribers:
+                    targets |= subscribers
+        for connection in targets:
+            self._enqueue(connection, data)
+        return len(targets)
+
+    async def send_personal_message(self, message: Any, websocket: WebSocket):
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            self._enqueue(connection, self.serialize(message))
+
+    async def broadcast(self, message: Any):
+        """Send to every connection on every worker without waiting on sockets."""
+        await self.publish([BROADCAST_TOPIC], message)
+
+    @staticmethod
+    def serialize(message: Any) -> str:
+        return message if isinstance(message, str) else dumps(message).decode()
+
+    def _enqueue(self, connection: Connection, data: str):
+        try:
+            connection.queue.put_nowait(data)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.slow_consumer_policy == DISCONNECT:
+            self._evict(connection, "queue full")
+            return
+        # DROP_OLDEST: make room by discarding the stalest pending message
+        try:
+            connection.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        connection.dropped += 1
+        self.messages_dropped += 1
+        connection.queue.put_nowait(data)
+
+    async def _writer(self, connection: Connection):
+        websocket = connection.websocket
+        while True:
+            data = await connection.queue.get()
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(websocket.send_text(data), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._evict(connection, "send timeout")
+                return
+            except Exception as e:
+                self.send_errors += 1
+                logger.info(f"WebSocket send failed, dropping connection: {str(e)}")
+                self.disconnect(websocket)
+                return
+            WS_SEND_SECONDS.observe(time.perf_counter() - start)
+            connection.sent += 1
+            self.messages_sent += 1
+            if self.active_connections.get(websocket) is not connection:
+                # Disconnected mid-send: wait_for can swallow the cancel when the send completes at once
+                return
+
+    def _evict(self, connection: Connection, reason: str):
+        websocket = connection.websocket
+        if websocket not in self.active_connections:
+            return
+        self.evictions += 1
+        self.messages_dropped += connection.queue.qsize()
+        logger.warning(f"Evicting slow WebSocket consumer: {reason}")
+        self.disconnect(websocket)
+        task = asyncio.create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [c.queue.qsize() for c in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "topics": len(self.subscribers),
+            "backplane": self.backplane.stats(),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "evictions": self.evictions,
+            "send_errors": self.send_errors,
+        }
@@ -0,0 +1,231 @@
+"""Always-on latency diagnostics: GC pauses, loop stalls and slow-request samples.
+
+- ``GcPauseTracker`` times every garbage collection through ``gc.callbacks``.
+- ``StallWatchdog`` is a daemon thread that checks the ``LoopLagMonitor``
+  heartbeat. If the loop has not ticked for ``threshold`` seconds,
+  something is blocking it, so it captures the loop thread's stack.
+- ``SlowRequestMiddleware`` arms one timer per request. If the request is
+  still running when the timer fires, it captures the coroutine's stack,
+  which shows what it is awaiting. A small fraction of requests also run
+  under cProfile.
+- Slow requests land in a bounded ``SlowRequestLog``, together with the
+  stalls and GC time that overlapped them.
+
+Fast requests pay for one ``call_later`` and its cancellation.
+"""
+import asyncio
+import cProfile
+import gc
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from loop_lag import LoopLagMonitor
+from metrics import GC_PAUSE_SECONDS, SLOW_REQUESTS, UNMATCHED_ROUTE
+
+# Frames kept per captured stack and functions kept per profile
+STACK_LIMIT = 40
+PROFILE_LINES = 25
+
+
+class GcPauseTracker:
+    STATS_COUNTERS = ("collections", "pause_seconds_total")
+
+    def __init__(self):
+        self.total = 0.0  # seconds spent in GC since install()
+        self.collections = 0
+        self._started: Optional[float] = None
+
+    def _callback(self, phase: str, info: Dict[str, Any]):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            pause = time.perf_counter() - self._started
+            self._started = None
+            self.total += pause
+            self.collections += 1
+            GC_PAUSE_SECONDS.labels(str(info.get("generation", ""))).observe(pause)
+
+    def install(self):
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def uninstall(self):
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"collections": self.collections, "pause_seconds_total": round(self.total, 6)}
+
+
+class StallWatchdog:
+    """Captures the event-loop thread's stack while the loop is blocked."""
+
+    def __init__(self, monitor: LoopLagMonitor, threshold: float = 0.25, capacity: int = 50):
+        self.monitor = monitor
+        self.threshold = threshold
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        reported_tick = None
+        while not self._stop.wait(self.threshold / 2):
+            last_tick = self.monitor.last_tick
+            blocked = time.monotonic() - last_tick - self.monitor.interval
+            if blocked < self.threshold or last_tick == reported_tick:
+                continue
+            # One sample per stall: the same heartbeat is not reported twice
+            reported_tick = last_tick
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self.stalls.append({
+                "at": time.monotonic(),
+                "timestamp": datetime.utcnow().isoformat(),
+                "blocked_seconds": round(blocked, 6),
+                "stack": "".join(traceback.format_stack(frame, limit=STACK_LIMIT)),
+            })
+
+    def start(self):
+        """Call from the event-loop thread."""
+        if self._thread is None:
+            self._loop_thread = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="loop-stall-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def between(self, start: float, end: float) -> List[Dict[str, Any]]:
+        return [stall for stall in self.stalls if start <= stall["at"] <= end]
+
+
+class SlowRequestLog:
+    """The most recent slow requests, bounded; read sorted by duration."""
+
+    def __init__(self, capacity: int = 100):
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.recorded = 0
+
+    def add(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        self.recorded += 1
+
+    def slowest(self, limit: int) -> List[Dict[str, Any]]:
+        return sorted(self.entries, key=lambda e: e["duration_seconds"], reverse=True)[:limit]
+
+
+def await_stack(coro) -> str:
+    """Stack of a suspended coroutine chain, outermost first, down to what it awaits.
+
+    ``Task.get_stack()`` returns only the outermost frame of a suspended
+    coroutine, so the chain is walked through ``cr_await`` instead.
+    """
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    lines = traceback.format_list(traceback.StackSummary.extract(frames[-STACK_LIMIT:]))
+    if coro is not None:
+        lines.append(f"  awaiting {repr(coro)[:200]}\n")
+    return "".join(lines)
+
+
+def _format_profile(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware recording requests slower than ``threshold`` seconds.
+
+    ``profile_rate`` is the fraction of requests run under cProfile. At most
+    one profiler runs at a time, and it sees every coroutine on the loop
+    while enabled, so a profile describes the loop during that request.
+    ``excluded`` route templates (long-lived streams) are passed through.
+    """
+
+    def __init__(self, app, log: SlowRequestLog, watchdog: StallWatchdog, gc_tracker: GcPauseTracker,
+                 threshold: float = 0.5, profile_rate: float = 0.0, excluded: Iterable[str] = ()):
+        self.app = app
+        self.excluded = set(excluded)
+        self.log = log
+        self.watchdog = watchdog
+        self.gc_tracker = gc_tracker
+        self.threshold = threshold
+        self.profile_rate = profile_rate
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("route_template") in self.excluded:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stacks: List[str] = []
+        task = asyncio.current_task()
+        timer = asyncio.get_running_loop().call_later(self.threshold, self._sample_stack, task, stacks)
+        profiler = None
+        if self.profile_rate and not self._profiling and random.random() < self.profile_rate:
+            self._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        gc_before = self.gc_tracker.total
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.monotonic()
+            timer.cancel()
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            duration = end - start
+            if duration >= self.threshold:
+                self._record(scope, status, start, end, stacks, profiler, self.gc_tracker.total - gc_before)
+
+    @staticmethod
+    def _sample_stack(task: Optional[asyncio.Task], stacks: List[str]):
+        if task is not None and not task.done():
+            stacks.append(await_stack(task.get_coro()))
+
+    def _record(self, scope, status: int, start: float, end: float, stacks: List[str],
+                profiler: Optional[cProfile.Profile], gc_seconds: float):
+        route = scope.get("route_template", UNMATCHED_ROUTE)
+        SLOW_REQUESTS.labels(route).inc()
+        self.log.add({
+            "timestamp": datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_seconds": round(end - start, 6),
+            "gc_seconds": round(gc_seconds, 6),
+            "await_stacks": stacks,
+            "loop_stalls": self.watchdog.between(start, end),
+            "profile": _format_profile(profiler) if profiler is not None else None,
+        })
@@ -0,0 +1,208 @@
+"""``Idempotency-Key`` support: run a request's work once per key and replay its response.
+
+Each key owns one document in the ``idempotency_keys`` collection, under a
+unique index, so across every process only the request that inserts it
+does the work. The document is ``in_progress`` while that request runs
+and then holds the response. In front of Mongo:
+- a bounded LRU answers replays of recent keys without a round trip;
+- a ``SingleFlight`` parks concurrent duplicates within this process on
+  the first request.
+Duplicates that arrive at another process poll the document until it is
+done. A request that fails releases its key so the client can retry it.
+One that succeeded never does: if its response cannot be stored, the key
+stays locked (the response is served from the LRU here) while the write
+is retried in the background. A key reused with a different request body
+is rejected.
+"""
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import orjson
+from pymongo.errors import DuplicateKeyError
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+class IdempotencyError(Exception):
+    """Base class; ``status_code`` is the HTTP status to answer with."""
+
+    status_code = 400
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    status_code = 422
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """The first request for this key is still running elsewhere; retry later."""
+
+    status_code = 409
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class IdempotencyStore:
+    STATS_COUNTERS = (
+        "requests", "executions", "replays", "lru_hits", "conflicts", "timeouts", "store_errors",
+    )
+
+    def __init__(self, collection_getter: Callable[[], Any], max_size: int = 10000, ttl: float = 86400.0,
+                 lock_timeout: float = 30.0, wait_timeout: float = 10.0, poll_interval: float = 0.05):
+        """Keys are kept for ``ttl`` seconds; an ``in_progress`` lock older than ``lock_timeout`` is taken over.
+
+        A duplicate waits up to ``wait_timeout`` seconds for a first request
+        running in another process before giving up with a 409.
+        """
+        self.collection_getter = collection_getter
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock_timeout = timedelta(seconds=lock_timeout)
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.flights = SingleFlight()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.requests = 0
+        self.executions = 0
+        self.lru_hits = 0
+        self.conflicts = 0
+        self.timeouts = 0
+        self.store_errors = 0
+        self._store_tasks: Set[asyncio.Task] = set()
+
+    async def ensure_indexes(self):
+        collection = self.collection_getter()
+        await collection.create_index("key", unique=True, name="idempotency_key")
+        await collection.create_index("created_at", expireAfterSeconds=int(self.ttl), name="idempotency_ttl")
+
+    async def run(self, key: str, request_fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Response of ``fn()``, computed at most once for ``key``."""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        self.requests += 1
+        record = self._get(key)
+        if record is not None:
+            self.lru_hits += 1
+        else:
+            record = await self.flights.do(key, lambda: self._resolve(key, request_fingerprint, fn))
+        if record["fingerprint"] != request_fingerprint:
+            self.conflicts += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+        return record["response"]
+
+    async def _resolve(self, key: str, request_fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        collection = self.collection_getter()
+        deadline = datetime.utcnow() + timedelta(seconds=self.wait_timeout)
+        while True:
+            now = datetime.utcnow()
+            try:
+                await collection.insert_one(
+                    {"key": key, "fingerprint": request_fingerprint, "state": IN_PROGRESS, "created_at": now}
+                )
+            except DuplicateKeyError:
+                pass
+            else:
+                return await self._execute(key, request_fingerprint, fn)
+            existing = await collection.find_one({"key": key})
+            if existing is None:
+                continue  # released by a failed first attempt; claim it
+            if existing["state"] == DONE:
+                return self._put(key, existing)
+            if existing["fingerprint"] != request_fingerprint:
+                return existing  # rejected by the caller; no need to wait
+            if existing["created_at"] <= now - self.lock_timeout:
+                # Abandoned by a process that died mid-request
+                taken = await collection.update_one(
+                    {"_id": existing["_id"], "state": IN_PROGRESS, "created_at": existing["created_at"]},
+                    {"$set": {"created_at": now}},
+                )
+                if taken.modified_count:
+                    return await self._execute(key, request_fingerprint, fn)
+                continue
+            if now >= deadline:
+                self.timeouts += 1
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _execute(self, key: str, request_fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        collection = self.collection_getter()
+        self.executions += 1
+        try:
+            response = await fn()
+        except BaseException:
+            await collection.delete_one({"key": key, "state": IN_PROGRESS})
+            raise
+        record = self._put(key, {"fingerprint": request_fingerprint, "response": response})
+        try:
+            await self._store(key, request_fingerprint, response, attempts=3)
+        except Exception as e:
+            # The work is done: keep the lock until the response is stored, never hand the key to a retry
+            logger.error(f"Idempotency response for {key} not stored, retrying in the background: {str(e)}")
+            task = asyncio.create_task(self._store(key, request_fingerprint, response))
+            self._store_tasks.add(task)
+            task.add_done_callback(self._store_tasks.discard)
+        return record
+
+    async def _store(self, key: str, request_fingerprint: str, response: Any, attempts: Optional[int] = None):
+        """Mark ``key`` done with its response; ``attempts=None`` retries until it succeeds."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.collection_getter().update_one(
+                    {"key": key},
+                    {
+                        "$set": {"state": DONE, "fingerprint": request_fingerprint, "response": response},
+                        # Recreated if the lock was expired by the TTL index meanwhile
+                        "$setOnInsert": {"created_at": datetime.utcnow()},
+                    },
+                    upsert=True,
+                )
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.store_errors += 1
+                if attempts is not None and attempt >= attempts:
+                    raise
+            await asyncio.sleep(min(self.poll_interval * 2 ** attempt, self.lock_timeout.total_seconds() / 4))
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        record = self._entries.get(key)
+        if record is not None:
+            self._entries.move_to_end(key)
+        return record
+
+    def _put(self, key: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        record = {"fingerprint": record["fingerprint"], "response": record["response"]}
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "requests": self.requests,
+            "executions": self.executions,
+            "replays": self.requests - self.executions - self.conflicts - self.timeouts,
+            "lru_hits": self.lru_hits,
+            "conflicts": self.conflicts,
+            "timeouts": self.timeouts,
+            "store_errors": self.store_errors,
+            "pending_stores": len(self._store_tasks),
+            "in_flight": self.flights.stats()["in_flight"],
+        }
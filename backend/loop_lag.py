@@ -0,0 +1,69 @@
+"""Event-loop lag sampler.
+
+A background task sleeps for a fixed interval and measures how late it
+wakes up. Anything that blocks the loop (sync I/O, heavy CPU, long GC
+pauses) shows up as lag, whichever coroutine caused it. Costs one timer
+wake-up per interval.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from metrics import LOOP_LAG_SECONDS
+
+
+class LoopLagMonitor:
+    STATS_COUNTERS = ("samples",)
+
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.2):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0  # most recent sample, seconds
+        self.ewma = 0.0
+        self.max_lag = 0.0
+        self.samples = 0
+        self.last_tick = time.monotonic()  # read by the stall watchdog thread
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> float:
+        """Lag to act on: the worse of the latest sample and the smoothed value."""
+        return max(self.lag, self.ewma)
+
+    def record(self, lag: float):
+        self.lag = lag
+        self.ewma += self.smoothing * (lag - self.ewma)
+        self.max_lag = max(self.max_lag, lag)
+        self.samples += 1
+        self.last_tick = time.monotonic()
+        LOOP_LAG_SECONDS.observe(lag)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def start(self):
+        if self._task is None:
+            self.last_tick = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "lag_seconds": round(self.lag, 6),
+            "ewma_seconds": round(self.ewma, 6),
+            "max_lag_seconds": round(self.max_lag, 6),
+            "samples": self.samples,
+        }
@@ -0,0 +1,208 @@
+"""Incrementally maintained market-data aggregates.
+
+Price snapshots and swaps are applied as events as they happen. Reads
+never scan the token set.
+- Per-token volume feeds a running 24h total.
+- Per-token 24h change and volume feed two top-k rankings.
+- Swaps feed windowed running sums of swap volume and cross-chain volume.
+
+Each token update costs O(log n) heap work. Each swap costs O(1) amortized.
+"""
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+from price_oracle import PriceSnapshot
+
+# Running totals are re-summed exactly this often to shed float drift
+RESUM_INTERVAL = 10_000
+
+
+class TopK:
+    """Top ``k`` keys by score under arbitrary score updates.
+
+    Scores live in a dict; a max-heap holds ``(-score, seq, key)`` entries
+    and stale ones are skipped lazily. ``top()`` is cached and only
+    recomputed, in O(k log n), after an update that could change it.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.scores: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._top: Optional[List[Tuple[Hashable, float]]] = []
+        self._top_keys: set = set()
+
+    def update(self, key: Hashable, score: float):
+        if self.scores.get(key) == score:
+            return
+        self.scores[key] = score
+        heapq.heappush(self._heap, (-score, next(self._seq), key))
+        if self._top is not None and (
+            key in self._top_keys or len(self._top) < self.k or score > self._top[-1][1]
+        ):
+            self._top = None
+        if len(self._heap) > 2 * len(self.scores) + 64:
+            self._compact()
+
+    def remove(self, key: Hashable):
+        if self.scores.pop(key, None) is not None and key in self._top_keys:
+            self._top = None
+
+    def top(self) -> List[Tuple[Hashable, float]]:
+        if self._top is None:
+            top, popped, seen = [], [], set()
+            while self._heap and len(top) < self.k:
+                entry = heapq.heappop(self._heap)
+                neg_score, _, key = entry
+                if self.scores.get(key) != -neg_score or key in seen:
+                    continue  # stale or duplicate entry; dropped for good
+                seen.add(key)
+                top.append((key, -neg_score))
+                popped.append(entry)
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+            self._top = top
+            self._top_keys = seen
+        return self._top
+
+    def _compact(self):
+        self._heap = [(-score, next(self._seq), key) for key, score in self.scores.items()]
+        heapq.heapify(self._heap)
+
+
+class WindowedSum:
+    """Sum of values added within the last ``window`` seconds, kept in per-``bucket`` slots."""
+
+    def __init__(self, window: float = 86400, bucket: float = 60):
+        self.window = window
+        self.bucket = bucket
+        self.total = 0.0
+        self.count = 0
+        self._buckets: Deque[List[float]] = deque()  # [bucket_start, sum, count]
+
+    def add(self, value: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        start = now - now % self.bucket
+        if self._buckets and self._buckets[-1][0] == start:
+            self._buckets[-1][1] += value
+            self._buckets[-1][2] += 1
+        else:
+            self._buckets.append([start, value, 1])
+        self.total += value
+        self.count += 1
+
+    def value(self, now: Optional[float] = None) -> float:
+        self._expire(time.time() if now is None else now)
+        return self.total
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        expired = False
+        while self._buckets and self._buckets[0][0] + self.bucket <= cutoff:
+            _, value, count = self._buckets.popleft()
+            self.total -= value
+            self.count -= count
+            expired = True
+        if expired:
+            self.total = math.fsum(b[1] for b in self._buckets) if self._buckets else 0.0
+
+
+class MarketData:
+    """Market aggregates fed by price snapshots and swap events; reads are O(k)."""
+
+    def __init__(self, k: int = 5, window: float = 86400):
+        self.k = k
+        self.version = 0
+        self.by_change = TopK(k)
+        self.by_volume = TopK(k)
+        self.swap_volume = WindowedSum(window)
+        self.cross_chain_volume = WindowedSum(window)
+        self.total_volume_24h = 0.0
+        self._entries: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._tokens_per_chain: Dict[str, int] = {}
+        self._updates = 0
+
+    def apply_snapshot(self, old: PriceSnapshot, new: PriceSnapshot):
+        """Price oracle listener: applies the entries that changed between snapshots."""
+        for chain_id, symbols in new.prices.items():
+            old_symbols = old.prices.get(chain_id, {})
+            for symbol, entry in symbols.items():
+                if old_symbols.get(symbol) != entry or (chain_id, symbol) not in self._entries:
+                    self.update_token(chain_id, symbol, entry)
+        for chain_id, symbols in old.prices.items():
+            for symbol in symbols:
+                if symbol not in new.prices.get(chain_id, {}):
+                    self.remove_token(chain_id, symbol)
+
+    def load(self, snapshot: PriceSnapshot):
+        for chain_id, symbols in snapshot.prices.items():
+            for symbol, entry in symbols.items():
+                self.update_token(chain_id, symbol, entry)
+
+    def update_token(self, chain_id: str, symbol: str, entry: Dict[str, float]):
+        key = (chain_id, symbol)
+        previous = self._entries.get(key)
+        if previous is None:
+            self._tokens_per_chain[chain_id] = self._tokens_per_chain.get(chain_id, 0) + 1
+        entry = dict(entry)
+        self._entries[key] = entry
+        self.total_volume_24h += entry.get("volume_24h", 0.0) - (previous or {}).get("volume_24h", 0.0)
+        self.by_change.update(key, entry.get("change_24h", 0.0))
+        self.by_volume.update(key, entry.get("volume_24h", 0.0))
+        self._touch()
+
+    def remove_token(self, chain_id: str, symbol: str):
+        key = (chain_id, symbol)
+        previous = self._entries.pop(key, None)
+        if previous is None:
+            return
+        self._tokens_per_chain[chain_id] -= 1
+        if not self._tokens_per_chain[chain_id]:
+            del self._tokens_per_chain[chain_id]
+        self.total_volume_24h -= previous.get("volume_24h", 0.0)
+        self.by_change.remove(key)
+        self.by_volume.remove(key)
+        self._touch()
+
+    def record_swap(self, from_chain: str, to_chain: str, usd_value: float, now: Optional[float] = None):
+        self.swap_volume.add(usd_value, now)
+        if from_chain != to_chain:
+            self.cross_chain_volume.add(usd_value, now)
+        self.version += 1
+
+    def _touch(self):
+        self.version += 1
+        self._updates += 1
+        if self._updates % RESUM_INTERVAL == 0:
+            self.total_volume_24h = math.fsum(e.get("volume_24h", 0.0) for e in self._entries.values())
+
+    def _ranked(self, topk: TopK) -> List[Dict[str, Any]]:
+        ranked = []
+        for chain_id, symbol in (key for key, _ in topk.top()):
+            entry = self._entries[(chain_id, symbol)]
+            ranked.append({
+                "symbol": symbol,
+                "chain": chain_id,
+                "price": entry.get("price"),
+                "change_24h": entry.get("change_24h"),
+                "volume_24h": entry.get("volume_24h"),
+            })
+        return ranked
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_volume_24h": round(self.total_volume_24h, 2),
+            "swap_volume_24h": round(self.swap_volume.value(), 2),
+            "cross_chain_volume_24h": round(self.cross_chain_volume.value(), 2),
+            "swaps_24h": self.swap_volume.count,
+            "active_chains": len(self._tokens_per_chain),
+            "tracked_tokens": len(self._entries),
+            "trending_tokens": self._ranked(self.by_change),
+            "top_volume_tokens": self._ranked(self.by_volume),
+        }
@@ -0,0 +1,224 @@
+"""Prometheus metrics: HTTP routes, Mongo commands, WebSocket fan-out, quotes and caches.
+
+HTTP requests are labelled by route template (``/api/transactions/{user_address}``),
+never by raw path, so label cardinality is bounded by the number of routes.
+Internal counters that already live in ``stats()`` dicts (quote cache,
+response cache, write batcher, WebSocket queues) are read at scrape time by
+``StatsCollector`` instead of being double-counted on the hot path; it
+exposes them as counters, histograms or gauges according to their kind.
+"""
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi.responses import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Request latencies span sub-millisecond cache hits to multi-second RPC fan-outs
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "sync_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "sync_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "sync_mongo_command_duration_seconds",
+    "MongoDB command latency as seen by the driver",
+    ["command", "collection"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "sync_mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["command", "collection"],
+)
+WS_CONNECTIONS = Gauge(
+    "sync_websocket_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+WS_SEND_SECONDS = Histogram(
+    "sync_websocket_send_duration_seconds",
+    "Time to write one message to a WebSocket",
+    buckets=LATENCY_BUCKETS,
+)
+QUOTE_STAGE_SECONDS = Histogram(
+    "sync_quote_stage_duration_seconds",
+    "Quote engine time per stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+LOOP_LAG_SECONDS = Histogram(
+    "sync_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task",
+    buckets=LATENCY_BUCKETS,
+)
+GC_PAUSE_SECONDS = Histogram(
+    "sync_gc_pause_seconds",
+    "Garbage collector pause per collection",
+    ["generation"],
+    buckets=LATENCY_BUCKETS,
+)
+SLOW_REQUESTS = Counter(
+    "sync_slow_requests_total",
+    "Requests slower than the slow-request threshold",
+    ["route"],
+)
+
+
+def route_template(routes: Iterable[Any], scope: Dict[str, Any]) -> str:
+    """Path template of the first route matching ``scope``, as the router would pick it."""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            # Path matched but the method did not; the router answers 405 from it
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording latency and in-flight requests per route template."""
+
+    def __init__(self, app, excluded: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.excluded = excluded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"].router.routes, scope)
+        # Shared with inner middleware so the routes are matched once per request
+        scope["route_template"] = route
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener; pass to ``AsyncIOMotorClient(event_listeners=[...])``."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, Any], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[(event.request_id, event.connection_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+class StatsCollector:
+    """Exposes the numeric fields of ``stats()`` dicts at scrape time.
+
+    ``sources`` maps a name to a bound ``stats`` method returning a (possibly
+    nested) dict; ``{"quote_cache": quote_cache.stats}`` yields
+    ``sync_quote_cache_hits_total`` etc. Each source's class lists the keys
+    that only ever grow in ``STATS_COUNTERS`` (nested keys joined with ``_``,
+    as in the metric name); those become counters, histogram snapshots
+    (``count``, ``sum`` and cumulative ``buckets``, see
+    ``write_batcher.Histogram``) become histograms and the remaining numbers
+    become gauges.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, Any]]], prefix: str = "sync"):
+        self.sources = sources
+        self.prefix = prefix
+
+    def describe(self):
+        # Metric names depend on the stats dicts; skip the registry's eager collect
+        return []
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            counters = getattr(getattr(stats, "__self__", None), "STATS_COUNTERS", ())
+            for key, value in self._flatten(stats()):
+                name = f"{self.prefix}_{source}_{key}"
+                documentation = f"{source} {key.replace('_', ' ')}"
+                if isinstance(value, dict):
+                    yield HistogramMetricFamily(
+                        name, documentation, buckets=list(value["buckets"].items()), sum_value=value["sum"]
+                    )
+                elif key in counters:
+                    yield CounterMetricFamily(name, documentation, value=value)
+                else:
+                    yield GaugeMetricFamily(name, documentation, value=value)
+
+    def _flatten(self, stats: Dict[str, Any], prefix: str = ""):
+        for key, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, dict):
+                if isinstance(value.get("buckets"), dict) and "sum" in value:
+                    yield f"{prefix}{key}", value
+                else:
+                    yield from self._flatten(value, f"{prefix}{key}_")
+            elif isinstance(value, (int, float)):
+                yield f"{prefix}{key}", value
+
+
+def register_stats(sources: Dict[str, Callable[[], Dict[str, Any]]]) -> Optional[StatsCollector]:
+    # Per-process stats can't be merged across workers in multiprocess mode
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        return None
+    collector = StatsCollector(sources)
+    REGISTRY.register(collector)
+    return collector
+
+
+def metrics_response() -> Response:
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,220 @@
+"""Platform statistics kept as in-memory counters over the transactions collection.
+
+Every swap updates the counters as it is submitted and as it finishes,
+so ``summary()`` is O(1) and never touches Mongo. Unique users are
+estimated with a HyperLogLog. A periodic aggregation reconciles the
+counters with the collection. This picks up swaps handled by other
+processes and corrects drift. The aggregation counts events up to a
+watermark taken when it starts: submissions by ``created_at``,
+completions and failures by ``completed_at``. Only events this process
+records after the watermark are carried over on top of its result, so an
+event is never counted by both. The HyperLogLog is fed incrementally, from
+transactions created since the previous reconcile.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from swap_pipeline import COMPLETED, FAILED
+
+logger = logging.getLogger(__name__)
+
+# Incremental unique-user scans; HLL adds are idempotent, so re-reading this much
+# before the previous watermark (late inserts, clock skew between processes) is free
+USERS_OVERLAP = timedelta(minutes=5)
+
+STATS_INDEX = [("created_at", 1)]
+
+
+def to_millis(value: datetime) -> datetime:
+    """``value`` at Mongo's millisecond precision, so local and stored times compare alike."""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def status_totals_pipeline(watermark: datetime) -> List[Dict[str, Any]]:
+    """Per status as of ``watermark``: count, USD volume and summed execution time (ms).
+
+    Transactions finished after the watermark are grouped as still ``active``.
+    """
+    return [
+        {"$match": {"created_at": {"$lte": watermark}}},
+        {"$group": {
+            # A missing completed_at compares below any date
+            "_id": {"$cond": [{"$lte": ["$completed_at", watermark]}, "$status", "active"]},
+            "count": {"$sum": 1},
+            "volume": {"$sum": {"$ifNull": ["$usd_value", 0]}},
+            "execution_ms": {"$sum": {"$subtract": ["$completed_at", "$created_at"]}},
+        }},
+    ]
+
+
+def unique_users_pipeline(since: Optional[datetime], until: datetime) -> List[Dict[str, Any]]:
+    created_at: Dict[str, Any] = {"$lte": until}
+    if since is not None:
+        created_at["$gt"] = since - USERS_OVERLAP
+    return [{"$match": {"created_at": created_at}}, {"$group": {"_id": "$user_address"}}]
+
+
+class HyperLogLog:
+    """Cardinality estimate in ``2 ** precision`` one-byte registers (~0.8% error at 14).
+
+    The harmonic sum of the registers is kept exactly, as an integer scaled
+    by ``2 ** 64``, and updated per register change, so ``count()`` is O(1).
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._zeros = self.m
+        self._scaled_sum = self.m << 64  # sum of 2 ** -register, times 2 ** 64
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value: str) -> bool:
+        """Returns True if the estimate may have changed."""
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        return self._set(index, rank)
+
+    def _set(self, index: int, rank: int) -> bool:
+        old = self.registers[index]
+        if rank <= old:
+            return False
+        self.registers[index] = rank
+        self._scaled_sum += (1 << (64 - rank)) - (1 << (64 - old))
+        if not old:
+            self._zeros -= 1
+        return True
+
+    def merge(self, other: "HyperLogLog"):
+        for index, rank in enumerate(other.registers):
+            if rank:
+                self._set(index, rank)
+
+    def count(self) -> int:
+        estimate = self._alpha * self.m * self.m * (1 << 64) / self._scaled_sum
+        if estimate <= 2.5 * self.m and self._zeros:
+            # Small-range correction: linear counting
+            return round(self.m * math.log(self.m / self._zeros))
+        return round(estimate)
+
+
+class PlatformStats:
+    STATS_COUNTERS = ("reconciles",)
+
+    def __init__(self, collection_getter: Callable[[], Any], reconcile_interval: float = 300.0, precision: int = 14):
+        self.collection_getter = collection_getter
+        self.reconcile_interval = reconcile_interval
+        self.precision = precision
+        self.users = HyperLogLog(precision)
+        self.version = 0
+        self.reconciles = 0
+        self.reconciled_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._totals: Dict[str, float] = dict.fromkeys(
+            ("submitted", "completed", "failed", "volume", "execution_ms"), 0.0
+        )
+        # Set while a reconcile runs: events after the watermark, to carry over its result
+        self._watermark: Optional[datetime] = None
+        self._carried: Dict[str, float] = {}
+        self._users_scanned_to: Optional[datetime] = None
+
+    async def ensure_indexes(self):
+        await self.collection_getter().create_index(STATS_INDEX, name="created_at")
+
+    def record_submitted(self, user_address: str, created_at: Optional[datetime] = None):
+        self._add({"submitted": 1}, created_at or datetime.utcnow())
+        self.users.add(user_address)
+        self.version += 1
+
+    def record_finished(self, tx: Dict[str, Any]):
+        """Swap pipeline listener body for a transaction that reached a terminal state."""
+        if tx["status"] == COMPLETED:
+            self._add({
+                "completed": 1,
+                "volume": tx.get("usd_value") or 0.0,
+                "execution_ms": (tx["completed_at"] - tx["created_at"]).total_seconds() * 1000,
+            }, tx["completed_at"])
+        elif tx["status"] == FAILED:
+            self._add({"failed": 1}, tx["completed_at"])
+        self.version += 1
+
+    def _add(self, deltas: Dict[str, float], at: datetime):
+        for name, delta in deltas.items():
+            self._totals[name] += delta
+            if self._watermark is not None and to_millis(at) > self._watermark:
+                self._carried[name] += delta
+
+    def summary(self) -> Dict[str, Any]:
+        totals = self._totals
+        completed, failed = totals["completed"], totals["failed"]
+        finished = completed + failed
+        return {
+            "transaction_volume": round(totals["volume"], 2),
+            "total_transactions": int(totals["submitted"]),
+            "completed_transactions": int(completed),
+            "failed_transactions": int(failed),
+            "success_rate": round(100 * completed / finished, 2) if finished else None,
+            "unique_users": self.users.count(),
+            "average_execution_time": round(totals["execution_ms"] / completed / 1000, 2) if completed else None,
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+        }
+
+    async def reconcile(self):
+        """Replace the counters with totals aggregated from the collection."""
+        collection = self.collection_getter()
+        watermark = to_millis(datetime.utcnow())
+        self._watermark = watermark
+        self._carried = dict.fromkeys(self._totals, 0.0)
+        try:
+            totals = dict.fromkeys(self._totals, 0.0)
+            async for row in collection.aggregate(status_totals_pipeline(watermark), allowDiskUse=True):
+                totals["submitted"] += row["count"]
+                if row["_id"] == COMPLETED:
+                    totals["completed"] = row["count"]
+                    totals["volume"] = row["volume"] or 0.0
+                    totals["execution_ms"] = row["execution_ms"] or 0.0
+                elif row["_id"] == FAILED:
+                    totals["failed"] = row["count"]
+            pipeline = unique_users_pipeline(self._users_scanned_to, watermark)
+            async for row in collection.aggregate(pipeline, allowDiskUse=True):
+                if row["_id"] is not None:
+                    self.users.add(row["_id"])
+            self._users_scanned_to = watermark
+            self._totals = {name: totals[name] + self._carried[name] for name in totals}
+        finally:
+            self._watermark = None
+        self.reconciles += 1
+        self.reconciled_at = datetime.utcnow()
+        self.version += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Platform stats reconcile error: {str(e)}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"reconciles": self.reconciles, "version": self.version}
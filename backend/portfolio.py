@@ -0,0 +1,186 @@
+"""Multi-chain portfolio aggregator.
+
+Every chain is queried concurrently over the shared pooled HTTP client. On
+EVM chains the native balance and every ERC-20 ``balanceOf`` go out as
+JSON-RPC batches of at most ``max_batch_calls`` calls, sent concurrently,
+since public nodes reject oversized batches; on Solana the SOL balance and the SPL token accounts are
+one batch as well. Each chain has its own deadline, so a slow RPC yields a
+partial portfolio instead of a slow response. Balances are valued from
+cached prices; no price is fetched on this path.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from singleflight import SingleFlight
+from token_registry import TokenRecord, TokenRegistry, normalize_address
+
+logger = logging.getLogger(__name__)
+
+ERC20_BALANCE_OF = "0x70a08231"
+EVM_NATIVE_ADDRESSES = {
+    "0x0000000000000000000000000000000000000000",
+    "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee",
+}
+SOLANA_CHAINS = {"solana"}
+SOLANA_NATIVE_MINT = "So11111111111111111111111111111111111111112"
+SPL_TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+PriceLookup = Callable[[str, str], Optional[float]]
+Holding = Tuple[TokenRecord, int]  # token, raw balance in base units
+
+
+class RPCError(Exception):
+    pass
+
+
+def format_units(raw: int, decimals: int) -> str:
+    return format(Decimal(raw).scaleb(-decimals).normalize(), "f")
+
+
+def is_evm_address(address: str) -> bool:
+    return address.startswith("0x") and len(address) == 42
+
+
+class PortfolioAggregator:
+    def __init__(self, chains: Dict[str, Any], registry: TokenRegistry, price_lookup: PriceLookup,
+                 rpc_urls: Optional[Dict[str, str]] = None, deadline: float = 2.0, max_batch_calls: int = 100):
+        """``chains`` maps chain id to a Chain (``rpc_url``, ``currency_symbol``);
+        ``rpc_urls`` overrides the RPC endpoint per chain."""
+        self.chains = chains
+        self.registry = registry
+        self.price_lookup = price_lookup
+        self.rpc_urls = {chain_id: chain.rpc_url for chain_id, chain in chains.items()}
+        self.rpc_urls.update(rpc_urls or {})
+        self.deadline = deadline
+        self.max_batch_calls = max_batch_calls
+        self.client: Optional[httpx.AsyncClient] = None
+        self.lookups = SingleFlight()
+
+    async def get_portfolio(self, address: str) -> Dict[str, Any]:
+        """Concurrent lookups of the same address share one set of RPC calls."""
+        portfolio = await self.lookups.do(normalize_address(address), lambda: self._get_portfolio(address))
+        return {**portfolio, "user_address": address}
+
+    async def _get_portfolio(self, address: str) -> Dict[str, Any]:
+        evm = is_evm_address(address)
+        chain_ids = [c for c in self.chains if (c in SOLANA_CHAINS) != evm]
+        tasks = {
+            asyncio.create_task(self._fetch_chain(chain_id, address)): chain_id
+            for chain_id in chain_ids
+        }
+        errors: Dict[str, str] = {}
+        chains: Dict[str, Dict[str, Any]] = {}
+
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+                errors[tasks[task]] = "timeout"
+            for task in done:
+                chain_id = tasks[task]
+                try:
+                    holdings = task.result()
+                except Exception as e:
+                    logger.info(f"Portfolio RPC error on {chain_id}: {str(e)}")
+                    errors[chain_id] = str(e) or type(e).__name__
+                    continue
+                chain_value = self._value_holdings(chain_id, holdings)
+                if chain_value["tokens"]:
+                    chains[chain_id] = chain_value
+
+        return {
+            "user_address": address,
+            "chains": chains,
+            "total_usd": round(sum(c["total_usd"] for c in chains.values()), 2),
+            "last_updated": datetime.utcnow(),
+            "partial": bool(errors),
+            "errors": errors,
+        }
+
+    def _value_holdings(self, chain_id: str, holdings: List[Holding]) -> Dict[str, Any]:
+        tokens = []
+        total = 0.0
+        for token, raw in holdings:
+            if raw <= 0:
+                continue
+            balance = format_units(raw, token.decimals)
+            price = self.price_lookup(chain_id, token.symbol)
+            usd_value = round(float(balance) * price, 2) if price is not None else None
+            tokens.append({"symbol": token.symbol, "balance": balance, "usd_value": usd_value})
+            total += usd_value or 0.0
+        return {"tokens": tokens, "total_usd": round(total, 2)}
+
+    def _native_token(self, chain_id: str, native_addresses) -> TokenRecord:
+        for token in self.registry.tokens_for_chain(chain_id):
+            if token.address.lower() in native_addresses or token.address == SOLANA_NATIVE_MINT:
+                return token
+        symbol = self.chains[chain_id].currency_symbol
+        return TokenRecord(symbol=symbol, name=symbol, address="native",
+                           decimals=9 if chain_id in SOLANA_CHAINS else 18, chain_id=chain_id)
+
+    async def _rpc_batch(self, chain_id: str, calls: List[Dict[str, Any]], first_id: int = 0) -> Dict[int, Any]:
+        payload = [{"jsonrpc": "2.0", "id": first_id + i, **call} for i, call in enumerate(calls)]
+        response = await self.client.post(self.rpc_urls[chain_id], json=payload)
+        response.raise_for_status()
+        replies = response.json()
+        if isinstance(replies, dict):
+            # Some nodes answer a whole batch with a single error object
+            raise RPCError(replies.get("error", {}).get("message", "invalid batch response"))
+        return {r["id"]: r.get("result") for r in replies if "error" not in r}
+
+    async def _fetch_chain(self, chain_id: str, address: str) -> List[Holding]:
+        if chain_id in SOLANA_CHAINS:
+            return await self._fetch_solana(chain_id, address)
+        return await self._fetch_evm(chain_id, address)
+
+    async def _fetch_evm(self, chain_id: str, address: str) -> List[Holding]:
+        native = self._native_token(chain_id, EVM_NATIVE_ADDRESSES)
+        erc20 = [t for t in self.registry.tokens_for_chain(chain_id) if t.address.lower() not in EVM_NATIVE_ADDRESSES]
+        owner = address[2:].lower().rjust(64, "0")
+        calls = [{"method": "eth_getBalance", "params": [address, "latest"]}]
+        calls += [
+            {"method": "eth_call", "params": [{"to": t.address, "data": ERC20_BALANCE_OF + owner}, "latest"]}
+            for t in erc20
+        ]
+        size = self.max_batch_calls
+        results: Dict[int, Any] = {}
+        for chunk in await asyncio.gather(*[
+            self._rpc_batch(chain_id, calls[start:start + size], first_id=start)
+            for start in range(0, len(calls), size)
+        ]):
+            results.update(chunk)
+
+        holdings = []
+        for i, token in enumerate([native] + erc20):
+            result = results.get(i)
+            if result and result != "0x":
+                holdings.append((token, int(result, 16)))
+        return holdings
+
+    async def _fetch_solana(self, chain_id: str, address: str) -> List[Holding]:
+        native = self._native_token(chain_id, ())
+        results = await self._rpc_batch(chain_id, [
+            {"method": "getBalance", "params": [address]},
+            {"method": "getTokenAccountsByOwner",
+             "params": [address, {"programId": SPL_TOKEN_PROGRAM}, {"encoding": "jsonParsed"}]},
+        ])
+
+        holdings = []
+        balance = results.get(0)
+        if balance:
+            holdings.append((native, int(balance["value"])))
+
+        by_mint: Dict[str, int] = {}
+        for account in (results.get(1) or {}).get("value", []):
+            info = account["account"]["data"]["parsed"]["info"]
+            by_mint[info["mint"]] = by_mint.get(info["mint"], 0) + int(info["tokenAmount"]["amount"])
+        for mint, raw in by_mint.items():
+            token = self.registry.get_by_address(chain_id, mint)
+            if token is not None and token is not native:
+                holdings.append((token, raw))
+        return holdings
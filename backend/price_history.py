@@ -0,0 +1,292 @@
+"""Bounded in-memory OHLCV history per (chain, symbol), with on-disk snapshots.
+
+Each interval (1m, 1h, 1d) keeps one NumPy array of shape
+``(series, capacity, 6)`` used as a ring buffer per series; the six columns
+are time, open, high, low, close and volume. A price tick folds into the
+open minute candle and the hour and day candles containing it, so the
+coarser intervals are rolled up as ticks arrive rather than rebuilt on
+read. Memory is bounded by ``max_series`` times the per-interval
+capacities, whatever the uptime.
+
+``save()`` writes the arrays as memory-mapped ``.npy`` files (periodically
+once ``start()`` is called); ``load()`` maps them back with ``mmap_mode``
+so a restarted process serves history immediately. Candle volume is the
+USD volume of swaps through this service, fed by ``record_volume``.
+"""
+import asyncio
+import calendar
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIME, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+# interval name -> (seconds per candle, default capacity)
+INTERVALS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 1440),      # one day of minutes
+    "1h": (3600, 720),     # thirty days of hours
+    "1d": (86400, 730),    # two years of days
+}
+
+
+def epoch_seconds(value: datetime) -> float:
+    """Unix time of a naive UTC datetime such as a price snapshot's timestamp.
+
+    ``datetime.timestamp()`` would read it as local time and shift price
+    candles by the host's UTC offset from the ``time.time()`` swap volumes.
+    """
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+class Ring:
+    """Ring buffers of candles for every series at one interval."""
+
+    def __init__(self, seconds: int, capacity: int, rows: int = 16):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.data = np.zeros((rows, capacity, 6), dtype=np.float64)
+        self.head = np.zeros(rows, dtype=np.int64)   # next slot to write
+        self.count = np.zeros(rows, dtype=np.int64)
+
+    def grow(self, rows: int):
+        extra = rows - self.data.shape[0]
+        if extra > 0:
+            self.data = np.concatenate([self.data, np.zeros((extra, self.capacity, 6))])
+            self.head = np.concatenate([self.head, np.zeros(extra, dtype=np.int64)])
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+
+    def _last(self, row: int) -> Optional[np.ndarray]:
+        if not self.count[row]:
+            return None
+        return self.data[row, (self.head[row] - 1) % self.capacity]
+
+    def _append(self, row: int, candle) -> np.ndarray:
+        slot = self.data[row, self.head[row]]
+        slot[:] = candle
+        self.head[row] = (self.head[row] + 1) % self.capacity
+        self.count[row] = min(self.count[row] + 1, self.capacity)
+        return slot
+
+    def tick(self, row: int, timestamp: float, price: float):
+        start = timestamp - timestamp % self.seconds
+        last = self._last(row)
+        if last is not None and last[TIME] == start:
+            if price > last[HIGH]:
+                last[HIGH] = price
+            if price < last[LOW]:
+                last[LOW] = price
+            last[CLOSE] = price
+        elif last is None or start > last[TIME]:
+            self._append(row, (start, price, price, price, price, 0.0))
+        # Ticks older than the open candle are dropped
+
+    def add_volume(self, row: int, timestamp: float, volume: float):
+        start = timestamp - timestamp % self.seconds
+        last = self._last(row)
+        if last is not None and last[TIME] == start:
+            last[VOLUME] += volume
+        elif last is not None and start > last[TIME]:
+            # No tick yet in this period: open it at the previous close
+            close = last[CLOSE]
+            self._append(row, (start, close, close, close, close, volume))
+
+    def series(self, row: int, limit: int) -> np.ndarray:
+        count = min(int(self.count[row]), limit)
+        indexes = (self.head[row] - count + np.arange(count)) % self.capacity
+        return self.data[row, indexes]
+
+
+class PriceHistory:
+    """``directory``, if set, is where snapshots are written every ``snapshot_interval`` seconds."""
+
+    STATS_COUNTERS = ("rejected_series",)
+
+    def __init__(self, max_series: int = 256, capacities: Optional[Dict[str, int]] = None,
+                 directory: Optional[str] = None, snapshot_interval: float = 60.0):
+        self.max_series = max_series
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self._task: Optional[asyncio.Task] = None
+        capacities = capacities or {}
+        self.rings = {
+            name: Ring(seconds, capacities.get(name, capacity))
+            for name, (seconds, capacity) in INTERVALS.items()
+        }
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.rejected_series = 0
+
+    def _row(self, chain_id: str, symbol: str) -> Optional[int]:
+        key = (chain_id, symbol)
+        row = self.index.get(key)
+        if row is None:
+            if len(self.index) >= self.max_series:
+                self.rejected_series += 1
+                return None
+            row = len(self.index)
+            self.index[key] = row
+            for ring in self.rings.values():
+                if row >= ring.data.shape[0]:
+                    ring.grow(min(self.max_series, 2 * ring.data.shape[0]))
+        return row
+
+    def record_price(self, chain_id: str, symbol: str, price: float, timestamp: float):
+        row = self._row(chain_id, symbol)
+        if row is not None:
+            for ring in self.rings.values():
+                ring.tick(row, timestamp, price)
+
+    def record_volume(self, chain_id: str, symbol: str, volume: float, timestamp: float):
+        row = self.index.get((chain_id, symbol))
+        if row is not None:
+            for ring in self.rings.values():
+                ring.add_volume(row, timestamp, volume)
+
+    def apply_snapshot(self, old, new):
+        """Price oracle listener: one tick per changed price."""
+        timestamp = epoch_seconds(new.timestamp)
+        for chain_id, symbols in new.prices.items():
+            old_symbols = old.prices.get(chain_id, {})
+            for symbol, entry in symbols.items():
+                previous = old_symbols.get(symbol)
+                if previous is None or previous["price"] != entry["price"]:
+                    self.record_price(chain_id, symbol, entry["price"], timestamp)
+
+    def load_snapshot(self, snapshot):
+        timestamp = epoch_seconds(snapshot.timestamp)
+        for chain_id, symbols in snapshot.prices.items():
+            for symbol, entry in symbols.items():
+                self.record_price(chain_id, symbol, entry["price"], timestamp)
+
+    def candles(self, chain_id: str, symbol: str, interval: str, limit: int) -> Optional[Dict[str, Any]]:
+        """Oldest-first candle columns, or None for an unknown series."""
+        row = self.index.get((chain_id, symbol))
+        if row is None:
+            return None
+        # Contiguous columns serialize straight from NumPy through orjson
+        data = np.ascontiguousarray(self.rings[interval].series(row, limit).T)
+        columns: Dict[str, Any] = {name: data[i] for i, name in enumerate(COLUMNS)}
+        columns["time"] = data[TIME].astype(np.int64)
+        return columns
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self.index),
+            "max_series": self.max_series,
+            "rejected_series": self.rejected_series,
+            "memory_bytes": sum(r.data.nbytes + r.head.nbytes + r.count.nbytes for r in self.rings.values()),
+        }
+
+    # Persistence: <directory>/<interval>.npy plus series.json
+
+    def export_state(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Copy of the live state, cheap enough to take on the event loop."""
+        rows = len(self.index)
+        meta = {
+            "series": [[chain_id, symbol] for (chain_id, symbol), _ in sorted(self.index.items(), key=lambda kv: kv[1])],
+            "rings": {},
+        }
+        arrays = {}
+        for name, ring in self.rings.items():
+            arrays[name] = ring.data[:rows].copy()
+            meta["rings"][name] = {
+                "capacity": ring.capacity,
+                "head": ring.head[:rows].tolist(),
+                "count": ring.count[:rows].tolist(),
+            }
+        return meta, arrays
+
+    @staticmethod
+    def write_state(directory: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        """Write a state from ``export_state``; each file is replaced atomically."""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in arrays.items():
+            path = os.path.join(directory, f"{name}.npy")
+            mapped = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=array.dtype, shape=array.shape)
+            mapped[:] = array
+            mapped.flush()
+            del mapped
+            os.replace(path + ".tmp", path)
+        # Metadata last: it only ever points at complete array files
+        with open(os.path.join(directory, "series.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(directory, "series.json.tmp"), os.path.join(directory, "series.json"))
+
+    async def save(self):
+        # Copy on the loop, write from a thread
+        meta, arrays = self.export_state()
+        await asyncio.to_thread(self.write_state, self.directory, meta, arrays)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.save()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Price history snapshot error: {str(e)}")
+
+    def start(self):
+        if self.directory and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.save()
+
+    def load(self) -> bool:
+        """Restore the last snapshot; returns False if there is none, it is unreadable or it does not fit this configuration."""
+        directory = self.directory
+        if not directory:
+            return False
+        try:
+            with open(os.path.join(directory, "series.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Price history snapshot metadata unreadable; ignored: {str(e)}")
+            return False
+        try:
+            series = [tuple(key) for key in meta["series"]][:self.max_series]
+            rows = len(series)
+            restored = {}
+            for name, ring in self.rings.items():
+                saved = meta["rings"].get(name)
+                if saved is None or saved["capacity"] != ring.capacity:
+                    logger.warning(f"Price history snapshot for {name} does not match the configuration; ignored")
+                    return False
+                data = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                if data.shape != (len(meta["series"]), ring.capacity, 6):
+                    logger.warning(f"Price history snapshot for {name} does not match the configuration; ignored")
+                    return False
+                head = np.asarray(saved["head"][:rows], dtype=np.int64)
+                count = np.asarray(saved["count"][:rows], dtype=np.int64)
+                if head.shape != (rows,) or count.shape != (rows,):
+                    raise ValueError(f"{name} head/count do not match the series")
+                restored[name] = (data[:rows], head, count)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Price history snapshot unreadable; ignored: {str(e)}")
+            return False
+        # Validated in full before anything is replaced
+        for name, ring in self.rings.items():
+            data, head, count = restored[name]
+            ring.grow(rows)
+            ring.data[:rows] = data
+            ring.head[:rows] = head
+            ring.count[:rows] = count
+        self.index = {key: row for row, key in enumerate(series)}
+        return True
@@ -0,0 +1,233 @@
+"""Background price oracle.
+
+A single asyncio task polls a pluggable ``PriceSource`` and publishes an
+immutable, versioned ``PriceSnapshot``. Request handlers only ever read
+``oracle.snapshot``; they never wait on an upstream fetch.
+"""
+import asyncio
+import copy
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# {chain_id: {symbol: {"price": float, "change_24h": float, "volume_24h": float}}}
+PriceTable = Dict[str, Dict[str, Dict[str, float]]]
+
+# Seed prices; also what the local source serves
+DEFAULT_PRICES: PriceTable = {
+    "ethereum": {
+        "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 15000000000},
+        "USDC": {"price": 1.001, "change_24h": 0.01, "volume_24h": 8000000000},
+        "USDT": {"price": 0.999, "change_24h": -0.02, "volume_24h": 12000000000}
+    },
+    "solana": {
+        "SOL": {"price": 162.30, "change_24h": -1.25, "volume_24h": 2500000000},
+        "USDC": {"price": 1.000, "change_24h": 0.00, "volume_24h": 1500000000}
+    },
+    "polygon": {
+        "MATIC": {"price": 0.845, "change_24h": 3.78, "volume_24h": 500000000},
+        "USDC": {"price": 1.000, "change_24h": 0.01, "volume_24h": 800000000}
+    },
+    "arbitrum": {
+        "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 3000000000},
+        "ARB": {"price": 1.25, "change_24h": 5.20, "volume_24h": 400000000}
+    },
+    "optimism": {
+        "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 2000000000},
+        "OP": {"price": 2.15, "change_24h": 1.80, "volume_24h": 300000000}
+    },
+    "bsc": {
+        "BNB": {"price": 315.50, "change_24h": -0.95, "volume_24h": 1800000000},
+        "USDT": {"price": 0.999, "change_24h": -0.01, "volume_24h": 2500000000}
+    },
+    "fantom": {
+        "FTM": {"price": 0.42, "change_24h": 7.35, "volume_24h": 150000000}
+    },
+    "avalanche": {
+        "AVAX": {"price": 35.80, "change_24h": 4.20, "volume_24h": 800000000}
+    }
+}
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """One published price table. Never mutated after publication."""
+    version: int
+    timestamp: datetime
+    prices: PriceTable
+
+    def get(self, chain_id: str, symbol: str) -> Optional[Dict[str, float]]:
+        return self.prices.get(chain_id, {}).get(symbol)
+
+
+class PriceSource:
+    """Something the oracle can poll for a full price table."""
+
+    name = "base"
+
+    async def fetch(self, client: Optional[httpx.AsyncClient]) -> PriceTable:
+        raise NotImplementedError
+
+
+class StaticPriceSource(PriceSource):
+    """Local, in-process source. Serves DEFAULT_PRICES unless told otherwise.
+
+    Used when no upstream is configured and as the fake source in tests:
+    call ``set_price`` and the next poll publishes the change.
+    """
+
+    name = "static"
+
+    def __init__(self, prices: Optional[PriceTable] = None):
+        self._prices = copy.deepcopy(prices if prices is not None else DEFAULT_PRICES)
+
+    def set_price(self, chain_id: str, symbol: str, price: float,
+                  change_24h: Optional[float] = None, volume_24h: Optional[float] = None):
+        entry = self._prices.setdefault(chain_id, {}).setdefault(
+            symbol, {"price": price, "change_24h": 0.0, "volume_24h": 0.0}
+        )
+        entry["price"] = price
+        if change_24h is not None:
+            entry["change_24h"] = change_24h
+        if volume_24h is not None:
+            entry["volume_24h"] = volume_24h
+
+    async def fetch(self, client: Optional[httpx.AsyncClient]) -> PriceTable:
+        return copy.deepcopy(self._prices)
+
+
+# CoinGecko ids for the symbols we quote
+COINGECKO_IDS = {
+    "ETH": "ethereum",
+    "USDC": "usd-coin",
+    "USDT": "tether",
+    "SOL": "solana",
+    "MATIC": "matic-network",
+    "ARB": "arbitrum",
+    "OP": "optimism",
+    "BNB": "binancecoin",
+    "FTM": "fantom",
+    "AVAX": "avalanche-2",
+}
+
+
+class CoinGeckoPriceSource(PriceSource):
+    """Polls CoinGecko's simple/price endpoint for every (chain, symbol) we list."""
+
+    name = "coingecko"
+
+    def __init__(self, pairs: Dict[str, List[str]], base_url: str = "https://api.coingecko.com/api/v3",
+                 api_key: Optional[str] = None):
+        self.pairs = pairs
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    async def fetch(self, client: Optional[httpx.AsyncClient]) -> PriceTable:
+        ids = sorted({COINGECKO_IDS[s] for symbols in self.pairs.values() for s in symbols if s in COINGECKO_IDS})
+        headers = {"x-cg-demo-api-key": self.api_key} if self.api_key else None
+        response = await client.get(
+            f"{self.base_url}/simple/price",
+            params={
+                "ids": ",".join(ids),
+                "vs_currencies": "usd",
+                "include_24hr_change": "true",
+                "include_24hr_vol": "true",
+            },
+            headers=headers,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        prices: PriceTable = {}
+        for chain_id, symbols in self.pairs.items():
+            for symbol in symbols:
+                quote = data.get(COINGECKO_IDS.get(symbol, ""))
+                if not quote or "usd" not in quote:
+                    continue
+                prices.setdefault(chain_id, {})[symbol] = {
+                    "price": quote["usd"],
+                    "change_24h": round(quote.get("usd_24h_change") or 0.0, 2),
+                    "volume_24h": quote.get("usd_24h_vol") or 0.0,
+                }
+        return prices
+
+
+class PriceOracle:
+    """Polls a PriceSource in the background and publishes snapshots."""
+
+    def __init__(self, source: PriceSource, interval: float = 10.0,
+                 initial_prices: Optional[PriceTable] = None):
+        self.source = source
+        self.interval = interval
+        self.client: Optional[httpx.AsyncClient] = None
+        self.errors = 0
+        self._listeners: List[Callable[[PriceSnapshot, PriceSnapshot], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._fetches = SingleFlight()
+        self._snapshot = PriceSnapshot(
+            version=0,
+            timestamp=datetime.utcnow(),
+            prices=copy.deepcopy(initial_prices if initial_prices is not None else DEFAULT_PRICES),
+        )
+
+    @property
+    def snapshot(self) -> PriceSnapshot:
+        return self._snapshot
+
+    def add_listener(self, listener: Callable[[PriceSnapshot, PriceSnapshot], None]):
+        """Register ``listener(old, new)``, called whenever a new snapshot is published."""
+        self._listeners.append(listener)
+
+    def publish(self, prices: PriceTable) -> PriceSnapshot:
+        old = self._snapshot
+        if prices == old.prices:
+            return old
+        new = PriceSnapshot(version=old.version + 1, timestamp=datetime.utcnow(), prices=prices)
+        self._snapshot = new
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(f"Price snapshot listener error: {str(e)}")
+        return new
+
+    async def refresh(self) -> PriceSnapshot:
+        """Fetch once from the source and publish if anything changed.
+
+        Concurrent refreshes (poll loop and on-demand callers) share one
+        upstream fetch.
+        """
+        prices = await self._fetches.do(self.source.name, lambda: self.source.fetch(self.client))
+        return self.publish(prices)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Price oracle poll error ({self.source.name}): {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
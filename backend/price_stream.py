@@ -0,0 +1,138 @@
+"""Delta-encoded price ticks for WebSocket ``prices`` subscribers and SSE clients.
+
+A subscriber gets one full snapshot, then, at most once per coalescing
+interval, only the (chain, symbol) entries whose price or 24h change moved.
+Each delta is serialized once and shared by every WebSocket and SSE client.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from connection_manager import PRICES_TOPIC, ConnectionManager
+from price_oracle import PriceOracle, PriceSnapshot
+from response_cache import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_message(snapshot: PriceSnapshot) -> Dict[str, Any]:
+    return {
+        "type": "prices_snapshot",
+        "version": snapshot.version,
+        "timestamp": snapshot.timestamp.isoformat(),
+        "prices": snapshot.prices,
+    }
+
+
+def diff_prices(old: PriceSnapshot, new: PriceSnapshot) -> List[Dict[str, Any]]:
+    """Entries of ``new`` whose price or change_24h differ from ``old``."""
+    changes = []
+    for chain_id, symbols in new.prices.items():
+        old_symbols = old.prices.get(chain_id, {})
+        for symbol, entry in symbols.items():
+            previous = old_symbols.get(symbol)
+            if (previous is None
+                    or previous["price"] != entry["price"]
+                    or previous["change_24h"] != entry["change_24h"]):
+                changes.append({
+                    "chain": chain_id,
+                    "symbol": symbol,
+                    "price": entry["price"],
+                    "change_24h": entry["change_24h"],
+                })
+    return changes
+
+
+class PriceStream:
+    """Coalesces oracle snapshots into deltas and pushes them to subscribers."""
+
+    STATS_COUNTERS = ("deltas_sent",)
+
+    def __init__(self, oracle: PriceOracle, manager: ConnectionManager,
+                 interval: float = 1.0, sse_queue_size: int = 16, sse_heartbeat: float = 15.0):
+        self.oracle = oracle
+        self.manager = manager
+        self.interval = interval
+        self.sse_queue_size = sse_queue_size
+        self.sse_heartbeat = sse_heartbeat
+        self.deltas_sent = 0
+        self._last = oracle.snapshot
+        self._sse_clients: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def snapshot_payload(self) -> str:
+        return dumps(snapshot_message(self.oracle.snapshot)).decode()
+
+    async def tick(self):
+        """Publish one delta if the oracle has moved since the last one."""
+        current = self.oracle.snapshot
+        if current.version == self._last.version:
+            return
+        changes = diff_prices(self._last, current)
+        self._last = current
+        if not changes:
+            return
+        data = dumps({
+            "type": "prices_delta",
+            "version": current.version,
+            "timestamp": current.timestamp.isoformat(),
+            "changes": changes,
+        }).decode()
+        self.deltas_sent += 1
+        # Every worker runs its own stream off its own oracle, so deltas stay local;
+        # going through the backplane would hand subscribers one copy per worker
+        await self.manager.deliver([PRICES_TOPIC], data)
+        for queue in self._sse_clients:
+            if queue.full():
+                # A lagging SSE client only needs the newest values; drop the oldest delta
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Price stream error: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._last = self.oracle.snapshot
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sse_events(self, is_disconnected) -> AsyncIterator[str]:
+        """Server-Sent Events: a ``snapshot`` event, then ``delta`` events."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.sse_queue_size)
+        self._sse_clients.add(queue)
+        try:
+            yield f"event: snapshot\ndata: {self.snapshot_payload()}\n\n"
+            while not await is_disconnected():
+                try:
+                    data = await asyncio.wait_for(queue.get(), self.sse_heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: delta\ndata: {data}\n\n"
+        finally:
+            self._sse_clients.discard(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "version": self._last.version,
+            "deltas_sent": self.deltas_sent,
+            "sse_clients": len(self._sse_clients),
+            "ws_subscribers": len(self.manager.subscribers.get(PRICES_TOPIC, ())),
+        }
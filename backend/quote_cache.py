@@ -0,0 +1,101 @@
+"""LRU + TTL cache of quote plans, invalidated when a token price changes.
+
+A plan is the amount-independent part of a quote (tokens, prices, route);
+the amount and slippage math is cheap and redone for every request, so one
+entry serves every amount quoted on a pair.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+QuoteKey = Tuple[str, str, str, str]
+
+
+class QuoteCache:
+    """Bounded LRU of quote plans with a TTL.
+
+    Each entry remembers the (chain, symbol) of both tokens so that a price
+    change on either token drops every plan that depends on it.
+    """
+
+    STATS_COUNTERS = ("hits", "misses", "evictions", "expirations", "invalidations")
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[QuoteKey, Tuple[float, Any]]" = OrderedDict()
+        self._by_token: Dict[Tuple[str, str], Set[QuoteKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def make_key(self, request) -> QuoteKey:
+        return (request.from_chain, request.to_chain, request.from_token, request.to_token)
+
+    def get(self, key: QuoteKey) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: QuoteKey, value: Any):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._by_token.setdefault((key[0], key[2]), set()).add(key)
+        self._by_token.setdefault((key[1], key[3]), set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_token(self, chain_id: str, symbol: str, *_):
+        """Drop every plan involving (chain_id, symbol)."""
+        keys = self._by_token.pop((chain_id, symbol), None)
+        if not keys:
+            return
+        for key in list(keys):
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._by_token.clear()
+
+    def _remove(self, key: QuoteKey):
+        del self._entries[key]
+        for token in ((key[0], key[2]), (key[1], key[3])):
+            keys = self._by_token.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_token[token]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,84 @@
+"""Pre-serialized JSON payloads for endpoints whose data rarely changes.
+
+Each payload is encoded once with orjson and kept as bytes alongside the
+version of the data it was built from; it is rebuilt only when that version
+changes. Every payload carries a strong ETag (a hash of its bytes) so
+repeat readers get a bodiless 304, and a Cache-Control header that lets
+nginx and browsers serve it without asking us at all.
+"""
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    # Pydantic models (Chain, Token, ...) appear inside some payloads
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default, option=JSON_OPTIONS)
+
+
+def cache_control(max_age: int, stale_while_revalidate: int) -> str:
+    return f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix still matches."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    STATS_COUNTERS = ("builds", "not_modified")
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Hashable, bytes, str]] = {}
+        self.builds = 0
+        self.not_modified = 0
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Tuple[bytes, str]:
+        """Encoded payload and ETag for ``key``; ``build()`` runs only if ``version`` moved."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+        body = dumps(build())
+        etag = make_etag(body)
+        self._entries[key] = (version, body, etag)
+        self.builds += 1
+        return body, etag
+
+    def response(self, key: Hashable, version: Hashable, build: Callable[[], Any],
+                 request: Optional[Request] = None, cache_control: Optional[str] = None) -> Response:
+        """Cached payload as a response, or a 304 if the request already holds it."""
+        body, etag = self.get(key, version, build)
+        headers = {"ETag": etag}
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+        if request is not None and etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"builds": self.builds, "not_modified": self.not_modified}
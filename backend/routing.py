@@ -0,0 +1,279 @@
+"""Cross-chain route graph.
+
+Chains are nodes; each bridge between two chains is a directed edge carrying
+a cost (USD), a fee (source-token units) and a latency (seconds). The best
+``k`` routes for every ordered chain pair are precomputed with Yen's
+algorithm over Dijkstra and kept in memory, so a quote only does a dict
+lookup. Changing an edge recomputes just the pairs it can affect.
+"""
+import heapq
+import itertools
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EdgeKey = Tuple[str, str, str]  # (from_chain, to_chain, bridge)
+Pair = Tuple[str, str]
+
+# Same-chain swaps only touch a DEX
+SAME_CHAIN_EXECUTION_TIME = 30
+
+# (chain_a, chain_b, bridge, latency_s, fee, cost_usd); added in both directions
+DEFAULT_BRIDGES = [
+    ("ethereum", "polygon", "Across", 5, 0.001, 0.0),
+    ("ethereum", "arbitrum", "Across", 8, 0.001, 0.0),
+    ("ethereum", "optimism", "Across", 30, 0.001, 0.0),
+    ("ethereum", "solana", "Wormhole", 45, 0.001, 0.0),
+    ("ethereum", "bsc", "Stargate", 30, 0.001, 0.0),
+    ("ethereum", "avalanche", "Stargate", 30, 0.001, 0.0),
+    ("ethereum", "fantom", "Stargate", 30, 0.001, 0.0),
+    ("polygon", "arbitrum", "Across", 12, 0.001, 0.0),
+    ("arbitrum", "optimism", "Across", 15, 0.001, 0.0),
+    ("arbitrum", "optimism", "Hop", 20, 0.0005, 0.0),
+    ("polygon", "optimism", "Hop", 25, 0.0005, 0.0),
+    ("bsc", "avalanche", "Stargate", 40, 0.001, 0.0),
+    ("polygon", "solana", "Wormhole", 50, 0.001, 0.0),
+]
+
+
+class Edge:
+    __slots__ = ("from_chain", "to_chain", "bridge", "latency", "fee", "cost")
+
+    def __init__(self, from_chain: str, to_chain: str, bridge: str,
+                 latency: float, fee: float = 0.0, cost: float = 0.0):
+        self.from_chain = from_chain
+        self.to_chain = to_chain
+        self.bridge = bridge
+        self.latency = latency
+        self.fee = fee
+        self.cost = cost
+
+    @property
+    def key(self) -> EdgeKey:
+        return (self.from_chain, self.to_chain, self.bridge)
+
+
+class Route:
+    __slots__ = ("edges", "weight", "latency", "fee", "cost")
+
+    def __init__(self, edges: Tuple[Edge, ...], weight: float):
+        self.edges = edges
+        self.weight = weight
+        self.latency = sum(e.latency for e in edges)
+        self.fee = round(sum(e.fee for e in edges), 12)
+        self.cost = sum(e.cost for e in edges)
+
+    @property
+    def chains(self) -> List[str]:
+        return [self.edges[0].from_chain] + [e.to_chain for e in self.edges]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "chains": self.chains,
+            "bridges": [e.bridge for e in self.edges],
+            "execution_time": self.latency,
+            "fee": self.fee,
+            "cost": self.cost,
+            "weight": self.weight,
+        }
+
+
+class RouteGraph:
+    """Weighted multigraph of chains and bridges with cached k-best routes.
+
+    An edge's weight is ``latency * latency_weight + fee * fee_weight +
+    cost * cost_weight``; by default latency dominates and a fee of 0.001
+    counts as one second.
+    """
+
+    def __init__(self, k: int = 3, latency_weight: float = 1.0,
+                 fee_weight: float = 1000.0, cost_weight: float = 1.0):
+        self.k = k
+        self.latency_weight = latency_weight
+        self.fee_weight = fee_weight
+        self.cost_weight = cost_weight
+        self._nodes: Set[str] = set()
+        self._adj: Dict[str, Dict[EdgeKey, Edge]] = {}
+        self._routes: Dict[Pair, List[Route]] = {}
+        self._dist: Dict[Pair, float] = {}
+        self._pairs_by_edge: Dict[EdgeKey, Set[Pair]] = {}
+        self._precomputed = False
+        self.rebuilds = 0
+
+    @classmethod
+    def from_bridges(cls, chains: Iterable[str], bridges=DEFAULT_BRIDGES, **kwargs) -> "RouteGraph":
+        graph = cls(**kwargs)
+        for chain_id in chains:
+            graph.add_chain(chain_id)
+        for a, b, bridge, latency, fee, cost in bridges:
+            if a in graph._nodes and b in graph._nodes:
+                graph.add_bridge(a, b, bridge, latency, fee, cost)
+        graph.precompute()
+        return graph
+
+    def weight(self, edge: Edge) -> float:
+        return edge.latency * self.latency_weight + edge.fee * self.fee_weight + edge.cost * self.cost_weight
+
+    def add_chain(self, chain_id: str):
+        if chain_id in self._nodes:
+            return
+        self._nodes.add(chain_id)
+        self._adj[chain_id] = {}
+        if self._precomputed:
+            # A new isolated node has no routes; other pairs are unaffected
+            for other in self._nodes:
+                if other != chain_id:
+                    self._set_routes((chain_id, other), [])
+                    self._set_routes((other, chain_id), [])
+
+    def add_bridge(self, a: str, b: str, bridge: str, latency: float,
+                   fee: float = 0.0, cost: float = 0.0, bidirectional: bool = True):
+        self._put_edge(Edge(a, b, bridge, latency, fee, cost))
+        if bidirectional:
+            self._put_edge(Edge(b, a, bridge, latency, fee, cost))
+
+    def update_edge(self, from_chain: str, to_chain: str, bridge: str,
+                    latency: Optional[float] = None, fee: Optional[float] = None,
+                    cost: Optional[float] = None):
+        """Change one directed edge's weights and refresh the affected routes."""
+        old = self._adj[from_chain][(from_chain, to_chain, bridge)]
+        self._put_edge(Edge(
+            from_chain, to_chain, bridge,
+            old.latency if latency is None else latency,
+            old.fee if fee is None else fee,
+            old.cost if cost is None else cost,
+        ))
+
+    def remove_edge(self, from_chain: str, to_chain: str, bridge: str):
+        key = (from_chain, to_chain, bridge)
+        del self._adj[from_chain][key]
+        if self._precomputed:
+            self._recompute(self._pairs_by_edge.get(key, set()))
+
+    def best_routes(self, from_chain: str, to_chain: str) -> List[Route]:
+        if not self._precomputed:
+            self.precompute()
+        return self._routes.get((from_chain, to_chain), [])
+
+    def best_route(self, from_chain: str, to_chain: str) -> Optional[Route]:
+        routes = self.best_routes(from_chain, to_chain)
+        return routes[0] if routes else None
+
+    def precompute(self):
+        """Compute and cache the k best routes for every ordered pair."""
+        self._routes.clear()
+        self._dist.clear()
+        self._pairs_by_edge.clear()
+        self._recompute(itertools.permutations(self._nodes, 2))
+        self._precomputed = True
+
+    # Incremental maintenance
+
+    def _put_edge(self, edge: Edge):
+        old = self._adj[edge.from_chain].get(edge.key)
+        self._adj[edge.from_chain][edge.key] = edge
+        if not self._precomputed:
+            return
+        old_weight = self.weight(old) if old is not None else float("inf")
+        new_weight = self.weight(edge)
+        affected = set(self._pairs_by_edge.get(edge.key, ()))
+        if new_weight < old_weight:
+            # The edge may now enter the top k of pairs that don't use it yet
+            for pair in itertools.permutations(self._nodes, 2):
+                if pair not in affected and self._could_improve(pair, edge, new_weight):
+                    affected.add(pair)
+        self._recompute(affected)
+
+    def _could_improve(self, pair: Pair, edge: Edge, weight: float) -> bool:
+        source, target = pair
+        routes = self._routes.get(pair, [])
+        if len(routes) < self.k:
+            return True
+        head = 0.0 if source == edge.from_chain else self._dist.get((source, edge.from_chain), float("inf"))
+        tail = 0.0 if edge.to_chain == target else self._dist.get((edge.to_chain, target), float("inf"))
+        return head + weight + tail < routes[-1].weight
+
+    def _recompute(self, pairs: Iterable[Pair]):
+        for pair in list(pairs):
+            self._set_routes(pair, self._k_shortest(pair[0], pair[1]))
+            self.rebuilds += 1
+
+    def _set_routes(self, pair: Pair, routes: List[Route]):
+        for route in self._routes.get(pair, []):
+            for edge in route.edges:
+                pairs = self._pairs_by_edge.get(edge.key)
+                if pairs is not None:
+                    pairs.discard(pair)
+        self._routes[pair] = routes
+        self._dist[pair] = routes[0].weight if routes else float("inf")
+        for route in routes:
+            for edge in route.edges:
+                self._pairs_by_edge.setdefault(edge.key, set()).add(pair)
+
+    # Path search
+
+    def _dijkstra(self, source: str, target: str,
+                  banned_nodes: FrozenSet[str] = frozenset(),
+                  banned_edges: FrozenSet[EdgeKey] = frozenset()) -> Optional[Tuple[float, Tuple[Edge, ...]]]:
+        dist = {source: 0.0}
+        prev: Dict[str, Edge] = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == target:
+                path = []
+                while node != source:
+                    edge = prev[node]
+                    path.append(edge)
+                    node = edge.from_chain
+                return d, tuple(reversed(path))
+            if d > dist.get(node, float("inf")):
+                continue
+            for key, edge in self._adj[node].items():
+                if key in banned_edges or edge.to_chain in banned_nodes:
+                    continue
+                nd = d + self.weight(edge)
+                if nd < dist.get(edge.to_chain, float("inf")):
+                    dist[edge.to_chain] = nd
+                    prev[edge.to_chain] = edge
+                    heapq.heappush(heap, (nd, edge.to_chain))
+        return None
+
+    def _k_shortest(self, source: str, target: str) -> List[Route]:
+        """Yen's algorithm over edge sequences (parallel bridges are distinct routes)."""
+        first = self._dijkstra(source, target)
+        if first is None:
+            return []
+        found: List[Tuple[float, Tuple[Edge, ...]]] = [first]
+        seen = {tuple(e.key for e in first[1])}
+        candidates: List[Tuple[float, int, Tuple[Edge, ...]]] = []
+        counter = itertools.count()
+
+        while len(found) < self.k:
+            _, last_path = found[-1]
+            for i in range(len(last_path)):
+                root = last_path[:i]
+                spur_node = last_path[i].from_chain
+                root_keys = tuple(e.key for e in root)
+                banned_edges = frozenset(
+                    path[i].key for _, path in found
+                    if len(path) > i and tuple(e.key for e in path[:i]) == root_keys
+                )
+                banned_nodes = frozenset([source] + [e.to_chain for e in root[:-1]]) if root else frozenset()
+                spur = self._dijkstra(spur_node, target, banned_nodes, banned_edges)
+                if spur is None:
+                    continue
+                path = root + spur[1]
+                keys = tuple(e.key for e in path)
+                if keys in seen:
+                    continue
+                seen.add(keys)
+                weight = sum(self.weight(e) for e in path)
+                heapq.heappush(candidates, (weight, next(counter), path))
+            if not candidates:
+                break
+            weight, _, path = heapq.heappop(candidates)
+            found.append((weight, path))
+
+        return [Route(path, weight) for weight, path in found]
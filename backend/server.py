@@ -1,23 +1,90 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Depends
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Depends, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 import httpx
+import numpy as np
 import json
 import uuid
 import asyncio
+import hmac
 import os
+import time
 from datetime import datetime
 import logging
 
+from admission import ADDRESS, API_KEY, IP, AdmissionMiddleware, LoadShedder, RateLimiter
+from backplane import create_backplane
+from connection_manager import PRICES_TOPIC, ConnectionManager, chain_topic, user_topic
+from diagnostics import GcPauseTracker, SlowRequestLog, SlowRequestMiddleware, StallWatchdog
+from idempotency import IdempotencyError, IdempotencyStore, fingerprint
+from loop_lag import LoopLagMonitor
+from market_data import MarketData
+from metrics import QUOTE_STAGE_SECONDS, MongoCommandTimer, PrometheusMiddleware, metrics_response, register_stats
+from platform_stats import PlatformStats
+from portfolio import PortfolioAggregator
+from price_history import INTERVALS, PriceHistory
+from price_oracle import (
+    DEFAULT_PRICES, CoinGeckoPriceSource, PriceOracle, PriceSnapshot, PriceSource, StaticPriceSource
+)
+from price_stream import PriceStream
+from quote_cache import QuoteCache
+from response_cache import ResponseCache, cache_control, dumps
+from quote_engine import NoRouteError, compute_amounts, plan_route
+from routing import RouteGraph
+from singleflight import SingleFlight
+from swap_pipeline import COMPLETED, FAILED, PENDING, FakeSwapExecutor, SwapPipeline
+from token_registry import TokenRegistry
+from transaction_history import (
+    EXPORT_FORMATS, HISTORY_INDEX, InvalidCursor, content_disposition, export_transactions, history_pipeline,
+    paginate,
+)
+from write_batcher import InsertBatcher
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="SYNC Cross-Chain API", version="1.0.0")
+# orjson for every JSON response; static payloads are also pre-encoded (see response_cache)
+app = FastAPI(title="SYNC Cross-Chain API", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Admission control: token buckets per API key / user address / IP, plus load
+# shedding of low-priority routes while the loop lags or too much is in flight.
+# Added before CORS so 429/503 responses still carry CORS headers.
+loop_lag_monitor = LoopLagMonitor(interval=float(os.getenv('LOOP_LAG_INTERVAL', '0.1')))
+rate_limiter = RateLimiter({
+    API_KEY: (float(os.getenv('RATE_LIMIT_API_KEY_RPS', '100')), float(os.getenv('RATE_LIMIT_API_KEY_BURST', '200'))),
+    ADDRESS: (float(os.getenv('RATE_LIMIT_ADDRESS_RPS', '10')), float(os.getenv('RATE_LIMIT_ADDRESS_BURST', '30'))),
+    IP: (float(os.getenv('RATE_LIMIT_IP_RPS', '20')), float(os.getenv('RATE_LIMIT_IP_BURST', '60'))),
+})
+load_shedder = LoadShedder(
+    loop_lag_monitor,
+    low_priority=[
+        "/api/market-data",
+        "/api/stats",
+        "/api/routes/{from_chain}/{to_chain}",
+        "/api/transactions/{user_address}/export",
+        "/api/quote/cache-stats",
+        "/api/swap/batch-stats",
+        "/api/swap/pipeline-stats",
+        "/api/swap/idempotency-stats",
+        "/api/ws/stats",
+        "/api/prices/{chain_id}/{symbol}/history",
+    ],
+    max_loop_lag=float(os.getenv('SHED_MAX_LOOP_LAG', '0.1')),
+    max_in_flight=int(os.getenv('SHED_MAX_IN_FLIGHT', '500')),
+)
+# Long-lived streaming responses, kept out of in-flight and slow-request accounting
+STREAMING_ROUTES = ["/api/prices/stream", "/api/transactions/{user_address}/export"]
+app.add_middleware(
+    AdmissionMiddleware,
+    limiter=rate_limiter,
+    shedder=load_shedder,
+    untracked=STREAMING_ROUTES,
+)
 
 # CORS configuration
 app.add_middleware(
@@ -28,34 +95,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Slow-request diagnostics: await-point stacks, overlapping loop stalls and GC
+# time for requests over SLOW_REQUEST_THRESHOLD; see /api/debug/slow-requests
+gc_pause_tracker = GcPauseTracker()
+stall_watchdog = StallWatchdog(loop_lag_monitor, threshold=float(os.getenv('LOOP_STALL_THRESHOLD', '0.25')))
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', '0.5'))
+slow_request_log = SlowRequestLog(capacity=int(os.getenv('SLOW_REQUEST_LOG_SIZE', '100')))
+app.add_middleware(
+    SlowRequestMiddleware,
+    log=slow_request_log,
+    watchdog=stall_watchdog,
+    gc_tracker=gc_pause_tracker,
+    threshold=SLOW_REQUEST_THRESHOLD,
+    profile_rate=float(os.getenv('SLOW_REQUEST_PROFILE_RATE', '0.01')),
+    excluded=STREAMING_ROUTES,
+)
+# The debug endpoint exposes stacks and profiles; it is disabled unless a token is set
+DEBUG_TOKEN = os.getenv('DEBUG_TOKEN')
+
+# Per-route latency and in-flight gauges, labelled by route template; served at /metrics
+app.add_middleware(PrometheusMiddleware)
+
 # Database setup
 MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(MONGO_URL)
+client = AsyncIOMotorClient(MONGO_URL, event_listeners=[MongoCommandTimer()])
 db = client.sync_db
 
 # WebSocket manager for real-time updates
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
-
-manager = ConnectionManager()
+manager = ConnectionManager(
+    queue_size=int(os.getenv('WS_QUEUE_SIZE', '256')),
+    slow_consumer_policy=os.getenv('WS_SLOW_CONSUMER_POLICY', 'drop_oldest'),
+    send_timeout=float(os.getenv('WS_SEND_TIMEOUT', '5')),
+    # BACKPLANE_URL=redis://... shares publishes across uvicorn workers
+    backplane=create_backplane(os.getenv('BACKPLANE_URL'), os.getenv('BACKPLANE_CHANNEL', 'sync:ws')),
+)
 
 # Pydantic models
 class Token(BaseModel):
@@ -112,9 +185,11 @@ class Transaction(BaseModel):
     to_token: str
     from_amount: str
     to_amount: str
-    status: str  # pending, completed, failed
+    status: str  # pending, submitted, bridging, completed, failed
+    usd_value: Optional[float] = None
     tx_hash: Optional[str] = None
     bridge_tx_hash: Optional[str] = None
+    error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
@@ -207,6 +282,119 @@ POPULAR_TOKENS = {
     ]
 }
 
+# Token registry: O(1) lookup by (chain, symbol) and (chain, address).
+# Seeded with POPULAR_TOKENS; a larger token list can be loaded at startup.
+TOKEN_LIST_PATH = os.getenv('TOKEN_LIST_PATH')
+token_registry = TokenRegistry()
+token_registry.load_tokens(POPULAR_TOKENS)
+
+@app.on_event("startup")
+async def load_token_list():
+    if not TOKEN_LIST_PATH:
+        return
+    chain_ids = {chain.chain_id: chain.id for chain in SUPPORTED_CHAINS.values()}
+    try:
+        token_registry.load_token_list(TOKEN_LIST_PATH, chain_ids)
+    except Exception as e:
+        logger.error(f"Token list load error: {str(e)}")
+        return
+    # Price the newly loaded tokens now rather than on the next snapshot change
+    sync_token_prices(price_oracle.snapshot, price_oracle.snapshot)
+
+# Shared, pooled HTTP client for all upstream calls
+http_client: Optional[httpx.AsyncClient] = None
+
+# Price oracle: polls PRICE_SOURCE in the background and publishes snapshots
+def create_price_source() -> PriceSource:
+    source = os.getenv('PRICE_SOURCE', 'static')
+    if source == 'coingecko':
+        pairs = {chain_id: list(tokens) for chain_id, tokens in DEFAULT_PRICES.items()}
+        return CoinGeckoPriceSource(pairs, api_key=os.getenv('COINGECKO_API_KEY'))
+    return StaticPriceSource()
+
+price_oracle = PriceOracle(create_price_source(), interval=float(os.getenv('PRICE_POLL_INTERVAL', '10')))
+
+def sync_token_prices(old: PriceSnapshot, new: PriceSnapshot):
+    for chain_id, symbols in new.prices.items():
+        for symbol, entry in symbols.items():
+            token_registry.update_price(chain_id, symbol, entry["price"])
+
+price_oracle.add_listener(sync_token_prices)
+
+# Market aggregates (volumes, top-k trending) maintained per price change and swap
+market_data = MarketData(k=int(os.getenv('MARKET_TRENDING_K', '5')))
+market_data.load(price_oracle.snapshot)
+price_oracle.add_listener(market_data.apply_snapshot)
+
+# OHLCV candles per (chain, symbol) in fixed-size ring buffers, snapshotted to PRICE_HISTORY_DIR
+price_history = PriceHistory(
+    max_series=int(os.getenv('PRICE_HISTORY_MAX_SERIES', '256')),
+    directory=os.getenv('PRICE_HISTORY_DIR'),
+    snapshot_interval=float(os.getenv('PRICE_HISTORY_SNAPSHOT_INTERVAL', '60')),
+)
+price_oracle.add_listener(price_history.apply_snapshot)
+sync_token_prices(price_oracle.snapshot, price_oracle.snapshot)
+
+# Price stream: delta-encoded ticks for "prices" WebSocket subscribers and SSE
+price_stream = PriceStream(price_oracle, manager, interval=float(os.getenv('PRICE_STREAM_INTERVAL', '1')))
+
+@app.on_event("startup")
+async def start_background_services():
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    loop_lag_monitor.start()
+    stall_watchdog.start()
+    gc_pause_tracker.install()
+    await manager.start()
+    price_oracle.start(http_client)
+    portfolio_aggregator.client = http_client
+    price_stream.start()
+    if not price_history.load():
+        price_history.load_snapshot(price_oracle.snapshot)
+    price_history.start()
+    transaction_writer.start()
+    swap_pipeline.start()
+    platform_stats.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await platform_stats.stop()
+    await swap_pipeline.stop()
+    await transaction_writer.stop()
+    await price_stream.stop()
+    await price_history.stop()
+    await price_oracle.stop()
+    await manager.stop()
+    gc_pause_tracker.uninstall()
+    stall_watchdog.stop()
+    await loop_lag_monitor.stop()
+    if http_client is not None:
+        await http_client.aclose()
+
+MAX_HISTORY_PAGE = 200
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await db.transactions.create_index(HISTORY_INDEX, name="user_history")
+        await swap_pipeline.ensure_indexes()
+        await idempotency_store.ensure_indexes()
+        await platform_stats.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Index creation error: {str(e)}")
+
+# Pre-encoded payloads for rarely changing endpoints, with ETags and Cache-Control
+response_cache = ResponseCache()
+STATIC_CACHE_CONTROL = cache_control(max_age=300, stale_while_revalidate=86400)
+TOKENS_CACHE_CONTROL = cache_control(max_age=60, stale_while_revalidate=600)
+PRICES_CACHE_CONTROL = cache_control(
+    max_age=max(1, int(price_oracle.interval)),
+    stale_while_revalidate=int(os.getenv('PRICES_STALE_WHILE_REVALIDATE', '30')),
+)
+
 # API Routes
 @app.get("/api/")
 async def root():
@@ -217,97 +405,288 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
 @app.get("/api/chains")
-async def get_supported_chains():
+async def get_supported_chains(request: Request):
     """Get all supported blockchain networks"""
-    return {"chains": list(SUPPORTED_CHAINS.values())}
+    # SUPPORTED_CHAINS is fixed at import, so this is encoded exactly once
+    return response_cache.response(
+        "chains", 0, lambda: {"chains": list(SUPPORTED_CHAINS.values())},
+        request, STATIC_CACHE_CONTROL,
+    )
 
 @app.get("/api/tokens/{chain_id}")
-async def get_tokens(chain_id: str):
+async def get_tokens(chain_id: str, request: Request):
     """Get popular tokens for a specific chain"""
     if chain_id not in SUPPORTED_CHAINS:
         raise HTTPException(status_code=404, detail="Chain not supported")
     
-    tokens = POPULAR_TOKENS.get(chain_id, [])
-    return {"chain": chain_id, "tokens": tokens}
+    return response_cache.response(
+        ("tokens", chain_id),
+        token_registry.version,
+        lambda: {"chain": chain_id, "tokens": [t.to_dict() for t in token_registry.tokens_for_chain(chain_id)]},
+        request, TOKENS_CACHE_CONTROL,
+    )
+
+# Route graph: chains and bridges, with the k best routes per pair precomputed
+route_graph = RouteGraph.from_bridges(SUPPORTED_CHAINS.keys(), k=int(os.getenv('ROUTE_K', '3')))
+
+@app.get("/api/routes/{from_chain}/{to_chain}")
+async def get_routes(from_chain: str, to_chain: str):
+    """Get the best cross-chain routes between two chains"""
+    if from_chain not in SUPPORTED_CHAINS or to_chain not in SUPPORTED_CHAINS:
+        raise HTTPException(status_code=404, detail="Chain not supported")
+    routes = route_graph.best_routes(from_chain, to_chain)
+    return {"from_chain": from_chain, "to_chain": to_chain, "routes": [r.to_dict() for r in routes]}
+
+# Quote cache: most quote traffic is the same few pairs; the amount math is redone per request
+quote_cache = QuoteCache(
+    max_size=int(os.getenv('QUOTE_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('QUOTE_CACHE_TTL', '5')),
+)
+token_registry.add_price_listener(quote_cache.invalidate_token)
+
+@app.get("/api/quote/cache-stats")
+async def get_quote_cache_stats():
+    """Quote cache hit, miss and eviction counters"""
+    return {**quote_cache.stats(), "single_flight": quote_flights.stats()}
+
+# Identical concurrent quote requests share one computation
+quote_flights = SingleFlight()
+
+async def build_quote_plan(request: SwapRequest, cache_key: tuple) -> Dict[str, Any]:
+    """Amount-independent part of a quote: both tokens with their prices, and the route"""
+    # For production, you would use real Li.Fi API
+    # For now, we'll use enhanced simulation with real-like data
+    
+    from_token = token_registry.get_by_symbol(request.from_chain, request.from_token)
+    to_token = token_registry.get_by_symbol(request.to_chain, request.to_token)
+    
+    if not from_token or not to_token:
+        raise HTTPException(status_code=400, detail="Token not found")
+    
+    # Enhanced quote calculation with real market conditions
+    with QUOTE_STAGE_SECONDS.labels("plan_route").time():
+        route, execution_time, estimated_gas, bridge_fee = plan_route(
+            route_graph, request.from_chain, request.to_chain
+        )
+    
+    plan = {
+        "from_token": from_token.to_dict(),
+        "to_token": to_token.to_dict(),
+        "from_price": from_token.price_usd or 0,
+        "to_price": to_token.price_usd or 1,
+        "route": route,
+        "estimated_gas": estimated_gas,
+        "execution_time": execution_time,
+        "bridge_fee": bridge_fee,
+    }
+    quote_cache.set(cache_key, plan)
+    return plan
+
+def price_quote(plan: Dict[str, Any], request: SwapRequest) -> SwapQuote:
+    """Quote for the exact requested amount and slippage on a (possibly cached) plan"""
+    with QUOTE_STAGE_SECONDS.labels("compute_amounts").time():
+        amounts = compute_amounts(
+            float(request.amount),
+            plan["from_price"],
+            plan["to_price"],
+            request.slippage,
+            plan["bridge_fee"],
+        )
+    bridge_fee = plan["bridge_fee"]
+    return SwapQuote(
+        from_token=plan["from_token"],
+        to_token=plan["to_token"],
+        from_amount=request.amount,
+        to_amount=str(float(amounts["to_amount"])),
+        route=plan["route"],
+        estimated_gas=plan["estimated_gas"],
+        slippage=request.slippage,
+        price_impact=float(amounts["price_impact"]),
+        execution_time=plan["execution_time"],
+        bridge_fees=str(bridge_fee) if bridge_fee > 0 else None
+    )
 
 @app.post("/api/quote")
 async def get_swap_quote(request: SwapRequest):
     """Get cross-chain swap quote using Li.Fi API"""
     try:
-        # For production, you would use real Li.Fi API
-        # For now, we'll use enhanced simulation with real-like data
-        
-        from_token = next((t for t in POPULAR_TOKENS.get(request.from_chain, []) if t.symbol == request.from_token), None)
-        to_token = next((t for t in POPULAR_TOKENS.get(request.to_chain, []) if t.symbol == request.to_token), None)
-        
-        if not from_token or not to_token:
-            raise HTTPException(status_code=400, detail="Token not found")
-        
-        # Enhanced quote calculation with real market conditions
-        from_amount_float = float(request.amount)
-        from_usd = from_amount_float * (from_token.price_usd or 0)
-        
-        # Add realistic slippage and fees
-        bridge_fee = 0.001 if request.from_chain != request.to_chain else 0
-        slippage_amount = from_usd * (request.slippage / 100)
-        protocol_fee = from_usd * 0.003  # 0.3% protocol fee
-        
-        net_usd = from_usd - (bridge_fee * from_token.price_usd) - slippage_amount - protocol_fee
-        to_amount = net_usd / (to_token.price_usd or 1)
-        
-        # Realistic execution time based on chains
-        execution_times = {
-            ("ethereum", "polygon"): 5,
-            ("ethereum", "arbitrum"): 8,
-            ("ethereum", "solana"): 45,
-            ("polygon", "arbitrum"): 12,
-            ("arbitrum", "optimism"): 15,
-        }
-        
-        chain_pair = (request.from_chain, request.to_chain)
-        reverse_pair = (request.to_chain, request.from_chain)
-        execution_time = execution_times.get(chain_pair, execution_times.get(reverse_pair, 30))
-        
-        # Calculate price impact based on amount
-        price_impact = min(0.5, (from_amount_float / 1000) * 0.1)  # Max 0.5%
-        
-        # Generate realistic route
-        route = []
-        if request.from_chain == request.to_chain:
-            route = [{"protocol": "1inch", "chain": request.from_chain, "type": "dex"}]
-        else:
-            route = [
-                {"protocol": "1inch", "chain": request.from_chain, "type": "dex"},
-                {"protocol": "Li.Fi Bridge", "type": "bridge", "bridge_name": "Across"},
-                {"protocol": "1inch", "chain": request.to_chain, "type": "dex"}
-            ]
-        
-        quote = SwapQuote(
-            from_token=from_token,
-            to_token=to_token,
-            from_amount=request.amount,
-            to_amount=str(round(to_amount, 6)),
-            route=route,
-            estimated_gas=str(0.002 + (0.001 * len(route))),
-            slippage=request.slippage,
-            price_impact=round(price_impact, 3),
-            execution_time=execution_time,
-            bridge_fees=str(bridge_fee) if bridge_fee > 0 else None
-        )
-        
-        return {"quote": quote}
+        cache_key = quote_cache.make_key(request)
+        plan = quote_cache.get(cache_key)
+        if plan is None:
+            plan = await quote_flights.do(cache_key, lambda: build_quote_plan(request, cache_key))
+        return {"quote": price_quote(plan, request)}
         
     except Exception as e:
         logger.error(f"Quote error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+MAX_BATCH_QUOTES = int(os.getenv('MAX_BATCH_QUOTES', '500'))
+
+@app.post("/api/quotes/batch")
+async def get_swap_quotes_batch(requests: List[SwapRequest]):
+    """Get many swap quotes in one call; fee and impact math runs vectorized"""
+    if len(requests) > MAX_BATCH_QUOTES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUOTES} quotes per batch")
+    
+    results: List[Dict[str, Any]] = [{} for _ in requests]
+    valid = []  # (index, request, from_token, to_token, amount)
+    routes: Dict[tuple, Any] = {}
+    for i, request in enumerate(requests):
+        from_token = token_registry.get_by_symbol(request.from_chain, request.from_token)
+        to_token = token_registry.get_by_symbol(request.to_chain, request.to_token)
+        if not from_token or not to_token:
+            results[i] = {"error": "Token not found"}
+            continue
+        try:
+            amount = float(request.amount)
+        except ValueError:
+            results[i] = {"error": f"Invalid amount: {request.amount}"}
+            continue
+        pair = (request.from_chain, request.to_chain)
+        if pair not in routes:
+            try:
+                with QUOTE_STAGE_SECONDS.labels("plan_route").time():
+                    routes[pair] = plan_route(route_graph, *pair)
+            except NoRouteError as e:
+                routes[pair] = e
+        if isinstance(routes[pair], NoRouteError):
+            results[i] = {"error": str(routes[pair])}
+            continue
+        valid.append((i, request, from_token, to_token, amount))
+    
+    if valid:
+        try:
+            with QUOTE_STAGE_SECONDS.labels("compute_amounts_batch").time():
+                amounts = compute_amounts(
+                    np.array([v[4] for v in valid], dtype=np.float64),
+                    np.array([v[2].price_usd or 0 for v in valid], dtype=np.float64),
+                    np.array([v[3].price_usd or 1 for v in valid], dtype=np.float64),
+                    np.array([v[1].slippage for v in valid], dtype=np.float64),
+                    np.array([routes[(v[1].from_chain, v[1].to_chain)][3] for v in valid], dtype=np.float64),
+                )
+        except Exception as e:
+            logger.error(f"Batch quote error: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        to_amounts = amounts["to_amount"].tolist()
+        price_impacts = amounts["price_impact"].tolist()
+        for j, (i, request, from_token, to_token, _) in enumerate(valid):
+            route, execution_time, estimated_gas, bridge_fee = routes[(request.from_chain, request.to_chain)]
+            results[i] = {"quote": SwapQuote(
+                from_token=from_token.to_dict(),
+                to_token=to_token.to_dict(),
+                from_amount=request.amount,
+                to_amount=str(to_amounts[j]),
+                route=route,
+                estimated_gas=estimated_gas,
+                slippage=request.slippage,
+                price_impact=price_impacts[j],
+                execution_time=execution_time,
+                bridge_fees=str(bridge_fee) if bridge_fee > 0 else None
+            )}
+    
+    return {"quotes": results}
+
+# Write-behind batcher: concurrent swap inserts share one insert_many
+transaction_writer = InsertBatcher(
+    lambda: db.transactions,
+    max_batch=int(os.getenv('TX_BATCH_SIZE', '100')),
+    max_delay=float(os.getenv('TX_BATCH_MAX_DELAY', '0.005')),
+)
+
+@app.get("/api/swap/batch-stats")
+async def get_swap_batch_stats():
+    """Transaction insert batch size and flush latency histograms"""
+    return transaction_writer.stats()
+
+# Swap execution: the transactions collection is the queue, drained by a bounded worker pool
+swap_pipeline = SwapPipeline(
+    lambda: db.transactions,
+    FakeSwapExecutor(
+        step_delay=float(os.getenv('SWAP_STEP_DELAY', '1')),
+        failure_rate=float(os.getenv('SWAP_FAILURE_RATE', '0')),
+    ),
+    workers=int(os.getenv('SWAP_WORKERS', '8')),
+    lease=float(os.getenv('SWAP_LEASE_SECONDS', '30')),
+    max_attempts=int(os.getenv('SWAP_MAX_ATTEMPTS', '3')),
+)
+
+def transaction_message(message_type: str, tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": message_type,
+        "transaction": {
+            "id": tx["id"],
+            "user_address": tx["user_address"],
+            "from_chain": tx["from_chain"],
+            "to_chain": tx["to_chain"],
+            "from_token": tx["from_token"],
+            "to_token": tx["to_token"],
+            "from_amount": tx["from_amount"],
+            "to_amount": tx["to_amount"],
+            "status": tx["status"],
+            "tx_hash": tx.get("tx_hash"),
+            "bridge_tx_hash": tx.get("bridge_tx_hash"),
+            "error": tx.get("error"),
+            "created_at": tx["created_at"].isoformat(),
+            "completed_at": tx["completed_at"].isoformat() if tx.get("completed_at") else None
+        }
+    }
+
+async def publish_transaction(message_type: str, tx: Dict[str, Any]):
+    """Notify subscribers of this user and both chains"""
+    await manager.publish(
+        [user_topic(tx["user_address"]), chain_topic(tx["from_chain"]), chain_topic(tx["to_chain"])],
+        transaction_message(message_type, tx)
+    )
+
+async def on_swap_transition(tx: Dict[str, Any], previous: str):
+    if tx["status"] in (COMPLETED, FAILED):
+        platform_stats.record_finished(tx)
+    if tx["status"] == COMPLETED:
+        usd_value = tx.get("usd_value") or 0.0
+        market_data.record_swap(tx["from_chain"], tx["to_chain"], usd_value)
+        price_history.record_volume(tx["from_chain"], tx["from_token"], usd_value, time.time())
+        await publish_transaction("transaction_completed", tx)
+    elif tx["status"] == FAILED:
+        await publish_transaction("transaction_failed", tx)
+    else:
+        await publish_transaction("transaction_updated", tx)
+
+swap_pipeline.add_listener(on_swap_transition)
+
+@app.get("/api/swap/pipeline-stats")
+async def get_swap_pipeline_stats():
+    """Swap worker pool counters"""
+    return swap_pipeline.stats()
+
+# Idempotency-Key replay store: unique-indexed Mongo records behind an in-process LRU
+idempotency_store = IdempotencyStore(
+    lambda: db.idempotency_keys,
+    max_size=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('IDEMPOTENCY_TTL', '86400')),
+)
+
+@app.get("/api/swap/idempotency-stats")
+async def get_swap_idempotency_stats():
+    """Idempotency-Key executions, replays and conflicts"""
+    return idempotency_store.stats()
+
 @app.post("/api/swap")
-async def execute_swap(request: SwapRequest):
-    """Execute cross-chain swap"""
+async def execute_swap(request: SwapRequest, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Queue a cross-chain swap; retries with the same Idempotency-Key replay the first response"""
+    if idempotency_key is None:
+        return await submit_swap(request)
+    try:
+        return await idempotency_store.run(idempotency_key, fingerprint(request.dict()), lambda: submit_swap(request))
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+async def submit_swap(request: SwapRequest) -> Dict[str, Any]:
+    """Record a pending swap for the pipeline; progress is pushed over WebSocket"""
     try:
         # Get quote first to calculate amounts
-        from_token = next((t for t in POPULAR_TOKENS.get(request.from_chain, []) if t.symbol == request.from_token), None)
-        to_token = next((t for t in POPULAR_TOKENS.get(request.to_chain, []) if t.symbol == request.to_token), None)
+        from_token = token_registry.get_by_symbol(request.from_chain, request.from_token)
+        to_token = token_registry.get_by_symbol(request.to_chain, request.to_token)
         
         if not from_token or not to_token:
             raise HTTPException(status_code=400, detail="Token not found")
@@ -326,45 +705,25 @@ async def execute_swap(request: SwapRequest):
             to_token=request.to_token,
             from_amount=request.amount,
             to_amount=str(to_amount * 0.995),  # With slippage
-            status="completed"  # Simulate immediate completion for demo
+            status=PENDING,
+            usd_value=from_usd
         )
         
         # Convert to dict for database insertion
         transaction_dict = transaction.dict()
         transaction_dict["created_at"] = datetime.utcnow()
-        transaction_dict["completed_at"] = datetime.utcnow()
-        
-        # Save to database
-        result = await db.transactions.insert_one(transaction_dict)
-        
-        # Simulate successful transaction
-        tx_hash = f"0x{str(result.inserted_id)[-12:]}"
-        
-        # Broadcast update
-        broadcast_transaction = {
-            "type": "transaction_completed",
-            "transaction": {
-                "id": transaction.id,
-                "user_address": transaction.user_address,
-                "from_chain": transaction.from_chain,
-                "to_chain": transaction.to_chain,
-                "from_token": transaction.from_token,
-                "to_token": transaction.to_token,
-                "from_amount": transaction.from_amount,
-                "to_amount": transaction.to_amount,
-                "status": transaction.status,
-                "tx_hash": tx_hash,
-                "created_at": transaction_dict["created_at"].isoformat(),
-                "completed_at": transaction_dict["completed_at"].isoformat()
-            }
-        }
+        transaction_dict["attempts"] = 0
         
-        await manager.broadcast(json.dumps(broadcast_transaction))
+        # Persist as pending (group-committed with concurrent swaps), then wake a worker
+        await transaction_writer.insert(transaction_dict)
+        swap_pipeline.notify()
+        platform_stats.record_submitted(transaction.user_address, transaction_dict["created_at"])
+        await publish_transaction("transaction_started", transaction_dict)
         
         return {
             "transaction_id": transaction.id,
-            "status": "completed",
-            "tx_hash": tx_hash,
+            "status": PENDING,
+            "tx_hash": None,
             "from_amount": transaction.from_amount,
             "to_amount": transaction.to_amount
         }
@@ -374,54 +733,63 @@ async def execute_swap(request: SwapRequest):
         raise HTTPException(status_code=500, detail=f"Swap execution failed: {str(e)}")
 
 @app.get("/api/transactions/{user_address}")
-async def get_user_transactions(user_address: str):
-    """Get transaction history for a user"""
+async def get_user_transactions(
+    user_address: str,
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE),
+):
+    """Get transaction history for a user, newest first; pass next_cursor as before for older pages"""
     try:
-        transactions = await db.transactions.find(
-            {"user_address": user_address}
-        ).sort("created_at", -1).limit(50).to_list(50)
-        
-        # Convert ObjectId to string and handle datetime serialization
-        for transaction in transactions:
-            if "_id" in transaction:
-                transaction["_id"] = str(transaction["_id"])
-            if "created_at" in transaction and hasattr(transaction["created_at"], "isoformat"):
-                transaction["created_at"] = transaction["created_at"].isoformat()
-            if "completed_at" in transaction and transaction["completed_at"] and hasattr(transaction["completed_at"], "isoformat"):
-                transaction["completed_at"] = transaction["completed_at"].isoformat()
+        pipeline = history_pipeline(user_address, before, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        rows = await db.transactions.aggregate(pipeline).to_list(limit + 1)
+        transactions, next_cursor = paginate(rows, limit)
         
-        return {"transactions": transactions}
+        return {"transactions": transactions, "next_cursor": next_cursor}
         
     except Exception as e:
         logger.error(f"Transaction history error: {str(e)}")
-        return {"transactions": []}
+        return {"transactions": [], "next_cursor": None}
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+
+@app.get("/api/transactions/{user_address}/export")
+async def export_user_transactions(user_address: str, format: str = "ndjson"):
+    """Stream a user's complete transaction history as NDJSON or CSV"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    
+    return StreamingResponse(
+        export_transactions(db.transactions, user_address, format, batch_size=EXPORT_BATCH_SIZE),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": content_disposition(user_address, format)},
+    )
+
+# Portfolio aggregator: concurrent, batched balance reads across all chains
+def cached_price(chain_id: str, symbol: str) -> Optional[float]:
+    entry = price_oracle.snapshot.get(chain_id, symbol)
+    return entry["price"] if entry else None
+
+portfolio_aggregator = PortfolioAggregator(
+    SUPPORTED_CHAINS,
+    token_registry,
+    cached_price,
+    rpc_urls={
+        chain_id: os.environ[f"RPC_URL_{chain_id.upper()}"]
+        for chain_id in SUPPORTED_CHAINS if f"RPC_URL_{chain_id.upper()}" in os.environ
+    },
+    deadline=float(os.getenv('PORTFOLIO_DEADLINE', '2')),
+    max_batch_calls=int(os.getenv('PORTFOLIO_RPC_BATCH_SIZE', '100')),
+)
 
 @app.get("/api/portfolio/{user_address}")
 async def get_user_portfolio(user_address: str):
     """Get user's cross-chain portfolio"""
     try:
-        # This would fetch real balances across chains
-        # For now, return sample data
-        portfolio = {
-            "user_address": user_address,
-            "chains": {
-                "ethereum": {
-                    "tokens": [
-                        {"symbol": "ETH", "balance": "1.5", "usd_value": 4500.0},
-                        {"symbol": "USDC", "balance": "1000", "usd_value": 1000.0}
-                    ],
-                    "total_usd": 5500.0
-                },
-                "solana": {
-                    "tokens": [
-                        {"symbol": "SOL", "balance": "10", "usd_value": 1500.0}
-                    ],
-                    "total_usd": 1500.0
-                }
-            },
-            "total_usd": 7000.0,
-            "last_updated": datetime.utcnow()
-        }
+        portfolio = await portfolio_aggregator.get_portfolio(user_address)
         
         return {"portfolio": portfolio}
         
@@ -429,94 +797,158 @@ async def get_user_portfolio(user_address: str):
         logger.error(f"Portfolio error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Platform statistics: counters updated per swap, reconciled with the transactions collection
+platform_stats = PlatformStats(
+    lambda: db.transactions,
+    reconcile_interval=float(os.getenv('STATS_RECONCILE_INTERVAL', '300')),
+)
+
 @app.get("/api/stats")
-async def get_platform_stats():
-    """Get platform statistics"""
-    return {
-        "transaction_volume": "$50M+",
-        "success_rate": "99.9%",
-        "integrated_dapps": "50+",
-        "happy_users": "100K+",
+async def get_platform_stats(request: Request):
+    """Get platform statistics (USD volume, success rate in %, execution time in seconds)"""
+    return response_cache.response("stats", platform_stats.version, lambda: {
+        **platform_stats.summary(),
         "supported_chains": len(SUPPORTED_CHAINS),
-        "average_execution_time": "30s"
-    }
+    }, request)
 
 # WebSocket for real-time updates
+def parse_topics(message: Dict[str, Any]) -> List[str]:
+    """Topics named by a subscribe/unsubscribe message; raises ValueError if invalid"""
+    topics = message.get("topics") or []
+    if isinstance(topics, str):
+        topics = [topics]
+    if message.get("user_address"):
+        topics = list(topics) + [user_topic(message["user_address"])]
+    parsed = []
+    for topic in topics:
+        if not isinstance(topic, str):
+            raise ValueError("Topics must be strings")
+        if topic == PRICES_TOPIC:
+            parsed.append(topic)
+        elif topic.startswith("user:") and len(topic) > 5:
+            parsed.append(user_topic(topic[5:]))
+        elif topic.startswith("chain:") and topic[6:] in SUPPORTED_CHAINS:
+            parsed.append(topic)
+        else:
+            raise ValueError(f"Unknown topic: {topic}")
+    return parsed
+
 @app.websocket("/api/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle incoming WebSocket messages
-            await manager.send_personal_message(f"Echo: {data}", websocket)
+            try:
+                message = json.loads(data)
+                if not isinstance(message, dict):
+                    raise ValueError("Expected a JSON object")
+                action = message.get("type") or message.get("action")
+                if action == "subscribe":
+                    added = manager.subscribe(websocket, parse_topics(message))
+                    await manager.send_personal_message(
+                        {"type": "subscribed", "topics": manager.topics_for(websocket)}, websocket
+                    )
+                    if PRICES_TOPIC in added:
+                        # New price subscribers start from a full snapshot, then get deltas
+                        await manager.send_personal_message(price_stream.snapshot_payload(), websocket)
+                elif action == "unsubscribe":
+                    manager.unsubscribe(websocket, parse_topics(message))
+                    await manager.send_personal_message(
+                        {"type": "unsubscribed", "topics": manager.topics_for(websocket)}, websocket
+                    )
+                elif action == "ping":
+                    await manager.send_personal_message({"type": "pong"}, websocket)
+                else:
+                    raise ValueError(f"Unknown message type: {action}")
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                await manager.send_personal_message({"type": "error", "message": str(e)}, websocket)
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Any exit, not only a clean disconnect, releases the writer task and subscriptions
         manager.disconnect(websocket)
 
+@app.get("/api/ws/stats")
+async def get_websocket_stats():
+    """WebSocket fan-out queue depth and drop counters"""
+    return {**manager.stats(), "price_stream": price_stream.stats()}
+
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """Rate limiter and load shedding counters"""
+    return {"rate_limiter": rate_limiter.stats(), "load_shedder": load_shedder.stats(), "loop_lag": loop_lag_monitor.stats()}
+
+@app.get("/api/debug/slow-requests")
+async def get_slow_requests(request: Request, limit: int = Query(20, ge=1, le=100)):
+    """Slowest recent requests with their stacks and profiles; 404 unless DEBUG_TOKEN is set, then requires X-Debug-Token"""
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("x-debug-token", "").encode(), DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+    return {
+        "threshold_seconds": SLOW_REQUEST_THRESHOLD,
+        "recorded": slow_request_log.recorded,
+        "requests": slow_request_log.slowest(limit),
+        "loop_lag": loop_lag_monitor.stats(),
+        "gc": gc_pause_tracker.stats(),
+        "recent_stalls": list(stall_watchdog.stalls),
+    }
+
 # Real-time price feeds and market data
 @app.get("/api/prices")
-async def get_token_prices():
-    """Get real-time token prices (simulated)"""
+async def get_token_prices(request: Request):
+    """Get real-time token prices from the price oracle snapshot"""
     try:
-        # In production, integrate with CoinGecko, CoinMarketCap, or other price APIs
-        prices = {
-            "ethereum": {
-                "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 15000000000},
-                "USDC": {"price": 1.001, "change_24h": 0.01, "volume_24h": 8000000000},
-                "USDT": {"price": 0.999, "change_24h": -0.02, "volume_24h": 12000000000}
-            },
-            "solana": {
-                "SOL": {"price": 162.30, "change_24h": -1.25, "volume_24h": 2500000000},
-                "USDC": {"price": 1.000, "change_24h": 0.00, "volume_24h": 1500000000}
-            },
-            "polygon": {
-                "MATIC": {"price": 0.845, "change_24h": 3.78, "volume_24h": 500000000},
-                "USDC": {"price": 1.000, "change_24h": 0.01, "volume_24h": 800000000}
-            },
-            "arbitrum": {
-                "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 3000000000},
-                "ARB": {"price": 1.25, "change_24h": 5.20, "volume_24h": 400000000}
-            },
-            "optimism": {
-                "ETH": {"price": 3250.75, "change_24h": 2.45, "volume_24h": 2000000000},
-                "OP": {"price": 2.15, "change_24h": 1.80, "volume_24h": 300000000}
-            },
-            "bsc": {
-                "BNB": {"price": 315.50, "change_24h": -0.95, "volume_24h": 1800000000},
-                "USDT": {"price": 0.999, "change_24h": -0.01, "volume_24h": 2500000000}
-            },
-            "fantom": {
-                "FTM": {"price": 0.42, "change_24h": 7.35, "volume_24h": 150000000}
-            },
-            "avalanche": {
-                "AVAX": {"price": 35.80, "change_24h": 4.20, "volume_24h": 800000000}
-            }
-        }
+        # Served from the oracle's in-memory snapshot; no upstream I/O here
+        snapshot = price_oracle.snapshot
         
-        return {"prices": prices, "timestamp": datetime.utcnow().isoformat()}
+        return response_cache.response(
+            "prices",
+            snapshot.version,
+            lambda: {"prices": snapshot.prices, "version": snapshot.version, "timestamp": snapshot.timestamp.isoformat()},
+            request, PRICES_CACHE_CONTROL,
+        )
         
     except Exception as e:
         logger.error(f"Price fetch error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/prices/stream")
+async def stream_token_prices(request: Request):
+    """Server-Sent Events price stream: one snapshot, then deltas"""
+    return StreamingResponse(
+        price_stream.sse_events(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/prices/{chain_id}/{symbol}/history")
+async def get_price_history(chain_id: str, symbol: str, interval: str = Query("1h"), limit: int = Query(500, ge=1, le=2000)):
+    """OHLCV candles for one token, oldest first, as columns"""
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVALS)}")
+    candles = price_history.candles(chain_id, symbol, interval, limit)
+    if candles is None:
+        raise HTTPException(status_code=404, detail="No price history for this token")
+    # Encoded directly: the candle columns are NumPy arrays
+    return Response(
+        content=dumps({"chain": chain_id, "symbol": symbol, "interval": interval, "candles": candles}),
+        media_type="application/json",
+        headers={"Cache-Control": PRICES_CACHE_CONTROL},
+    )
+
 @app.get("/api/market-data")
 async def get_market_data():
     """Get comprehensive market data"""
     try:
-        market_data = {
+        market_data_summary = {
+            # No market-cap, TVL or gas feeds yet; these stay reference figures
             "total_market_cap": 2650000000000,  # $2.65T
-            "total_volume_24h": 85000000000,    # $85B
             "defi_tvl": 95000000000,            # $95B
-            "cross_chain_volume_24h": 1200000000, # $1.2B
-            "active_chains": 8,
             "supported_protocols": 45,
-            "trending_tokens": [
-                {"symbol": "ETH", "price": 3250.75, "change_24h": 2.45},
-                {"symbol": "SOL", "price": 162.30, "change_24h": -1.25},
-                {"symbol": "MATIC", "price": 0.845, "change_24h": 3.78},
-                {"symbol": "ARB", "price": 1.25, "change_24h": 5.20},
-                {"symbol": "OP", "price": 2.15, "change_24h": 1.80}
-            ],
+            **market_data.summary(),
             "gas_prices": {
                 "ethereum": {"standard": 25, "fast": 35, "instant": 45},
                 "polygon": {"standard": 30, "fast": 40, "instant": 50},
@@ -525,7 +957,7 @@ async def get_market_data():
             }
         }
         
-        return {"market_data": market_data, "timestamp": datetime.utcnow().isoformat()}
+        return {"market_data": market_data_summary, "timestamp": datetime.utcnow().isoformat()}
         
     except Exception as e:
         logger.error(f"Market data error: {str(e)}")
@@ -538,16 +970,40 @@ async def get_embed_quote(request: SwapRequest):
 
 # Developer SDK endpoints  
 @app.get("/api/sdk/widget-config")
-async def get_widget_config():
+async def get_widget_config(request: Request):
     """Get configuration for SYNC widget integration"""
-    return {
+    return response_cache.response("widget-config", 0, lambda: {
         "widget_version": "1.0.0",
         "supported_chains": list(SUPPORTED_CHAINS.keys()),
         "default_theme": "dark",
         "cdn_url": "https://cdn.sync.fm/widget/",
         "documentation": "https://docs.sync.fm/widget"
-    }
+    }, request, STATIC_CACHE_CONTROL)
+
+# Internal stats() counters, read at scrape time
+register_stats({
+    "quote_cache": quote_cache.stats,
+    "quote_single_flight": quote_flights.stats,
+    "portfolio_single_flight": portfolio_aggregator.lookups.stats,
+    "response_cache": response_cache.stats,
+    "tx_batcher": transaction_writer.stats,
+    "swap_pipeline": swap_pipeline.stats,
+    "idempotency": idempotency_store.stats,
+    "platform_stats": platform_stats.stats,
+    "ws": manager.stats,
+    "price_stream": price_stream.stats,
+    "price_history": price_history.stats,
+    "rate_limiter": rate_limiter.stats,
+    "load_shedder": load_shedder.stats,
+    "loop_lag": loop_lag_monitor.stats,
+    "gc": gc_pause_tracker.stats,
+})
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001, proxy_headers=True, forwarded_allow_ips="127.0.0.1")
\ No newline at end of file
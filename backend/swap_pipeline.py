@@ -0,0 +1,315 @@
+"""Asynchronous swap execution.
+
+``/api/swap`` only records a ``pending`` transaction. The ``transactions``
+collection doubles as the durable work queue: a bounded pool of worker
+coroutines claims active transactions with a lease (``lease_until``) and
+steps each one through its states
+
+    pending -> submitted -> bridging -> completed     (cross-chain)
+    pending -> submitted -> completed                 (same chain)
+                     any -> failed
+
+persisting every transition. Each claim writes a fresh lease token and
+every later write is conditional on it, so a worker can only write while
+its own claim is current, even when a sibling coroutine of the same
+process has re-claimed the transaction. If a process dies mid-swap its
+lease expires and any worker, in any process, resumes from the last
+persisted state, so executors must make each step idempotent per
+transaction id.
+While a step runs its worker renews the lease every ``heartbeat`` seconds;
+if the renewal finds the lease taken over, the step is cancelled.
+Listeners are told about every transition (WebSocket push, aggregates).
+"""
+import asyncio
+import logging
+import os
+import random
+import secrets
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SUBMITTED = "submitted"
+BRIDGING = "bridging"
+COMPLETED = "completed"
+FAILED = "failed"
+ACTIVE_STATES = [PENDING, SUBMITTED, BRIDGING]
+TERMINAL_STATES = [COMPLETED, FAILED]
+
+# Claim order: oldest active transaction whose lease is free or expired
+PIPELINE_INDEX = [("status", 1), ("lease_until", 1), ("created_at", 1)]
+
+Listener = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+class ExecutionError(Exception):
+    """A swap step failed for good (revert, rejected route); not retried."""
+
+
+class LeaseLost(Exception):
+    """Another worker took over the transaction while this one was running a step."""
+
+
+class SwapExecutor:
+    """One coroutine per transition; each returns fields stored with the new state."""
+
+    name = "base"
+
+    async def submit(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        """pending -> submitted: broadcast the source-chain transaction."""
+        raise NotImplementedError
+
+    async def bridge(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        """submitted -> bridging: source transaction confirmed, bridge transfer started."""
+        raise NotImplementedError
+
+    async def confirm(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        """submitted/bridging -> completed: funds delivered on the destination chain."""
+        raise NotImplementedError
+
+
+class FakeSwapExecutor(SwapExecutor):
+    """Local executor: sleeps ``step_delay`` per step and fails ``failure_rate`` of submissions."""
+
+    name = "fake"
+
+    def __init__(self, step_delay: float = 1.0, failure_rate: float = 0.0):
+        self.step_delay = step_delay
+        self.failure_rate = failure_rate
+
+    async def submit(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(self.step_delay)
+        if random.random() < self.failure_rate:
+            raise ExecutionError("Simulated transaction revert")
+        return {"tx_hash": "0x" + secrets.token_hex(32)}
+
+    async def bridge(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(self.step_delay)
+        return {"bridge_tx_hash": "0x" + secrets.token_hex(32)}
+
+    async def confirm(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(self.step_delay)
+        return {}
+
+
+def next_step(tx: Dict[str, Any]) -> Tuple[str, str]:
+    """``(executor method, resulting status)`` for an active transaction."""
+    status = tx["status"]
+    if status == PENDING:
+        return "submit", SUBMITTED
+    if status == SUBMITTED and tx["from_chain"] != tx["to_chain"]:
+        return "bridge", BRIDGING
+    return "confirm", COMPLETED
+
+
+class SwapPipeline:
+    STATS_COUNTERS = ("claimed", "completed", "failed", "retries", "lost_leases")
+
+    def __init__(self, collection_getter: Callable[[], Any], executor: SwapExecutor, workers: int = 8,
+                 lease: float = 30.0, poll_interval: float = 1.0, max_attempts: int = 3, retry_backoff: float = 2.0,
+                 heartbeat: Optional[float] = None):
+        """``collection_getter`` returns the transactions collection (resolved late, like the batcher).
+
+        ``heartbeat`` defaults to a third of ``lease``, so two renewals can fail before it expires.
+        """
+        self.collection_getter = collection_getter
+        self.executor = executor
+        self.workers = workers
+        self.lease = timedelta(seconds=lease)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.heartbeat = lease / 3 if heartbeat is None else heartbeat
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.claimed = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.lost_leases = 0
+        self.busy = 0
+        self._listeners: List[Listener] = []
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def add_listener(self, listener: Listener):
+        """Register ``await listener(tx, previous_status)`` for every persisted transition."""
+        self._listeners.append(listener)
+
+    def notify(self):
+        """Wake idle workers; call after inserting a pending transaction."""
+        self._wakeup.set()
+
+    async def ensure_indexes(self):
+        await self.collection_getter().create_index(PIPELINE_INDEX, name="swap_queue")
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.collection_getter().find_one_and_update(
+            {"status": {"$in": ACTIVE_STATES}, "$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}]},
+            # worker is informational; the per-claim lease token is what later writes check
+            {"$set": {"lease_until": now + self.lease, "worker": self.worker_id, "lease": uuid.uuid4().hex}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def _held(tx: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter matching ``tx`` only while the claim that loaded it is still current."""
+        return {"_id": tx["_id"], "status": tx["status"], "lease": tx["lease"]}
+
+    async def _transition(self, tx: Dict[str, Any], status: str, fields: Dict[str, Any]) -> bool:
+        """Persist ``status`` if this claim still holds the lease; notifies listeners."""
+        now = datetime.utcnow()
+        fields = {**fields, "status": status, "updated_at": now}
+        update: Dict[str, Any] = {"$set": fields}
+        if status in TERMINAL_STATES:
+            fields["completed_at"] = now
+            update["$unset"] = {"lease_until": "", "worker": "", "lease": ""}
+        else:
+            fields["lease_until"] = now + self.lease
+        result = await self.collection_getter().update_one(self._held(tx), update)
+        if not result.modified_count:
+            # Lease expired and another claim took over
+            self.lost_leases += 1
+            return False
+        previous = tx["status"]
+        tx.update(fields)
+        if status in TERMINAL_STATES:
+            for field in update["$unset"]:
+                tx.pop(field, None)
+        for listener in self._listeners:
+            try:
+                await listener(tx, previous)
+            except Exception as e:
+                logger.error(f"Swap pipeline listener error: {str(e)}")
+        return True
+
+    async def _renew(self, tx: Dict[str, Any]) -> bool:
+        """Push the lease out; False once another claim holds the transaction."""
+        result = await self.collection_getter().update_one(
+            self._held(tx), {"$set": {"lease_until": datetime.utcnow() + self.lease}},
+        )
+        return bool(result.matched_count)
+
+    async def _step(self, tx: Dict[str, Any], method: str) -> Dict[str, Any]:
+        """Run one executor step, renewing the lease until it finishes; raises ``LeaseLost``."""
+        step = asyncio.ensure_future(getattr(self.executor, method)(tx))
+        try:
+            while True:
+                done, _ = await asyncio.wait({step}, timeout=self.heartbeat)
+                if done:
+                    return step.result()
+                try:
+                    renewed = await self._renew(tx)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Still ours until the lease runs out; the next heartbeat tries again
+                    logger.error(f"Swap {tx.get('id')} lease renewal error: {str(e)}")
+                    continue
+                if not renewed:
+                    self.lost_leases += 1
+                    raise LeaseLost()
+        finally:
+            if not step.done():
+                step.cancel()
+                await asyncio.gather(step, return_exceptions=True)
+
+    async def _process(self, tx: Dict[str, Any]):
+        while tx["status"] in ACTIVE_STATES:
+            method, status = next_step(tx)
+            try:
+                fields = await self._step(tx, method)
+            except asyncio.CancelledError:
+                raise
+            except LeaseLost:
+                logger.info(f"Swap {tx.get('id')} lease lost during {method}; step cancelled")
+                return
+            except ExecutionError as e:
+                await self._fail(tx, str(e))
+                return
+            except Exception as e:
+                attempts = tx.get("attempts", 0) + 1
+                if attempts >= self.max_attempts:
+                    await self._fail(tx, f"{method} failed after {attempts} attempts: {str(e)}")
+                    return
+                # Keep the state, push the lease out to back off, and let any worker retry
+                result = await self.collection_getter().update_one(
+                    self._held(tx),
+                    {"$set": {
+                        "attempts": attempts,
+                        "last_error": str(e),
+                        "lease_until": datetime.utcnow() + timedelta(seconds=self.retry_backoff * attempts),
+                    }},
+                )
+                if not result.modified_count:
+                    self.lost_leases += 1
+                    logger.info(f"Swap {tx.get('id')} lease lost during {method}; retry not recorded")
+                    return
+                self.retries += 1
+                logger.info(f"Swap {tx.get('id')} {method} failed, retrying: {str(e)}")
+                return
+            if not await self._transition(tx, status, fields):
+                return
+        if tx["status"] == COMPLETED:
+            self.completed += 1
+
+    async def _fail(self, tx: Dict[str, Any], error: str):
+        if await self._transition(tx, FAILED, {"error": error}):
+            self.failed += 1
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                tx = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Swap pipeline claim error: {str(e)}")
+                tx = None
+            if tx is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.claimed += 1
+            self.busy += 1
+            try:
+                await self._process(tx)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Swap pipeline error on {tx.get('id')}: {str(e)}")
+            finally:
+                self.busy -= 1
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers; swaps they held resume elsewhere once their leases expire."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor.name,
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "lost_leases": self.lost_leases,
+        }
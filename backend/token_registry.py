@@ -0,0 +1,178 @@
+"""In-memory token registry with O(1) lookup by symbol and by address."""
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRecord:
+    """Compact token entry; one per (chain, address)."""
+
+    __slots__ = ("symbol", "name", "address", "decimals", "chain_id", "logo_url", "price_usd")
+
+    def __init__(self, symbol: str, name: str, address: str, decimals: int, chain_id: str,
+                 logo_url: Optional[str] = None, price_usd: Optional[float] = None):
+        self.symbol = symbol
+        self.name = name
+        self.address = address
+        self.decimals = decimals
+        self.chain_id = chain_id
+        self.logo_url = logo_url
+        self.price_usd = price_usd
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "name": self.name,
+            "address": self.address,
+            "decimals": self.decimals,
+            "chain_id": self.chain_id,
+            "logo_url": self.logo_url,
+            "price_usd": self.price_usd,
+        }
+
+    def __repr__(self) -> str:
+        return f"TokenRecord({self.chain_id}:{self.symbol} {self.address})"
+
+
+def normalize_address(address: str) -> str:
+    # EVM addresses are case-insensitive hex; base58 addresses (Solana) are not
+    return address.lower() if address.startswith("0x") else address
+
+
+class TokenRegistry:
+    """Tokens indexed by (chain, symbol) and (chain, address).
+
+    Symbols are matched exactly, as the API has always done. When a token list
+    carries two tokens with the same symbol on one chain, the first one loaded
+    wins the symbol slot; both remain reachable by address.
+    """
+
+    def __init__(self):
+        self._by_symbol: Dict[Tuple[str, str], TokenRecord] = {}
+        self._by_address: Dict[Tuple[str, str], TokenRecord] = {}
+        self._by_chain: Dict[str, List[TokenRecord]] = {}
+        self._price_listeners: List[Callable[[str, str, float], None]] = []
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._by_address)
+
+    def add(self, record: TokenRecord) -> TokenRecord:
+        address_key = (record.chain_id, normalize_address(record.address))
+        existing = self._by_address.get(address_key)
+        if existing is not None:
+            # Re-loading a known token refreshes its metadata in place
+            old_symbol = existing.symbol
+            for field in TokenRecord.__slots__:
+                value = getattr(record, field)
+                if value is not None:
+                    setattr(existing, field, value)
+            if existing.symbol != old_symbol:
+                self._reindex_symbol(existing, old_symbol)
+            self.version += 1
+            return existing
+        self._by_address[address_key] = record
+        self._by_symbol.setdefault((record.chain_id, record.symbol), record)
+        self._by_chain.setdefault(record.chain_id, []).append(record)
+        self.version += 1
+        return record
+
+    def _reindex_symbol(self, record: TokenRecord, old_symbol: str):
+        old_key = (record.chain_id, old_symbol)
+        if self._by_symbol.get(old_key) is record:
+            del self._by_symbol[old_key]
+            # Hand the old symbol to the next token on the chain that still carries it
+            for other in self._by_chain.get(record.chain_id, []):
+                if other.symbol == old_symbol:
+                    self._by_symbol[old_key] = other
+                    break
+        self._by_symbol.setdefault((record.chain_id, record.symbol), record)
+
+    def load_tokens(self, tokens: Dict[str, Iterable[Any]]) -> int:
+        """Load a {chain_id: [Token, ...]} mapping such as POPULAR_TOKENS."""
+        count = 0
+        for chain_id, chain_tokens in tokens.items():
+            for token in chain_tokens:
+                self.add(TokenRecord(
+                    symbol=token.symbol,
+                    name=token.name,
+                    address=token.address,
+                    decimals=token.decimals,
+                    chain_id=chain_id,
+                    logo_url=token.logo_url,
+                    price_usd=token.price_usd,
+                ))
+                count += 1
+        return count
+
+    def load_token_list(self, path: str, chain_ids: Dict[int, str]) -> int:
+        """Bulk-load a token-list JSON file.
+
+        Accepts the common token-list format (``{"tokens": [{"chainId": 1, ...}]}``)
+        where ``chainId`` is numeric and mapped through ``chain_ids``, as well as
+        entries that carry our own string ``chain_id``. Entries for chains we do
+        not support are skipped.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        entries = data.get("tokens", []) if isinstance(data, dict) else data
+        count = 0
+        skipped = 0
+        for entry in entries:
+            chain_id = entry.get("chain_id")
+            if chain_id is None:
+                chain_id = chain_ids.get(entry.get("chainId"))
+            if chain_id is None:
+                skipped += 1
+                continue
+            try:
+                record = TokenRecord(
+                    symbol=entry["symbol"],
+                    name=entry.get("name", entry["symbol"]),
+                    address=entry["address"],
+                    decimals=int(entry["decimals"]),
+                    chain_id=chain_id,
+                    logo_url=entry.get("logoURI", entry.get("logo_url")),
+                    price_usd=entry.get("price_usd"),
+                )
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            self.add(record)
+            count += 1
+
+        logger.info(f"Loaded {count} tokens from {path} ({skipped} skipped)")
+        return count
+
+    def get_by_symbol(self, chain_id: str, symbol: str) -> Optional[TokenRecord]:
+        return self._by_symbol.get((chain_id, symbol))
+
+    def get_by_address(self, chain_id: str, address: str) -> Optional[TokenRecord]:
+        return self._by_address.get((chain_id, normalize_address(address)))
+
+    def tokens_for_chain(self, chain_id: str) -> List[TokenRecord]:
+        return self._by_chain.get(chain_id, [])
+
+    def chains(self) -> List[str]:
+        return list(self._by_chain.keys())
+
+    def add_price_listener(self, listener: Callable[[str, str, float], None]):
+        """Register ``listener(chain_id, symbol, price)`` for price changes."""
+        self._price_listeners.append(listener)
+
+    def update_price(self, chain_id: str, symbol: str, price: float) -> bool:
+        """Set the USD price of a token; returns True if it changed."""
+        record = self._by_symbol.get((chain_id, symbol))
+        if record is None or record.price_usd == price:
+            return False
+        record.price_usd = price
+        self.version += 1
+        for listener in self._price_listeners:
+            try:
+                listener(chain_id, symbol, price)
+            except Exception as e:
+                logger.error(f"Price listener error: {str(e)}")
+        return True
@@ -0,0 +1,149 @@
+"""Transaction history queries: indexes, keyset cursors, projection and streaming export."""
+import base64
+import binascii
+import csv
+import io
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from response_cache import dumps
+
+# Newest-first history per user; _id breaks ties between equal timestamps
+HISTORY_INDEX = [("user_address", 1), ("created_at", -1), ("_id", -1)]
+
+# Fields the UI renders
+HISTORY_FIELDS = [
+    "id", "user_address", "from_chain", "to_chain", "from_token", "to_token",
+    "from_amount", "to_amount", "status", "tx_hash", "bridge_tx_hash", "error",
+]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def format_datetime(value: datetime) -> str:
+    # Mongo stores datetimes with millisecond precision, so this round-trips exactly
+    return value.isoformat(timespec="milliseconds")
+
+
+def encode_cursor(created_at: datetime, object_id: str) -> str:
+    raw = f"{format_datetime(created_at)}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, object_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def history_pipeline(user_address: str, before: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Aggregation returning one page plus one look-ahead row.
+
+    ObjectIds are converted to strings by Mongo in ``$project``; datetimes
+    stay native so ``paginate`` can build the cursor from the stored value.
+    """
+    match: Dict[str, Any] = {"user_address": user_address}
+    if before:
+        created_at, object_id = decode_cursor(before)
+        match["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": object_id}},
+        ]
+
+    projection: Dict[str, Any] = {field: 1 for field in HISTORY_FIELDS}
+    projection["_id"] = {"$toString": "$_id"}
+    projection["created_at"] = projection["completed_at"] = 1
+
+    return [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": projection},
+    ]
+
+
+def paginate(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Split off the look-ahead row, build the cursor for the next page and render dates."""
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]["created_at"], page[-1]["_id"]) if len(rows) > limit else None
+    for row in page:
+        for field in ("created_at", "completed_at"):
+            # completed_at is missing until the swap pipeline finishes the transaction
+            value = row.get(field)
+            row[field] = format_datetime(value) if isinstance(value, datetime) else value
+    return page, next_cursor
+
+
+# Full history export, oldest first
+EXPORT_FIELDS = HISTORY_FIELDS + ["created_at", "completed_at"]
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def content_disposition(user_address: str, fmt: str) -> str:
+    """Attachment header for an export.
+
+    The address is client input: ``filename`` gets only its alphanumerics and
+    the RFC 5987 ``filename*`` the exact name, percent-encoded.
+    """
+    filename = f"transactions-{user_address}.{fmt}"
+    fallback = f"transactions-{re.sub(r'[^0-9A-Za-z]', '', user_address)}.{fmt}"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _export_value(value: Any) -> Any:
+    return format_datetime(value) if isinstance(value, datetime) else value
+
+
+async def export_transactions(collection, user_address: str, fmt: str, batch_size: int = 500) -> AsyncIterator[Union[bytes, str]]:
+    """Stream every transaction of a user as NDJSON lines or CSV rows.
+
+    Documents come off the Motor cursor ``batch_size`` at a time and each
+    batch is yielded as one chunk, so memory stays flat regardless of how
+    long the history is. NDJSON chunks are orjson-encoded bytes; CSV chunks
+    are text.
+    """
+    cursor = collection.find(
+        {"user_address": user_address},
+        {field: 1 for field in EXPORT_FIELDS} | {"_id": 0},
+    ).sort([("created_at", 1), ("_id", 1)]).batch_size(batch_size)
+
+    if fmt != "csv":
+        lines: List[bytes] = []
+        async for document in cursor:
+            lines.append(dumps({field: _export_value(document.get(field)) for field in EXPORT_FIELDS}))
+            if len(lines) >= batch_size:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    pending = 0
+
+    async for document in cursor:
+        writer.writerow([_export_value(document.get(field)) for field in EXPORT_FIELDS])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,193 @@
+"""Group-commit writer: coalesces concurrent inserts into ``insert_many`` batches."""
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative ``le`` buckets, like Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class BatcherStopped(Exception):
+    """The batcher was stopped before (or while) writing the document."""
+
+
+class _Pending:
+    __slots__ = ("document", "future", "enqueued")
+
+    def __init__(self, document: Dict[str, Any], future: asyncio.Future):
+        self.document = document
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class InsertBatcher:
+    """Write-behind inserter for one collection.
+
+    ``insert`` queues a document and resolves with its inserted ``_id`` once
+    the batch holding it has been written. A batch is flushed when it reaches
+    ``max_batch`` documents or when its oldest document has waited
+    ``max_delay`` seconds, whichever comes first.
+    """
+
+    STATS_COUNTERS = ("documents_written", "write_errors")
+
+    def __init__(self, collection: Callable[[], Any], max_batch: int = 100, max_delay: float = 0.005):
+        self._collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[_Pending] = []
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.flush_latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.documents_written = 0
+        self.write_errors = 0
+
+    async def insert(self, document: Dict[str, Any]) -> Any:
+        if self._task is None:
+            # Not running (e.g. scripts without app startup): write through
+            result = await self._collection().insert_one(document)
+            return result.inserted_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_Pending(document, future))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._pending:
+                    self._has_items.clear()
+                    await self._has_items.wait()
+                deadline = self._pending[0].enqueued + self.max_delay
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._full.clear()
+                    try:
+                        await asyncio.wait_for(self._full.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                await self._flush(batch)
+        except asyncio.CancelledError:
+            if not self._stopping:
+                # Cancelled outside stop(): nothing will drain the queue
+                self._fail(self._pending, BatcherStopped("Insert batcher stopped"))
+                self._pending = []
+            raise
+
+    @staticmethod
+    def _fail(items: List[_Pending], error: Exception):
+        for item in items:
+            if not item.future.done():
+                item.future.set_exception(error)
+
+    async def _flush(self, batch: List[_Pending]):
+        started = time.monotonic()
+        for item in batch:
+            self.queue_wait.observe(started - item.enqueued)
+        documents = [item.document for item in batch]
+        failed: Dict[int, Exception] = {}
+        try:
+            # insert_many assigns _id on each document in place
+            await self._collection().insert_many(documents, ordered=False)
+        except asyncio.CancelledError:
+            # Whether the write landed is unknown; answer the callers instead of leaving them waiting
+            self._fail(batch, BatcherStopped("Insert batcher stopped during the write; outcome unknown"))
+            raise
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = Exception(error.get("errmsg", "write error"))
+        except Exception as e:
+            logger.error(f"Batch insert error: {str(e)}")
+            failed = {i: e for i in range(len(batch))}
+
+        self.batch_size.observe(len(batch))
+        self.flush_latency.observe(time.monotonic() - started)
+        self.documents_written += len(batch) - len(failed)
+        self.write_errors += len(failed)
+
+        for i, item in enumerate(batch):
+            if item.future.done():
+                continue
+            if i in failed:
+                item.future.set_exception(failed[i])
+            else:
+                item.future.set_result(item.document["_id"])
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out anything still queued."""
+        self._stopping = True
+        try:
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                self._task = None
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                await self._flush(batch)
+        finally:
+            self._stopping = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch,
+            "max_delay_seconds": self.max_delay,
+            "pending": len(self._pending),
+            "documents_written": self.documents_written,
+            "write_errors": self.write_errors,
+            "batch_size": self.batch_size.snapshot(),
+            "flush_latency_seconds": self.flush_latency.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
@@ -0,0 +1,308 @@
+"""Load and latency benchmarks for the SYNC API.
+
+Drives the FastAPI app in-process, either straight through
+``httpx.ASGITransport`` (no sockets, measures the app itself) or through a
+uvicorn server started on a free local port (adds HTTP parsing and the
+event loop's socket handling). WebSocket fan-out always runs over uvicorn.
+
+Mongo is mongomock (``pip install mongomock-motor``) unless ``--mongo-url``
+points at a real mongod.
+
+    python backend_bench.py                          # all scenarios, ASGI transport
+    python backend_bench.py --transport uvicorn -n 2000 -c 64
+    python backend_bench.py --save bench_baseline.json
+    python backend_bench.py --compare bench_baseline.json --tolerance 0.2
+
+``--compare`` exits non-zero when a scenario's p95 grows or its throughput
+drops by more than the tolerance relative to the saved baseline.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import socket
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+SCENARIOS = ["quote", "swap", "transactions", "prices", "ws_fanout"]
+USER_ADDRESS = "0x1234567890abcdef1234567890abcdef12345678"
+QUOTE_AMOUNTS = ["0.5", "1", "2.5", "10", "42"]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int, unit: str = "req") -> Dict[str, Any]:
+    samples = np.asarray(latencies, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if samples.size else (0.0, 0.0, 0.0)
+    return {
+        "scenario": name,
+        "count": int(samples.size),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(samples.size / elapsed, 1) if elapsed else 0.0,
+        "unit": unit,
+        "mean_ms": round(float(samples.mean()), 3) if samples.size else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples.max()), 3) if samples.size else 0.0,
+    }
+
+
+async def run_load(name: str, call: Callable[[int], Awaitable[httpx.Response]], total: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``total`` calls from ``concurrency`` workers; ``call(i)`` sends request i."""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            start = time.perf_counter()
+            try:
+                response = await call(i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - start, errors)
+
+
+def swap_body(i: int) -> Dict[str, Any]:
+    return {
+        "from_chain": "ethereum",
+        "to_chain": "solana",
+        "from_token": "ETH",
+        "to_token": "SOL",
+        "amount": QUOTE_AMOUNTS[i % len(QUOTE_AMOUNTS)],
+        "slippage": 0.5,
+        "user_address": USER_ADDRESS,
+    }
+
+
+async def scenario_quote(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    # A handful of distinct amounts: mostly cache hits once warm, like real traffic
+    return await run_load("quote", lambda i: client.post("/api/quote", json=swap_body(i)), args.requests, args.concurrency)
+
+
+async def scenario_swap(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    return await run_load("swap", lambda i: client.post("/api/swap", json=swap_body(i)), args.requests, args.concurrency)
+
+
+async def scenario_transactions(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    # Needs history to page through; the swap scenario leaves some, top up otherwise
+    seeded = (await client.get(f"/api/transactions/{USER_ADDRESS}", params={"limit": 50})).json()
+    if len(seeded.get("transactions", [])) < 50:
+        await run_load("seed", lambda i: client.post("/api/swap", json=swap_body(i)), 200, args.concurrency)
+    return await run_load(
+        "transactions",
+        lambda i: client.get(f"/api/transactions/{USER_ADDRESS}", params={"limit": 50}),
+        args.requests, args.concurrency,
+    )
+
+
+async def scenario_prices(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    return await run_load("prices", lambda i: client.get("/api/prices"), args.requests, args.concurrency)
+
+
+async def scenario_ws_fanout(base_url: str, args) -> Dict[str, Any]:
+    """Publish ``--ws-messages`` messages to ``--ws-clients`` subscribers and time each delivery."""
+    import websockets
+    from server import manager
+
+    topic = "chain:ethereum"
+    url = base_url.replace("http://", "ws://") + "/api/ws"
+    latencies: List[float] = []
+    sockets = []
+    try:
+        for _ in range(args.ws_clients):
+            ws = await websockets.connect(url, max_queue=None)
+            await ws.send(json.dumps({"type": "subscribe", "topics": [topic]}))
+            await ws.recv()  # subscribed ack
+            sockets.append(ws)
+
+        async def receive(ws):
+            received = 0
+            while received < args.ws_messages:
+                message = json.loads(await ws.recv())
+                if message.get("type") != "bench":
+                    continue  # transaction updates from the swap pipeline share the chain topic
+                latencies.append(time.perf_counter() - message["sent_at"])
+                received += 1
+
+        receivers = [asyncio.create_task(receive(ws)) for ws in sockets]
+        start = time.perf_counter()
+        for seq in range(args.ws_messages):
+            # Same process as the server, so perf_counter timestamps are comparable
+            await manager.publish([topic], {"type": "bench", "seq": seq, "sent_at": time.perf_counter()})
+            await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(*receivers), timeout=60)
+        elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+    expected = args.ws_clients * args.ws_messages
+    result = summarize("ws_fanout", latencies, elapsed, expected - len(latencies), unit="msg")
+    result["clients"] = args.ws_clients
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """uvicorn serving the app inside this event loop."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def __aenter__(self):
+        self.task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.should_exit = True
+        await self.task
+
+
+def load_app(mongo_url: Optional[str]):
+    sys.path.insert(0, BACKEND_DIR)
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+    # Every scenario uses one address; measure the endpoints, not the rate limiter
+    for kind in ("API_KEY", "ADDRESS", "IP"):
+        os.environ.setdefault(f"RATE_LIMIT_{kind}_RPS", "0")
+    import server
+
+    if not mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.db = AsyncMongoMockClient().sync_db
+    return server.app
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    app = load_app(args.mongo_url)
+    results = []
+
+    async with contextlib.AsyncExitStack() as stack:
+        local = None
+        if args.transport == "uvicorn" or "ws_fanout" in args.scenarios:
+            # uvicorn runs the startup/shutdown handlers itself
+            local = await stack.enter_async_context(LocalServer(app))
+        else:
+            await app.router.startup()
+            stack.push_async_callback(app.router.shutdown)
+
+        if args.transport == "asgi":
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        else:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            client = httpx.AsyncClient(base_url=local.url, limits=limits, timeout=30)
+        async with client:
+            for name in args.scenarios:
+                if name == "ws_fanout":
+                    continue
+                scenario = globals()[f"scenario_{name}"]
+                # Warm caches, pools and code paths before measuring
+                await scenario(client, argparse.Namespace(**{**vars(args), "requests": min(args.requests, 50)}))
+                results.append(await scenario(client, args))
+                print_result(results[-1])
+
+        if "ws_fanout" in args.scenarios:
+            results.append(await scenario_ws_fanout(local.url, args))
+            print_result(results[-1])
+    return results
+
+
+def print_result(r: Dict[str, Any]):
+    print(f"{r['scenario']:<13} {r['count']:>7} {r['unit']:<3} {r['throughput']:>10.1f}/s "
+          f"p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base is None:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}: p95 {base['p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms")
+        if r["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}: throughput {base['throughput']:.1f}/s -> {r['throughput']:.1f}/s")
+        if r["errors"] > base["errors"]:
+            regressions.append(f"{r['scenario']}: errors {base['errors']} -> {r['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="requests per HTTP scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--ws-clients", type=int, default=100)
+    parser.add_argument("--ws-messages", type=int, default=50)
+    parser.add_argument("--mongo-url", help="real mongod instead of mongomock")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "transport": args.transport,
+                "concurrency": args.concurrency,
+                "mongo": "mongod" if args.mongo_url else "mongomock",
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
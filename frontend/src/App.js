@@ -4,6 +4,7 @@ import Portfolio from './components/Portfolio';
 import AdvancedPortfolio from './components/AdvancedPortfolio';
 import RealTimeUpdates from './components/RealTimeUpdates';
 import WalletManager from './utils/WalletManager';
+import SwapSubmitter from './utils/SwapSubmitter';
 import SoundSystem from './utils/SoundSystem';
 import { ThemeProvider, ThemeSwitcher, useTheme } from './utils/ThemeSystem';
 
@@ -345,10 +346,10 @@ function LandingPage({ setCurrentSection, platformStats, supportedChains, connec
       <section className="py-20 px-4">
         <div className="max-w-6xl mx-auto">
           <div className="grid md:grid-cols-4 gap-8 text-center">
-            <StatCard label="Transaction Volume" value={platformStats.transaction_volume || "$50M+"} />
-            <StatCard label="Success Rate" value={platformStats.success_rate || "99.9%"} />
-            <StatCard label="Integrated dApps" value={platformStats.integrated_dapps || "50+"} />
-            <StatCard label="Happy Users" value={platformStats.happy_users || "100K+"} />
+            <StatCard label="Transaction Volume" value={formatCompact(platformStats.transaction_volume, "$")} />
+            <StatCard label="Success Rate" value={platformStats.success_rate != null ? `${platformStats.success_rate}%` : "–"} />
+            <StatCard label="Avg. Execution Time" value={platformStats.average_execution_time != null ? `${platformStats.average_execution_time}s` : "–"} />
+            <StatCard label="Unique Users" value={formatCompact(platformStats.unique_users)} />
           </div>
         </div>
       </section>
@@ -387,6 +388,11 @@ function FeatureCard({ title, description, icon }) {
 }
 
 // Stat Card Component
+function formatCompact(value, prefix = "") {
+  if (value == null) return "–";
+  return prefix + new Intl.NumberFormat('en-US', { notation: 'compact', maximumFractionDigits: 1 }).format(value);
+}
+
 function StatCard({ label, value }) {
   return (
     <div className="p-6 bg-gradient-to-br from-purple-900/30 to-pink-900/30 rounded-xl border border-purple-500/20">
@@ -405,6 +411,7 @@ function SwapInterface({ walletConnected, userAddress, supportedChains, connectW
   const [amount, setAmount] = useState('');
   const [quote, setQuote] = useState(null);
   const [swapLoading, setSwapLoading] = useState(false);
+  const [swapSubmitter] = useState(() => new SwapSubmitter());
 
   const getQuote = async () => {
     if (!amount || !walletConnected) return;
@@ -437,18 +444,15 @@ function SwapInterface({ walletConnected, userAddress, supportedChains, connectW
     
     setSwapLoading(true);
     try {
-      const response = await fetch(`${BACKEND_URL}/api/swap`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          from_chain: fromChain,
-          to_chain: toChain,
-          from_token: fromToken,
-          to_token: toToken,
-          amount: amount,
-          slippage: 0.5,
-          user_address: userAddress
-        })
+      // Retries of this swap reuse its Idempotency-Key, so it executes at most once
+      const response = await swapSubmitter.submit(`${BACKEND_URL}/api/swap`, {
+        from_chain: fromChain,
+        to_chain: toChain,
+        from_token: fromToken,
+        to_token: toToken,
+        amount: amount,
+        slippage: 0.5,
+        user_address: userAddress
       });
       
       if (!response.ok) {
@@ -461,12 +465,12 @@ function SwapInterface({ walletConnected, userAddress, supportedChains, connectW
       const successDiv = document.createElement('div');
       successDiv.className = 'fixed top-20 right-4 z-50 p-6 bg-green-600 text-white rounded-xl max-w-sm shadow-2xl transform transition-all duration-300';
       successDiv.innerHTML = `
-        <div class="font-bold text-lg mb-2">🎉 Swap Successful!</div>
+        <div class="font-bold text-lg mb-2">🚀 Swap Submitted!</div>
         <div class="text-sm opacity-90 mb-2">
           ${amount} ${fromToken} → ${data.to_amount} ${toToken}
         </div>
         <div class="text-xs opacity-75">
-          Transaction: ${data.tx_hash?.slice(0, 20)}...
+          Transaction: ${data.transaction_id?.slice(0, 20)}... (${data.status})
         </div>
       `;
       
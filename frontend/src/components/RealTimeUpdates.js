@@ -98,6 +98,8 @@ function RealTimeUpdates({ userAddress, onUpdate }) {
       showNotification('Transaction Started', 'Your cross-chain swap has been initiated', 'info');
     } else if (data.type === 'transaction_completed') {
       showNotification('Transaction Completed', 'Your cross-chain swap was successful!', 'success');
+    } else if (data.type === 'transaction_failed') {
+      showNotification('Transaction Failed', data.transaction?.error || 'Your cross-chain swap failed', 'error');
     } else if (data.type === 'price_update') {
       showNotification('Price Update', `${data.token} price updated`, 'info');
     }
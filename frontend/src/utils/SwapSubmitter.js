@@ -0,0 +1,61 @@
+// Swap submission with one Idempotency-Key per logical swap
+// The key is reused for every retry of the same swap (timeouts, network errors, "try again" clicks)
+// and only dropped once the API gives a definitive answer, so a retried swap is never executed twice.
+
+// Answers that say nothing about whether the swap ran: retry with the same key
+const RETRYABLE_STATUSES = new Set([409, 429, 502, 503, 504]);
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+class SwapSubmitter {
+  constructor({ attempts = 3, timeoutMs = 15000, backoffMs = 1000 } = {}) {
+    this.attempts = attempts;
+    this.timeoutMs = timeoutMs;
+    this.backoffMs = backoffMs;
+    this.pending = null;
+  }
+
+  async submit(url, body, headers = {}) {
+    const payload = JSON.stringify(body);
+    // A different request body is a different swap and needs its own key
+    if (!this.pending || this.pending.payload !== payload) {
+      this.pending = { payload, key: crypto.randomUUID() };
+    }
+    const { key } = this.pending;
+
+    for (let attempt = 1; ; attempt++) {
+      let response;
+      try {
+        response = await this.post(url, payload, { ...headers, 'Idempotency-Key': key });
+      } catch (error) {
+        // Timed out or never reached the API; the key is kept for the next submit
+        if (attempt >= this.attempts) throw error;
+        await sleep(this.backoffMs * attempt);
+        continue;
+      }
+      if (!RETRYABLE_STATUSES.has(response.status)) {
+        this.pending = null;
+        return response;
+      }
+      if (attempt >= this.attempts) return response;
+      await sleep(this.backoffMs * attempt);
+    }
+  }
+
+  async post(url, payload, headers) {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), this.timeoutMs);
+    try {
+      return await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', ...headers },
+        body: payload,
+        signal: controller.signal
+      });
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+}
+
+export default SwapSubmitter;
@@ -1,20 +1,88 @@
 // SYNC Widget SDK - Embeddable Cross-Chain Swap Widget
+import SwapSubmitter from './SwapSubmitter';
+
 class SyncWidget {
   constructor(options = {}) {
     this.containerId = options.containerId || 'sync-widget';
     this.theme = options.theme || 'dark';
     this.chains = options.chains || ['ethereum', 'polygon', 'arbitrum', 'solana'];
     this.apiUrl = options.apiUrl || 'https://api.sync.fm';
+    // Partner key and end-user identity for the API's per-client rate limits
+    this.apiKey = options.apiKey || null;
+    this.userAddress = options.userAddress || this.anonymousUserId();
     this.onSwapComplete = options.onSwapComplete || (() => {});
     this.onError = options.onError || (() => {});
+    this.onPriceUpdate = options.onPriceUpdate || null;
+    this.prices = {};
+    this.priceSource = null;
+    this.swapSubmitter = new SwapSubmitter();
     
     this.init();
   }
 
+  // Stable per-browser id for users without a connected wallet
+  anonymousUserId() {
+    const storageKey = 'sync-widget-user';
+    try {
+      let id = window.localStorage.getItem(storageKey);
+      if (!id) {
+        id = `widget_${crypto.randomUUID()}`;
+        window.localStorage.setItem(storageKey, id);
+      }
+      return id;
+    } catch (error) {
+      return `widget_${crypto.randomUUID()}`;
+    }
+  }
+
+  requestHeaders(extra = {}) {
+    const headers = { 'Content-Type': 'application/json', ...extra };
+    if (this.apiKey) {
+      headers['X-API-Key'] = this.apiKey;
+    }
+    return headers;
+  }
+
   init() {
     this.createStyles();
     this.createWidget();
     this.bindEvents();
+    if (this.onPriceUpdate) {
+      this.streamPrices();
+    }
+  }
+
+  // Live prices over Server-Sent Events: one full snapshot, then deltas
+  streamPrices() {
+    if (typeof EventSource === 'undefined' || this.priceSource) return;
+
+    this.priceSource = new EventSource(`${this.apiUrl}/api/prices/stream`);
+
+    this.priceSource.addEventListener('snapshot', (event) => {
+      const data = JSON.parse(event.data);
+      this.prices = data.prices;
+      this.onPriceUpdate(this.prices, []);
+    });
+
+    this.priceSource.addEventListener('delta', (event) => {
+      const data = JSON.parse(event.data);
+      data.changes.forEach(change => {
+        this.prices[change.chain] = this.prices[change.chain] || {};
+        this.prices[change.chain][change.symbol] = {
+          ...this.prices[change.chain][change.symbol],
+          price: change.price,
+          change_24h: change.change_24h
+        };
+      });
+      this.onPriceUpdate(this.prices, data.changes);
+    });
+  }
+
+  stopPriceStream() {
+    if (this.priceSource) {
+      this.priceSource.close();
+      this.priceSource = null;
+    }
   }
 
   createStyles() {
@@ -264,9 +332,7 @@ class SyncWidget {
     try {
       const response = await fetch(`${this.apiUrl}/api/quote`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers: this.requestHeaders(),
         body: JSON.stringify({
           from_chain: formData.fromChain,
           to_chain: formData.toChain,
@@ -274,7 +340,7 @@ class SyncWidget {
           to_token: formData.toToken,
           amount: formData.amount,
           slippage: 0.5,
-          user_address: 'widget_user'
+          user_address: this.userAddress
         })
       });
 
@@ -304,21 +370,16 @@ class SyncWidget {
     document.getElementById('swap-button').disabled = true;
 
     try {
-      const response = await fetch(`${this.apiUrl}/api/swap`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          from_chain: formData.fromChain,
-          to_chain: formData.toChain,
-          from_token: formData.fromToken,
-          to_token: formData.toToken,
-          amount: formData.amount,
-          slippage: 0.5,
-          user_address: 'widget_user'
-        })
-      });
+      // Retries of this swap reuse its Idempotency-Key, so it executes at most once
+      const response = await this.swapSubmitter.submit(`${this.apiUrl}/api/swap`, {
+        from_chain: formData.fromChain,
+        to_chain: formData.toChain,
+        from_token: formData.fromToken,
+        to_token: formData.toToken,
+        amount: formData.amount,
+        slippage: 0.5,
+        user_address: this.userAddress
+      }, this.requestHeaders());
 
       const data = await response.json();
       
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (``from quote_cache import ...``)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+@pytest.fixture
+def server():
+    """The API module with a fresh in-memory Mongo and rate limits off."""
+    for kind in ("API_KEY", "ADDRESS", "IP"):
+        os.environ.setdefault(f"RATE_LIMIT_{kind}_RPS", "0")
+    import server as module
+    from mongomock_motor import AsyncMongoMockClient
+
+    module.db = AsyncMongoMockClient().sync_db
+    module.quote_cache.clear()
+    return module
@@ -0,0 +1,101 @@
+import asyncio
+from collections import OrderedDict
+
+import orjson
+
+from admission import ADDRESS, API_KEY, IP, RateLimiter, identify
+
+
+def scope(method="GET", path="/api/prices", headers=(), client=("10.0.0.1", 5000)):
+    return {"type": "http", "method": method, "path": path, "headers": list(headers), "client": client}
+
+
+def run_identify(scope, route, body=b""):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def scenario():
+        identities, replay = await identify(scope, route, receive)
+        return identities, (await replay())["body"]
+
+    return asyncio.run(scenario())
+
+
+def test_ip_is_always_charged():
+    identities, _ = run_identify(scope(), "/api/prices")
+    assert identities == [(IP, "10.0.0.1")]
+
+    identities, _ = run_identify(
+        scope(path="/api/transactions/0xABC", headers=[(b"x-api-key", b"partner")]),
+        "/api/transactions/{user_address}",
+    )
+    assert identities == [(IP, "10.0.0.1"), (API_KEY, "partner"), (ADDRESS, "0xabc")]
+
+
+def test_body_address_is_added_and_body_replayed():
+    body = orjson.dumps({"user_address": "0xDEF", "amount": "1"})
+    request = scope("POST", "/api/swap", [(b"content-type", b"application/json"),
+                                          (b"content-length", str(len(body)).encode())])
+    identities, replayed = run_identify(request, "/api/swap", body)
+    assert identities == [(IP, "10.0.0.1"), (ADDRESS, "0xdef")]
+    assert replayed == body
+
+
+def test_rotating_addresses_do_not_escape_the_ip_limit():
+    limiter = RateLimiter({IP: (1, 2), ADDRESS: (1, 5)})
+    results = [limiter.acquire_all([(IP, "10.0.0.1"), (ADDRESS, f"0x{i}")], now=0)[0] for i in range(4)]
+    assert results == [True, True, False, False]
+
+
+def test_rejected_request_takes_no_tokens():
+    limiter = RateLimiter({IP: (1, 5), ADDRESS: (1, 1)})
+    assert limiter.acquire_all([(IP, "a"), (ADDRESS, "0x1")], now=0) == (True, 0.0)
+    allowed, retry_after = limiter.acquire_all([(IP, "a"), (ADDRESS, "0x1")], now=0)
+    assert not allowed and retry_after == 1.0
+    # The IP bucket kept its tokens: 4 left for other addresses
+    assert [limiter.acquire_all([(IP, "a"), (ADDRESS, f"0x{i}")], now=0)[0] for i in range(2, 7)] == [
+        True, True, True, True, False,
+    ]
+    assert limiter.stats()["allowed"] == 5 and limiter.stats()["limited"] == 2
+
+
+def test_unlimited_kinds_are_skipped():
+    limiter = RateLimiter({IP: (0, 0), API_KEY: (1, 1)})
+    assert limiter.acquire_all([(IP, "a"), (API_KEY, "k")], now=0)[0]
+    assert not limiter.acquire_all([(IP, "a"), (API_KEY, "k")], now=0)[0]
+    assert limiter.acquire_all([(IP, "a"), (API_KEY, "k")], now=1)[0]
+
+
+def test_middleware_answers_429_per_ip(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server.rate_limiter, "limits", {IP: (1, 2), ADDRESS: (100, 100)})
+    monkeypatch.setattr(server.rate_limiter, "_buckets", OrderedDict())
+    client = TestClient(server.app)
+    statuses = [client.get(f"/api/transactions/0x{i:040x}").status_code for i in range(3)]
+    assert statuses[:2] == [200, 200]
+    assert statuses[2] == 429
+
+
+def test_proxied_clients_get_separate_ip_buckets(server, monkeypatch):
+    from fastapi.testclient import TestClient
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    monkeypatch.setattr(server.rate_limiter, "limits", {IP: (1, 1)})
+    monkeypatch.setattr(server.rate_limiter, "_buckets", OrderedDict())
+    # What uvicorn --proxy-headers --forwarded-allow-ips 127.0.0.1 runs, with nginx as the peer
+    proxied = ProxyHeadersMiddleware(server.app, trusted_hosts="127.0.0.1")
+
+    async def via_nginx(scope, receive, send):
+        await proxied(dict(scope, client=("127.0.0.1", 40000)), receive, send)
+
+    client = TestClient(via_nginx)
+
+    def get(forwarded_for):
+        return client.get("/api/prices", headers={"X-Forwarded-For": forwarded_for}).status_code
+
+    assert [get("203.0.113.1"), get("203.0.113.2")] == [200, 200]
+    assert [get("203.0.113.1"), get("203.0.113.2")] == [429, 429]
+    # nginx appends the real peer, so a client-supplied X-Forwarded-For can't pick a fresh bucket
+    assert get("198.51.100.7, 203.0.113.1") == 429
+    assert set(key for _, key in server.rate_limiter._buckets) == {"203.0.113.1", "203.0.113.2"}
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+
+from backplane import (
+    Backplane, InMemoryBackplane, RedisBackplane, create_backplane, decode_envelope, encode_envelope,
+)
+from connection_manager import PRICES_TOPIC, ConnectionManager
+from price_oracle import PriceOracle, StaticPriceSource
+from price_stream import PriceStream
+
+from tests.test_connection_manager import FakeWebSocket, settle
+
+REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+class RecordingBackplane(InMemoryBackplane):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    async def publish(self, topics, data):
+        self.published.append((topics, data))
+        await super().publish(topics, data)
+
+
+def test_envelope_round_trips_topics_and_payload():
+    topics = ["user:line\nbreak", "chain:ethereum"]
+    data = '{"text":"multi\\nline"}\nsecond line'
+    envelope = encode_envelope(topics, data)
+    assert envelope.count("\n") == 2  # the header stays on one line
+    assert decode_envelope(envelope) == (topics, data)
+
+
+def test_in_memory_backplane_delivers_locally():
+    received = []
+
+    async def deliver(topics, data):
+        received.append((topics, data))
+
+    async def scenario():
+        backplane = InMemoryBackplane()
+        await backplane.publish(["prices"], "dropped")  # not started yet
+        await backplane.start(deliver)
+        await backplane.publish(["prices"], "{}")
+        await backplane.stop()
+        return backplane.stats()
+
+    assert asyncio.run(scenario()) == {"type": "memory"}
+    assert received == [(["prices"], "{}")]
+
+
+def test_base_backplane_requires_publish():
+    with pytest.raises(NotImplementedError):
+        asyncio.run(Backplane().publish(["prices"], "{}"))
+
+
+def test_create_backplane_picks_by_url():
+    assert isinstance(create_backplane(None), InMemoryBackplane)
+    assert isinstance(create_backplane("memory://"), InMemoryBackplane)
+    redis_backplane = create_backplane("redis://localhost:6379/0", channel="test")
+    assert isinstance(redis_backplane, RedisBackplane) and redis_backplane.channel == "test"
+
+
+def test_price_deltas_bypass_the_backplane():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    backplane = RecordingBackplane()
+    manager = ConnectionManager(backplane=backplane)
+    stream = PriceStream(oracle, manager)
+
+    async def scenario():
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            manager.subscribe(websocket, [PRICES_TOPIC])
+            source.set_price("ethereum", "ETH", 3300.0)
+            await oracle.refresh()
+            await stream.tick()
+            await settle()
+            return websocket.sent
+        finally:
+            manager.disconnect(websocket)
+
+    [frame] = asyncio.run(scenario())
+    assert json.loads(frame)["type"] == "prices_delta"
+    assert backplane.published == []
+
+
+def redis_available() -> bool:
+    try:
+        import redis
+    except ImportError:
+        return False
+    try:
+        return redis.Redis.from_url(REDIS_URL, socket_connect_timeout=0.2).ping()
+    except redis.RedisError:
+        return False
+
+
+@pytest.mark.skipif(not redis_available(), reason=f"no Redis server at {REDIS_URL}")
+def test_redis_backplane_fans_out_to_every_worker():
+    channel = f"test:{uuid.uuid4().hex}"
+
+    async def scenario():
+        workers = [ConnectionManager(backplane=RedisBackplane(REDIS_URL, channel=channel)) for _ in range(2)]
+        sockets = []
+        for manager in workers:
+            await manager.start()
+            websocket = FakeWebSocket()
+            await manager.connect(websocket)
+            manager.subscribe(websocket, ["chain:ethereum"])
+            sockets.append(websocket)
+        try:
+            # Wait for both subscriptions to reach Redis before publishing
+            for _ in range(50):
+                if dict(await workers[0].backplane._redis.pubsub_numsub(channel))[channel] == 2:
+                    break
+                await asyncio.sleep(0.02)
+            await workers[0].publish("chain:ethereum", {"n": 1})
+            for _ in range(50):
+                if all(websocket.sent for websocket in sockets):
+                    break
+                await asyncio.sleep(0.02)
+            return [websocket.sent for websocket in sockets], workers[0].backplane.stats()
+        finally:
+            for manager, websocket in zip(workers, sockets):
+                manager.disconnect(websocket)
+                await manager.stop()
+
+    sent, stats = asyncio.run(scenario())
+    assert sent == [['{"n":1}'], ['{"n":1}']]
+    assert stats["published"] == 1 and stats["received"] == 1 and stats["errors"] == 0
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import httpx
+
+from backend_bench import compare, run_load, summarize
+
+
+def test_summarize_reports_percentiles_in_milliseconds():
+    result = summarize("quote", [i / 1000 for i in range(1, 101)], elapsed=2.0, errors=1)
+    assert result["count"] == 100 and result["errors"] == 1
+    assert result["throughput"] == 50.0
+    assert result["p50_ms"] == 50.5
+    assert result["p95_ms"] == 95.05
+    assert result["p99_ms"] == 99.01
+    assert result["max_ms"] == 100.0
+
+
+def test_summarize_without_samples():
+    result = summarize("prices", [], elapsed=0.0, errors=3)
+    assert result["count"] == 0 and result["throughput"] == 0.0 and result["p95_ms"] == 0.0
+
+
+def test_run_load_counts_failed_responses_as_errors():
+    async def call(i):
+        if i % 4 == 0:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(500 if i % 4 == 1 else 200)
+
+    result = asyncio.run(run_load("swap", call, total=40, concurrency=8))
+    assert result["count"] == 20
+    assert result["errors"] == 20
+
+
+def test_compare_flags_p95_throughput_and_error_regressions(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": [
+        {"scenario": "quote", "p95_ms": 10.0, "throughput": 1000.0, "errors": 0},
+        {"scenario": "prices", "p95_ms": 5.0, "throughput": 2000.0, "errors": 0},
+    ]}))
+    results = [
+        {"scenario": "quote", "p95_ms": 11.5, "throughput": 790.0, "errors": 2},
+        {"scenario": "prices", "p95_ms": 5.9, "throughput": 1700.0, "errors": 0},
+        {"scenario": "swap", "p95_ms": 100.0, "throughput": 1.0, "errors": 9},
+    ]
+    regressions = compare(results, str(baseline), tolerance=0.2)
+    assert regressions == [
+        "quote: throughput 1000.0/s -> 790.0/s",
+        "quote: errors 0 -> 2",
+    ]
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from connection_manager import (
+    DISCONNECT, DROP_OLDEST, SLOW_CONSUMER_CLOSE_CODE, ConnectionManager, chain_topic, user_topic,
+)
+
+
+class FakeWebSocket:
+    """Records sent frames; ``blocked`` holds every send until it is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.blocked = asyncio.Event()
+        self.blocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        await self.blocked.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def started(**kwargs):
+    manager = ConnectionManager(**kwargs)
+    await manager.start()
+    return manager
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_slow_consumer_drops_oldest_without_blocking_others():
+    async def scenario():
+        manager = await started(queue_size=2, slow_consumer_policy=DROP_OLDEST)
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        slow.blocked.clear()
+        await manager.connect(fast)
+        await manager.connect(slow)
+        await settle()
+        try:
+            for seq in range(5):
+                await manager.broadcast({"seq": seq})
+                await settle()
+            assert len(fast.sent) == 5 and slow.sent == []
+            slow.blocked.set()
+            await settle()
+            stats = manager.stats()
+        finally:
+            slow.blocked.set()
+            for websocket in (fast, slow):
+                manager.disconnect(websocket)
+        return slow, stats
+
+    slow, stats = asyncio.run(scenario())
+    # The writer was holding seq 0; of the rest only the two newest stayed queued
+    assert slow.sent == ['{"seq":0}', '{"seq":3}', '{"seq":4}']
+    assert stats["messages_dropped"] == 2 and stats["connections"] == 2
+
+
+def test_disconnect_policy_evicts_a_full_queue():
+    async def scenario():
+        manager = await started(queue_size=1, slow_consumer_policy=DISCONNECT)
+        slow = FakeWebSocket()
+        slow.blocked.clear()
+        await manager.connect(slow)
+        await settle()
+        for seq in range(3):
+            await manager.broadcast({"seq": seq})
+        await settle()
+        return manager, slow
+
+    manager, slow = asyncio.run(scenario())
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert manager.evictions == 1 and manager.stats()["connections"] == 0
+
+
+def test_send_timeout_evicts():
+    async def scenario():
+        manager = await started(send_timeout=0.01)
+        stuck = FakeWebSocket()
+        stuck.blocked.clear()
+        await manager.connect(stuck)
+        await manager.broadcast({"seq": 0})
+        await asyncio.sleep(0.05)
+        return manager, stuck
+
+    manager, stuck = asyncio.run(scenario())
+    assert manager.evictions == 1 and stuck.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert manager.stats()["connections"] == 0
+
+
+def test_invalid_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ConnectionManager(slow_consumer_policy="block")
+
+
+def test_socket_is_released_on_any_exit(server):
+    client = TestClient(server.app)
+    with pytest.raises(KeyError):
+        with client.websocket_connect("/api/ws") as ws:
+            ws.send_json({"type": "subscribe", "topics": ["chain:ethereum"]})
+            assert ws.receive_json()["type"] == "subscribed"
+            assert server.manager.stats()["connections"] == 1
+            ws.send_bytes(b"\x00")  # receive_text() raises KeyError on a binary frame
+            ws.receive_json()
+    stats = server.manager.stats()
+    assert stats["connections"] == 0 and stats["topics"] == 0
+
+
+def test_subscribe_and_unsubscribe_maintain_the_topic_index():
+    async def scenario():
+        manager = await started()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            assert manager.subscribe(websocket, ["prices", "chain:ethereum"]) == ["prices", "chain:ethereum"]
+            # Re-subscribing is a no-op
+            assert manager.subscribe(websocket, ["prices"]) == []
+            assert manager.topics_for(websocket) == ["chain:ethereum", "prices"]
+            manager.unsubscribe(websocket, ["prices", "chain:solana"])
+            return manager.topics_for(websocket), set(manager.subscribers)
+        finally:
+            manager.disconnect(websocket)
+
+    topics, indexed = asyncio.run(scenario())
+    assert topics == ["chain:ethereum"]
+    assert indexed == {"chain:ethereum"}
+
+
+def test_subscription_limit_is_enforced():
+    async def scenario():
+        manager = await started(max_topics=2)
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            with pytest.raises(ValueError):
+                manager.subscribe(websocket, ["a", "b", "c"])
+            return manager.topics_for(websocket)
+        finally:
+            manager.disconnect(websocket)
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_publish_reaches_only_subscribers_of_its_topics_once_each():
+    async def scenario():
+        manager = await started()
+        eth, sol, both, idle = (FakeWebSocket() for _ in range(4))
+        for websocket in (eth, sol, both, idle):
+            await manager.connect(websocket)
+        try:
+            manager.subscribe(eth, [chain_topic("ethereum")])
+            manager.subscribe(sol, [chain_topic("solana")])
+            manager.subscribe(both, [chain_topic("ethereum"), chain_topic("solana"), user_topic("0xABC")])
+            await manager.publish([chain_topic("ethereum"), chain_topic("solana")], {"n": 1})
+            await manager.publish(user_topic("0xabc"), {"n": 2})
+            await manager.publish(chain_topic("polygon"), {"n": 3})
+            await settle()
+            return eth.sent, sol.sent, both.sent, idle.sent
+        finally:
+            for websocket in (eth, sol, both, idle):
+                manager.disconnect(websocket)
+
+    eth, sol, both, idle = asyncio.run(scenario())
+    assert eth == sol == ['{"n":1}']
+    assert both == ['{"n":1}', '{"n":2}']
+    assert idle == []
+
+
+def test_websocket_topic_messages(server):
+    client = TestClient(server.app)
+    with client.websocket_connect("/api/ws") as ws:
+        ws.send_json({"type": "subscribe", "topics": ["chain:ethereum"], "user_address": "0xABC"})
+        assert ws.receive_json() == {"type": "subscribed", "topics": ["chain:ethereum", "user:0xabc"]}
+
+        ws.send_json({"type": "subscribe", "topics": ["chain:atlantis"]})
+        assert ws.receive_json() == {"type": "error", "message": "Unknown topic: chain:atlantis"}
+        ws.send_json({"type": "subscribe", "topics": [42]})
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"type": "unsubscribe", "topics": ["chain:ethereum"]})
+        assert ws.receive_json() == {"type": "unsubscribed", "topics": ["user:0xabc"]}
+        assert set(server.manager.subscribers) == {"user:0xabc"}
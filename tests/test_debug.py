@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+
+
+def test_slow_requests_are_hidden_without_a_configured_token(server, monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_TOKEN", None)
+    client = TestClient(server.app)
+    assert client.get("/api/debug/slow-requests").status_code == 404
+    assert client.get("/api/debug/slow-requests", headers={"X-Debug-Token": ""}).status_code == 404
+
+
+def test_slow_requests_require_the_matching_token(server, monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_TOKEN", "s3cret")
+    client = TestClient(server.app)
+    assert client.get("/api/debug/slow-requests").status_code == 403
+    assert client.get("/api/debug/slow-requests", headers={"X-Debug-Token": "wrong"}).status_code == 403
+
+    response = client.get("/api/debug/slow-requests", headers={"X-Debug-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "requests" in response.json()
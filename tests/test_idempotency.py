@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from idempotency import (
+    DONE, IN_PROGRESS, IdempotencyError, IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore, fingerprint,
+)
+
+
+class Counter:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"transaction_id": f"tx{self.calls}"}
+
+
+def new_store(collection=None, **kwargs):
+    collection = collection or AsyncMongoMockClient().db.idempotency_keys
+    return IdempotencyStore(lambda: collection, **kwargs), collection
+
+
+def test_replay_returns_the_first_response():
+    store, collection = new_store()
+    work = Counter()
+
+    async def scenario():
+        await store.ensure_indexes()
+        first = await store.run("k1", fingerprint({"amount": "1"}), work)
+        second = await store.run("k1", fingerprint({"amount": "1"}), work)
+        # A fresh process (empty LRU) replays from Mongo
+        other, _ = new_store(collection)
+        third = await other.run("k1", fingerprint({"amount": "1"}), work)
+        return first, second, third, await collection.find_one({"key": "k1"})
+
+    first, second, third, doc = asyncio.run(scenario())
+    assert first == second == third == {"transaction_id": "tx1"}
+    assert work.calls == 1
+    assert doc["state"] == DONE and doc["response"] == first
+    assert store.stats()["replays"] == 1 and store.lru_hits == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected():
+    store, _ = new_store()
+
+    async def scenario():
+        await store.run("k1", fingerprint({"amount": "1"}), Counter())
+        await store.run("k1", fingerprint({"amount": "2"}), Counter())
+
+    with pytest.raises(IdempotencyKeyReused) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 422
+    assert store.conflicts == 1
+
+
+def test_invalid_keys():
+    store, _ = new_store()
+    for key in ("", "x" * 256):
+        with pytest.raises(IdempotencyError):
+            asyncio.run(store.run(key, "f", Counter()))
+
+
+def test_concurrent_duplicates_execute_once():
+    store, _ = new_store()
+    work = Counter(delay=0.02)
+
+    async def scenario():
+        return await asyncio.gather(*(store.run("k", "f", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [{"transaction_id": "tx1"}] * 5
+    assert work.calls == 1
+
+
+def test_failed_request_releases_its_key():
+    store, collection = new_store()
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await store.run("k", "f", Counter(error=RuntimeError("insert failed")))
+        assert await collection.find_one({"key": "k"}) is None
+        return await store.run("k", "f", Counter())
+
+    assert asyncio.run(scenario()) == {"transaction_id": "tx1"}
+
+
+def test_duplicate_in_another_process_waits_then_gives_up():
+    collection = AsyncMongoMockClient().db.idempotency_keys
+    first, _ = new_store(collection)
+    second, _ = new_store(collection, wait_timeout=0.05, poll_interval=0.01)
+
+    async def scenario():
+        await first.ensure_indexes()
+        running = asyncio.create_task(first.run("k", "f", Counter(delay=0.2)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(IdempotencyInProgress):
+            await second.run("k", "f", Counter())
+        return await running
+
+    assert asyncio.run(scenario()) == {"transaction_id": "tx1"}
+    assert second.timeouts == 1 and second.executions == 0
+
+
+class FlakyCollection:
+    """Delegates to a mongomock collection; the first ``failures`` update_one calls raise."""
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def update_one(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("primary stepped down")
+        return await self.collection.update_one(*args, **kwargs)
+
+
+def test_response_is_kept_when_storing_it_fails():
+    mongo = AsyncMongoMockClient().db.idempotency_keys
+    flaky = FlakyCollection(mongo, failures=5)
+    store, _ = new_store(flaky, poll_interval=0.001, lock_timeout=0.05)
+    work = Counter()
+
+    async def scenario():
+        await store.ensure_indexes()
+        response = await store.run("k", "f", work)
+        # Three inline attempts failed: the lock stays, the response is served locally
+        assert (await mongo.find_one({"key": "k"}))["state"] == IN_PROGRESS
+        assert store.stats()["pending_stores"] == 1
+        assert await store.run("k", "f", work) == response
+        while store.stats()["pending_stores"]:
+            await asyncio.sleep(0.005)
+        # Another process, even past lock_timeout, replays rather than re-executing
+        other, _ = new_store(mongo, lock_timeout=0.0)
+        return response, await other.run("k", "f", work), await mongo.find_one({"key": "k"})
+
+    response, replayed, doc = asyncio.run(scenario())
+    assert replayed == response and work.calls == 1
+    assert doc["state"] == DONE and doc["response"] == response
+    assert store.store_errors == 5
+
+
+def test_swap_endpoint_replays_and_rejects_reuse(server):
+    client = TestClient(server.app)
+    body = {
+        "from_chain": "ethereum", "to_chain": "solana", "from_token": "ETH", "to_token": "SOL",
+        "amount": "1", "slippage": 0.5, "user_address": "0x" + "1" * 40,
+    }
+    headers = {"Idempotency-Key": "swap-1"}
+    server.idempotency_store._entries.clear()
+
+    first = client.post("/api/swap", json=body, headers=headers)
+    replay = client.post("/api/swap", json=body, headers=headers)
+    assert first.status_code == replay.status_code == 200
+    assert replay.json() == first.json()
+
+    reused = client.post("/api/swap", json={**body, "amount": "2"}, headers=headers)
+    assert reused.status_code == 422
+    assert client.post("/api/swap", json=body, headers={"Idempotency-Key": ""}).status_code == 400
@@ -0,0 +1,63 @@
+import random
+
+from market_data import TopK, WindowedSum
+
+
+def test_topk_matches_a_full_sort_under_random_updates():
+    rng = random.Random(7)
+    top = TopK(5)
+    scores = {}
+    for step in range(5000):
+        key = f"token{rng.randrange(40)}"
+        if rng.random() < 0.1:
+            top.remove(key)
+            scores.pop(key, None)
+        else:
+            score = round(rng.uniform(-50, 50), 1)
+            top.update(key, score)
+            scores[key] = score
+        if step % 7 == 0:
+            expected = sorted(scores.values(), reverse=True)[:5]
+            result = top.top()
+            assert [score for _, score in result] == expected
+            assert all(scores[key] == score for key, score in result)
+    # Stale heap entries are compacted away
+    assert len(top._heap) <= 2 * len(top.scores) + 64
+
+
+def test_topk_lowering_a_leader_recomputes():
+    top = TopK(2)
+    for key, score in (("a", 10), ("b", 8), ("c", 5)):
+        top.update(key, score)
+    assert top.top() == [("a", 10), ("b", 8)]
+    top.update("a", 1)
+    assert top.top() == [("b", 8), ("c", 5)]
+    top.remove("b")
+    assert top.top() == [("c", 5), ("a", 1)]
+
+
+def test_windowed_sum_expires_whole_buckets():
+    window = WindowedSum(window=300, bucket=60)
+    window.add(10, now=0)
+    window.add(5, now=30)
+    window.add(7, now=120)
+    assert window.value(now=120) == 22 and window.count == 3
+    # The [0, 60) bucket is dropped once it is entirely older than the window
+    assert window.value(now=359) == 22
+    assert window.value(now=360) == 7 and window.count == 1
+    assert window.value(now=1000) == 0.0 and window.count == 0
+
+
+def test_windowed_sum_matches_a_rescan():
+    rng = random.Random(3)
+    window = WindowedSum(window=3600, bucket=60)
+    events = []
+    now = 0.0
+    for _ in range(3000):
+        now += rng.uniform(0, 20)
+        value = rng.uniform(0, 1000)
+        window.add(value, now=now)
+        events.append((now, value))
+    expected = sum(v for t, v in events if t - t % 60 + 60 > now - 3600)
+    assert abs(window.value(now=now) - expected) < 1e-6
+    assert window.count == sum(1 for t, _ in events if t - t % 60 + 60 > now - 3600)
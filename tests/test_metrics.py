@@ -0,0 +1,70 @@
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+from metrics import StatsCollector
+from write_batcher import Histogram
+
+
+def scrape(sources):
+    registry = CollectorRegistry()
+    registry.register(StatsCollector(sources))
+    return {family.name: family for family in text_string_to_metric_families(generate_latest(registry).decode())}
+
+
+class Source:
+    STATS_COUNTERS = ("documents_written", "limits_ip_used")
+
+    def __init__(self, stats):
+        self._stats = stats
+
+    def stats(self):
+        return self._stats
+
+
+def test_stats_fields_are_typed_by_kind():
+    latency = Histogram((0.01, 0.1))
+    for value in (0.005, 0.05, 3.0):
+        latency.observe(value)
+    families = scrape({"tx_batcher": Source({
+        "documents_written": 7,
+        "pending": 2,
+        "flush_latency_seconds": latency.snapshot(),
+        "limits": {"ip": {"rate": 5.0, "used": 3}},
+    }).stats})
+
+    assert families["sync_tx_batcher_documents_written"].type == "counter"
+    assert families["sync_tx_batcher_pending"].type == "gauge"
+    assert families["sync_tx_batcher_limits_ip_rate"].type == "gauge"
+    assert families["sync_tx_batcher_limits_ip_used"].type == "counter"
+
+    histogram = families["sync_tx_batcher_flush_latency_seconds"]
+    assert histogram.type == "histogram"
+    samples = {(s.name, s.labels.get("le")): s.value for s in histogram.samples}
+    assert samples[("sync_tx_batcher_flush_latency_seconds_bucket", "0.01")] == 1
+    assert samples[("sync_tx_batcher_flush_latency_seconds_bucket", "0.1")] == 2
+    assert samples[("sync_tx_batcher_flush_latency_seconds_bucket", "+Inf")] == 3
+    assert samples[("sync_tx_batcher_flush_latency_seconds_count", None)] == 3
+    assert samples[("sync_tx_batcher_flush_latency_seconds_sum", None)] == 3.055
+    assert not any("buckets" in name for name in families)
+
+
+def test_counter_keys_are_scoped_to_their_source():
+    families = scrape({
+        "tx_batcher": Source({"documents_written": 1}).stats,
+        # Same key, but this source declares no counters
+        "jobs": lambda: {"documents_written": 1},
+    })
+    assert families["sync_tx_batcher_documents_written"].type == "counter"
+    assert families["sync_jobs_documents_written"].type == "gauge"
+
+
+def test_metrics_endpoint_has_no_flattened_bucket_gauges(server):
+    from fastapi.testclient import TestClient
+
+    body = TestClient(server.app).get("/metrics").text
+    assert "# TYPE sync_tx_batcher_flush_latency_seconds histogram" in body
+    assert "# TYPE sync_quote_cache_hits_total counter" in body
+    assert "# TYPE sync_response_cache_builds_total counter" in body
+    assert "# TYPE sync_swap_pipeline_completed_total counter" in body
+    assert "# TYPE sync_ws_connections gauge" in body
+    assert "_buckets_" not in body
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from platform_stats import HyperLogLog, PlatformStats
+from swap_pipeline import COMPLETED, FAILED, PENDING
+
+START = datetime(2026, 1, 1)
+
+
+def tx(status, user, usd_value=None, seconds=None):
+    doc = {"status": status, "user_address": user, "usd_value": usd_value, "created_at": START}
+    if seconds is not None:
+        doc["completed_at"] = START + timedelta(seconds=seconds)
+    return doc
+
+
+DOCS = [
+    tx(COMPLETED, "0xa", 100.0, 2),
+    tx(COMPLETED, "0xb", 50.5, 4),
+    tx(COMPLETED, "0xa", None, 6),
+    tx(FAILED, "0xc", 10.0, 1),
+    tx(PENDING, "0xd", 20.0),
+]
+
+
+def test_counters_follow_recorded_events():
+    stats = PlatformStats(lambda: None)
+    for doc in DOCS:
+        stats.record_submitted(doc["user_address"])
+    for doc in DOCS:
+        if doc["status"] != PENDING:
+            stats.record_finished(doc)
+    summary = stats.summary()
+    assert summary["total_transactions"] == 5
+    assert summary["completed_transactions"] == 3 and summary["failed_transactions"] == 1
+    assert summary["transaction_volume"] == 150.5
+    assert summary["success_rate"] == 75.0
+    assert summary["average_execution_time"] == 4.0
+    assert summary["unique_users"] == 4
+    assert stats.version == 9
+
+
+def test_empty_summary():
+    summary = PlatformStats(lambda: None).summary()
+    assert summary["total_transactions"] == 0 and summary["unique_users"] == 0
+    assert summary["success_rate"] is None and summary["average_execution_time"] is None
+
+
+def test_reconcile_matches_the_collection():
+    collection = AsyncMongoMockClient().db.transactions
+    stats = PlatformStats(lambda: collection)
+
+    async def scenario():
+        await collection.insert_many([dict(doc) for doc in DOCS])
+        stats.record_submitted("0xdrift")  # counted here but never persisted
+        await stats.reconcile()
+
+    asyncio.run(scenario())
+    summary = stats.summary()
+    assert summary["total_transactions"] == 5
+    assert summary["completed_transactions"] == 3 and summary["failed_transactions"] == 1
+    assert summary["transaction_volume"] == 150.5
+    assert summary["average_execution_time"] == 4.0
+    # The HyperLogLog only grows: the unpersisted user is still counted
+    assert summary["unique_users"] == 5
+    assert summary["reconciled_at"] is not None and stats.reconciles == 1
+
+
+def test_events_during_reconcile_are_counted_once():
+    collection = AsyncMongoMockClient().db.transactions
+    stats = PlatformStats(lambda: collection)
+
+    class RacingCollection:
+        """Persists and records swaps after the watermark, before the status aggregation reads."""
+
+        def aggregate(self, pipeline, **kwargs):
+            if "$status" not in str(pipeline):
+                return collection.aggregate(pipeline, **kwargs)
+
+            async def rows():
+                now = datetime.utcnow()
+                new = {"status": PENDING, "user_address": "0xnew", "usd_value": 5.0, "created_at": now}
+                await collection.insert_one(new)
+                stats.record_submitted("0xnew", now)
+                pending = await collection.find_one({"status": PENDING, "user_address": "0xd"})
+                finished = dict(pending, status=COMPLETED, completed_at=now)
+                await collection.replace_one({"_id": pending["_id"]}, finished)
+                stats.record_finished(finished)
+                async for row in collection.aggregate(pipeline, **kwargs):
+                    yield row
+
+            return rows()
+
+    stats.collection_getter = lambda: RacingCollection()
+
+    async def scenario():
+        await collection.insert_many([dict(doc) for doc in DOCS])
+        await stats.reconcile()
+
+    asyncio.run(scenario())
+    summary = stats.summary()
+    assert summary["total_transactions"] == 6
+    assert summary["completed_transactions"] == 4 and summary["failed_transactions"] == 1
+    assert summary["transaction_volume"] == 170.5
+
+
+def test_unique_users_are_scanned_incrementally():
+    collection = AsyncMongoMockClient().db.transactions
+    stats = PlatformStats(lambda: collection)
+    user_pipelines = []
+
+    class RecordingCollection:
+        def aggregate(self, pipeline, **kwargs):
+            if "$user_address" in str(pipeline):
+                user_pipelines.append(pipeline)
+            return collection.aggregate(pipeline, **kwargs)
+
+    stats.collection_getter = lambda: RecordingCollection()
+
+    async def scenario():
+        await collection.insert_many([dict(doc) for doc in DOCS])
+        await stats.reconcile()
+        first = stats.users.count()
+        await collection.insert_one(dict(tx(PENDING, "0xlate"), created_at=datetime.utcnow()))
+        await stats.reconcile()
+        return first, stats.users.count()
+
+    first, second = asyncio.run(scenario())
+    assert (first, second) == (4, 5)
+    assert "$gt" not in user_pipelines[0][0]["$match"]["created_at"]
+    # The second scan starts from the first one's watermark (less the overlap), not from scratch
+    assert user_pipelines[1][0]["$match"]["created_at"]["$gt"] > START
+
+
+def test_hyperloglog_estimate_and_merge():
+    first, second = HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        first.add(f"0x{i:040x}")
+        first.add(f"0x{i:040x}")  # duplicates never change the estimate
+    for i in range(10000, 30000):
+        second.add(f"0x{i:040x}")
+    assert abs(first.count() - 20000) / 20000 < 0.03
+    first.merge(second)
+    assert abs(first.count() - 30000) / 30000 < 0.03
+    assert HyperLogLog().count() == 0
+
+
+def test_stats_endpoint_serves_the_summary(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    response = client.get("/api/stats")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_transactions"] == int(server.platform_stats.summary()["total_transactions"])
+    assert "unique_users" in body
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from portfolio import ERC20_BALANCE_OF, PortfolioAggregator
+from token_registry import TokenRecord, TokenRegistry
+
+OWNER = "0x" + "ab" * 20
+CHAINS = {"ethereum": SimpleNamespace(rpc_url="https://rpc.test/eth", currency_symbol="ETH")}
+PRICES = {"ETH": 2000.0, "T0": 1.0, "T1": 2.0}
+
+
+def registry_with_tokens(count):
+    registry = TokenRegistry()
+    registry.add(TokenRecord("ETH", "Ether", "0x" + "0" * 40, 18, "ethereum"))
+    for i in range(count):
+        registry.add(TokenRecord(f"T{i}", f"Token {i}", f"0x{i + 1:040x}", 6, "ethereum"))
+    return registry
+
+
+class FakeRPC:
+    """JSON-RPC node that rejects batches larger than ``limit`` with a batch-level error."""
+
+    def __init__(self, limit=100, failing_token=None):
+        self.limit = limit
+        self.failing_token = failing_token
+        self.batch_sizes = []
+
+    def handler(self, request):
+        batch = json.loads(request.content)
+        self.batch_sizes.append(len(batch))
+        if len(batch) > self.limit:
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": None,
+                                             "error": {"code": -32600, "message": "batch too large"}})
+        return httpx.Response(200, json=[self.reply(call) for call in batch])
+
+    def reply(self, call):
+        if call["method"] == "eth_getBalance":
+            return {"jsonrpc": "2.0", "id": call["id"], "result": hex(3 * 10 ** 18)}
+        to = call["params"][0]["to"]
+        assert call["params"][0]["data"].startswith(ERC20_BALANCE_OF)
+        index = int(to, 16) - 1
+        if index == self.failing_token:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": "execution reverted"}}
+        # Only the first two tokens are held
+        return {"jsonrpc": "2.0", "id": call["id"], "result": hex((index + 1) * 10 ** 6 if index < 2 else 0)}
+
+
+def portfolio(rpc, registry, max_batch_calls=100):
+    aggregator = PortfolioAggregator(CHAINS, registry, lambda chain_id, symbol: PRICES.get(symbol),
+                                     max_batch_calls=max_batch_calls)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(rpc.handler)) as client:
+            aggregator.client = client
+            return await aggregator.get_portfolio(OWNER)
+
+    return asyncio.run(scenario())
+
+
+def test_large_registry_is_split_into_bounded_batches():
+    rpc = FakeRPC(limit=100)
+    result = portfolio(rpc, registry_with_tokens(250))
+    assert sorted(rpc.batch_sizes) == [51, 100, 100]
+    assert result["errors"] == {} and not result["partial"]
+    tokens = {t["symbol"]: t for t in result["chains"]["ethereum"]["tokens"]}
+    assert tokens["ETH"]["balance"] == "3" and tokens["ETH"]["usd_value"] == 6000.0
+    assert tokens["T0"]["balance"] == "1" and tokens["T1"]["balance"] == "2"
+    assert len(tokens) == 3
+    assert result["total_usd"] == 6005.0
+
+
+def test_failed_call_is_skipped_and_rest_of_batch_kept():
+    rpc = FakeRPC(failing_token=1)
+    result = portfolio(rpc, registry_with_tokens(5))
+    symbols = [t["symbol"] for t in result["chains"]["ethereum"]["tokens"]]
+    assert symbols == ["ETH", "T0"]
+    assert result["errors"] == {}
+
+
+def test_batch_level_error_object_reports_the_chain():
+    rpc = FakeRPC(limit=10)
+    result = portfolio(rpc, registry_with_tokens(30), max_batch_calls=50)
+    assert result["partial"]
+    assert result["errors"] == {"ethereum": "batch too large"}
+    assert result["chains"] == {}
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from price_history import CLOSE, HIGH, LOW, OPEN, TIME, VOLUME, PriceHistory, Ring, epoch_seconds
+from price_oracle import PriceSnapshot
+
+
+def test_ring_wraps_around_keeping_the_newest_candles():
+    ring = Ring(seconds=60, capacity=4, rows=1)
+    for minute in range(10):
+        ring.tick(0, minute * 60 + 5, 100.0 + minute)
+    assert ring.count[0] == 4 and ring.head[0] == 10 % 4
+    candles = ring.series(0, limit=10)
+    assert candles[:, TIME].tolist() == [360, 420, 480, 540]
+    assert candles[:, CLOSE].tolist() == [106, 107, 108, 109]
+    assert ring.series(0, limit=2)[:, TIME].tolist() == [480, 540]
+
+
+def test_ring_folds_ticks_and_volume_into_the_open_candle():
+    ring = Ring(seconds=60, capacity=4, rows=1)
+    for offset, price in ((1, 10.0), (20, 12.0), (40, 9.0), (59, 11.0)):
+        ring.tick(0, offset, price)
+    ring.tick(0, -30, 1.0)  # older than the open candle: dropped
+    ring.add_volume(0, 30, 250.0)
+    ring.add_volume(0, 70, 40.0)  # no tick yet: opened at the previous close
+    first, second = ring.series(0, limit=4)
+    assert first[[OPEN, HIGH, LOW, CLOSE, VOLUME]].tolist() == [10, 12, 9, 11, 250]
+    assert second[[TIME, OPEN, CLOSE, VOLUME]].tolist() == [60, 11, 11, 40]
+
+
+def filled_history(directory, **kwargs):
+    history = PriceHistory(max_series=8, capacities={"1m": 5, "1h": 3, "1d": 2}, directory=str(directory), **kwargs)
+    for minute in range(12):
+        history.record_price("ethereum", "ETH", 2000.0 + minute, minute * 60)
+        history.record_price("solana", "SOL", 100.0 - minute, minute * 60)
+    history.record_volume("ethereum", "ETH", 500.0, 11 * 60)
+    return history
+
+
+def test_save_and_load_round_trip(tmp_path):
+    history = filled_history(tmp_path)
+    asyncio.run(history.save())
+
+    restored = PriceHistory(max_series=8, capacities={"1m": 5, "1h": 3, "1d": 2}, directory=str(tmp_path))
+    assert restored.load()
+    assert restored.index == history.index
+    for chain_id, symbol in history.index:
+        for interval in ("1m", "1h", "1d"):
+            expected = history.candles(chain_id, symbol, interval, 10)
+            actual = restored.candles(chain_id, symbol, interval, 10)
+            for column in expected:
+                np.testing.assert_array_equal(actual[column], expected[column])
+    # The restored rings keep wrapping from where they were saved
+    restored.record_price("ethereum", "ETH", 3000.0, 12 * 60)
+    assert restored.candles("ethereum", "ETH", "1m", 10)["close"].tolist() == [2008, 2009, 2010, 2011, 3000]
+
+
+def test_load_without_a_snapshot(tmp_path):
+    assert not PriceHistory(directory=str(tmp_path)).load()
+    assert not PriceHistory().load()
+
+
+def test_load_rejects_a_different_capacity(tmp_path):
+    asyncio.run(filled_history(tmp_path).save())
+    assert not PriceHistory(max_series=8, capacities={"1m": 6, "1h": 3, "1d": 2}, directory=str(tmp_path)).load()
+
+
+def test_corrupt_snapshot_is_ignored_with_a_warning(tmp_path, caplog):
+    asyncio.run(filled_history(tmp_path).save())
+    capacities = {"1m": 5, "1h": 3, "1d": 2}
+
+    (tmp_path / "1h.npy").write_bytes(b"not an npy file")
+    history = PriceHistory(max_series=8, capacities=capacities, directory=str(tmp_path))
+    with caplog.at_level(logging.WARNING, logger="price_history"):
+        assert not history.load()
+    assert "unreadable" in caplog.text
+    assert history.index == {}
+
+    (tmp_path / "1h.npy").unlink()
+    assert not PriceHistory(max_series=8, capacities=capacities, directory=str(tmp_path)).load()
+
+    (tmp_path / "series.json").write_text("{truncated")
+    assert not PriceHistory(max_series=8, capacities=capacities, directory=str(tmp_path)).load()
+
+    (tmp_path / "series.json").write_text(json.dumps({"series": []}))
+    assert not PriceHistory(max_series=8, capacities=capacities, directory=str(tmp_path)).load()
+
+
+@pytest.fixture
+def local_time_far_from_utc(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_snapshot_ticks_and_swap_volume_share_utc_candles(local_time_far_from_utc):
+    noon = 1704110400  # 2024-01-01T12:00:00Z
+    assert epoch_seconds(datetime(2024, 1, 1, 12, 0, 30, 500000)) == noon + 30.5
+
+    history = PriceHistory(max_series=8, capacities={"1m": 5, "1h": 3, "1d": 2})
+    empty = PriceSnapshot(version=0, timestamp=datetime(2024, 1, 1, 12), prices={})
+    history.load_snapshot(PriceSnapshot(
+        version=1, timestamp=datetime(2024, 1, 1, 12, 0, 10), prices={"ethereum": {"ETH": {"price": 2000.0}}},
+    ))
+    history.apply_snapshot(empty, PriceSnapshot(
+        version=2, timestamp=datetime(2024, 1, 1, 12, 0, 30), prices={"ethereum": {"ETH": {"price": 2100.0}}},
+    ))
+    # Swap volume is recorded with time.time(), i.e. true Unix time
+    history.record_volume("ethereum", "ETH", 75.0, noon + 45)
+
+    candles = history.candles("ethereum", "ETH", "1m", 10)
+    assert candles["time"].tolist() == [noon]
+    assert candles["open"].tolist() == [2000.0] and candles["close"].tolist() == [2100.0]
+    assert candles["volume"].tolist() == [75.0]
@@ -0,0 +1,123 @@
+import asyncio
+import copy
+
+import pytest
+
+from market_data import MarketData
+from price_oracle import DEFAULT_PRICES, PriceOracle, StaticPriceSource
+
+
+def test_refresh_publishes_a_new_version_only_on_change():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    seen = []
+    oracle.add_listener(lambda old, new: seen.append((old.version, new.version)))
+
+    async def scenario():
+        unchanged = await oracle.refresh()
+        source.set_price("ethereum", "ETH", 3300.0, change_24h=4.0)
+        changed = await oracle.refresh()
+        again = await oracle.refresh()
+        return unchanged, changed, again
+
+    unchanged, changed, again = asyncio.run(scenario())
+    assert unchanged.version == 0
+    assert changed.version == 1 and again is changed
+    assert changed.get("ethereum", "ETH") == {"price": 3300.0, "change_24h": 4.0, "volume_24h": 15000000000}
+    assert seen == [(0, 1)]
+    assert oracle.snapshot is changed
+
+
+def test_published_snapshots_are_isolated_from_the_source():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    source.set_price("solana", "SOL", 170.0)
+    first = asyncio.run(oracle.refresh())
+    source.set_price("solana", "SOL", 180.0)
+    assert first.get("solana", "SOL")["price"] == 170.0
+    assert DEFAULT_PRICES["solana"]["SOL"]["price"] == 162.30
+
+
+def test_listener_errors_do_not_stop_publication():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    calls = []
+
+    def broken(old, new):
+        raise RuntimeError("listener bug")
+
+    oracle.add_listener(broken)
+    oracle.add_listener(lambda old, new: calls.append(new.version))
+    source.set_price("ethereum", "USDC", 1.002)
+    assert asyncio.run(oracle.refresh()).version == 1
+    assert calls == [1]
+
+
+class FailingSource(StaticPriceSource):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.fetches = 0
+
+    async def fetch(self, client):
+        self.fetches += 1
+        await asyncio.sleep(0.001)
+        if self.fetches <= self.failures:
+            raise ConnectionError("upstream down")
+        return await super().fetch(client)
+
+
+def test_failed_polls_keep_the_last_snapshot_and_are_counted():
+    source = FailingSource(failures=2)
+    source.set_price("ethereum", "ETH", 3400.0)
+    oracle = PriceOracle(source, interval=0.005)
+
+    async def scenario():
+        oracle.start()
+        while oracle.snapshot.version == 0:
+            assert oracle.snapshot.get("ethereum", "ETH")["price"] == DEFAULT_PRICES["ethereum"]["ETH"]["price"]
+            await asyncio.sleep(0.002)
+        await oracle.stop()
+
+    asyncio.run(scenario())
+    assert oracle.errors == 2
+    assert oracle.snapshot.get("ethereum", "ETH")["price"] == 3400.0
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    source = FailingSource(failures=0)
+    oracle = PriceOracle(source)
+
+    async def scenario():
+        return await asyncio.gather(*(oracle.refresh() for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert source.fetches == 1
+
+
+def test_market_data_follows_the_oracle():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    market = MarketData(k=3)
+    market.load(oracle.snapshot)
+    oracle.add_listener(market.apply_snapshot)
+
+    source.set_price("fantom", "FTM", 0.5, change_24h=25.0, volume_24h=9e10)
+    source.set_price("ethereum", "ETH", 3000.0, change_24h=-8.0, volume_24h=1e9)
+    prices = copy.deepcopy(asyncio.run(oracle.refresh()).prices)
+    del prices["avalanche"]
+    oracle.publish(prices)
+
+    # An aggregate rebuilt from scratch must agree with the incrementally maintained one
+    fresh = MarketData(k=3)
+    fresh.load(oracle.snapshot)
+    assert market.summary() == fresh.summary()
+    summary = market.summary()
+    assert summary["trending_tokens"][0]["symbol"] == "FTM"
+    assert summary["top_volume_tokens"][0] == {
+        "symbol": "FTM", "chain": "fantom", "price": 0.5, "change_24h": 25.0, "volume_24h": 9e10,
+    }
+    assert summary["active_chains"] == 7
+    assert summary["total_volume_24h"] == pytest.approx(
+        sum(e["volume_24h"] for symbols in oracle.snapshot.prices.values() for e in symbols.values())
+    )
@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+from connection_manager import PRICES_TOPIC, ConnectionManager
+from price_oracle import PriceOracle, StaticPriceSource
+from price_stream import PriceStream, diff_prices
+
+from tests.test_connection_manager import FakeWebSocket, settle
+
+
+def make_stream():
+    source = StaticPriceSource()
+    oracle = PriceOracle(source)
+    manager = ConnectionManager()
+    return source, oracle, manager, PriceStream(oracle, manager)
+
+
+def test_diff_contains_only_moved_entries():
+    source, oracle, _, _ = make_stream()
+    old = oracle.snapshot
+    source.set_price("ethereum", "ETH", 3300.0)
+    source.set_price("solana", "SOL", 162.30, volume_24h=1.0)  # volume alone is not a tick
+    source.set_price("fantom", "NEW", 0.5)
+    new = asyncio.run(oracle.refresh())
+    assert diff_prices(old, new) == [
+        {"chain": "ethereum", "symbol": "ETH", "price": 3300.0, "change_24h": 2.45},
+        {"chain": "fantom", "symbol": "NEW", "price": 0.5, "change_24h": 0.0},
+    ]
+
+
+def test_subscriber_gets_a_snapshot_then_versioned_deltas():
+    source, oracle, manager, stream = make_stream()
+
+    async def scenario():
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            manager.subscribe(websocket, [PRICES_TOPIC])
+            await manager.send_personal_message(stream.snapshot_payload(), websocket)
+            for price in (3300.0, 3310.0):
+                source.set_price("ethereum", "ETH", price)
+                await oracle.refresh()
+                await stream.tick()
+            await settle()
+            return [json.loads(frame) for frame in websocket.sent]
+        finally:
+            manager.disconnect(websocket)
+
+    snapshot, first, second = asyncio.run(scenario())
+    assert snapshot["type"] == "prices_snapshot" and snapshot["version"] == 0
+    assert snapshot["prices"]["ethereum"]["ETH"]["price"] == 3250.75
+    assert [first["type"], second["type"]] == ["prices_delta", "prices_delta"]
+    # Versions continue from the snapshot with no gaps, so a client can detect a missed delta
+    assert [first["version"], second["version"]] == [1, 2]
+    assert first["changes"] == [{"chain": "ethereum", "symbol": "ETH", "price": 3300.0, "change_24h": 2.45}]
+    assert second["changes"][0]["price"] == 3310.0
+    assert stream.deltas_sent == 2
+
+
+def test_ticks_without_a_price_move_send_nothing():
+    source, oracle, manager, stream = make_stream()
+
+    async def scenario():
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            manager.subscribe(websocket, [PRICES_TOPIC])
+            await stream.tick()  # oracle unchanged
+            source.set_price("ethereum", "ETH", 3250.75, volume_24h=1.0)
+            await oracle.refresh()  # new version, but no price or change moved
+            await stream.tick()
+            await settle()
+            return websocket.sent
+        finally:
+            manager.disconnect(websocket)
+
+    assert asyncio.run(scenario()) == []
+    assert stream.deltas_sent == 0
+    assert stream.stats()["version"] == 1
+
+
+def test_coalesces_several_snapshots_into_one_delta():
+    source, oracle, manager, stream = make_stream()
+
+    async def scenario():
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        try:
+            manager.subscribe(websocket, [PRICES_TOPIC])
+            source.set_price("ethereum", "ETH", 3300.0)
+            await oracle.refresh()
+            source.set_price("solana", "SOL", 170.0)
+            await oracle.refresh()
+            await stream.tick()
+            await settle()
+            return [json.loads(frame) for frame in websocket.sent]
+        finally:
+            manager.disconnect(websocket)
+
+    [delta] = asyncio.run(scenario())
+    assert delta["version"] == 2
+    assert {(c["chain"], c["symbol"]) for c in delta["changes"]} == {("ethereum", "ETH"), ("solana", "SOL")}
+
+
+def test_sse_sends_a_snapshot_then_delta_events():
+    source, oracle, manager, stream = make_stream()
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    async def scenario():
+        nonlocal disconnected
+        await manager.start()
+        events = stream.sse_events(is_disconnected)
+        snapshot = await events.__anext__()
+        assert stream.stats()["sse_clients"] == 1
+        source.set_price("polygon", "MATIC", 0.9)
+        await oracle.refresh()
+        await stream.tick()
+        delta = await events.__anext__()
+        disconnected = True
+        await events.aclose()
+        return snapshot, delta
+
+    snapshot, delta = asyncio.run(scenario())
+    assert snapshot.startswith("event: snapshot\ndata: ") and snapshot.endswith("\n\n")
+    assert json.loads(snapshot.split("data: ", 1)[1])["version"] == 0
+    assert delta.startswith("event: delta\ndata: ")
+    payload = json.loads(delta.split("data: ", 1)[1])
+    assert payload["version"] == 1
+    assert payload["changes"] == [{"chain": "polygon", "symbol": "MATIC", "price": 0.9, "change_24h": 3.78}]
+    assert stream.stats()["sse_clients"] == 0
+
+
+def test_lagging_sse_client_keeps_the_newest_deltas():
+    source, oracle, manager, stream = make_stream()
+    stream.sse_queue_size = 2
+
+    async def is_disconnected():
+        return False
+
+    async def scenario():
+        await manager.start()
+        events = stream.sse_events(is_disconnected)
+        await events.__anext__()
+        for price in (1.0, 2.0, 3.0):
+            source.set_price("fantom", "FTM", price)
+            await oracle.refresh()
+            await stream.tick()
+        received = [await events.__anext__() for _ in range(2)]
+        await events.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+    versions = [json.loads(event.split("data: ", 1)[1])["version"] for event in received]
+    assert versions == [2, 3]
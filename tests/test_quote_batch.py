@@ -0,0 +1,49 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from quote_engine import compute_amounts
+
+
+def quote_request(**overrides):
+    request = {
+        "from_chain": "ethereum", "to_chain": "solana", "from_token": "ETH", "to_token": "USDC",
+        "amount": "1.5", "slippage": 0.5, "user_address": "0xabc",
+    }
+    request.update(overrides)
+    return request
+
+
+def test_vectorized_amounts_match_scalar_amounts():
+    amounts = np.array([0.1, 1.0, 2500.0, 10000.0])
+    from_prices = np.array([3000.0, 1.0, 0.5, 150.0])
+    to_prices = np.array([1.0, 3000.0, 2.0, 1.0])
+    slippages = np.array([0.5, 1.0, 0.1, 3.0])
+    fees = np.array([0.0, 0.001, 0.0, 0.05])
+    batch = compute_amounts(amounts, from_prices, to_prices, slippages, fees)
+    for i in range(len(amounts)):
+        single = compute_amounts(amounts[i], from_prices[i], to_prices[i], slippages[i], fees[i])
+        assert batch["to_amount"][i] == single["to_amount"]
+        assert batch["price_impact"][i] == single["price_impact"]
+
+
+def test_batch_quotes_match_single_quotes_and_report_per_item_errors(server):
+    client = TestClient(server.app)
+    requests = [
+        quote_request(),
+        quote_request(to_chain="ethereum", amount="2"),
+        quote_request(from_token="NOPE"),
+        quote_request(amount="lots"),
+    ]
+    quotes = client.post("/api/quotes/batch", json=requests).json()["quotes"]
+    for request, result in zip(requests[:2], quotes[:2]):
+        single = client.post("/api/quote", json=request).json()["quote"]
+        assert result["quote"]["to_amount"] == single["to_amount"]
+        assert result["quote"]["route"] == single["route"]
+    assert quotes[2] == {"error": "Token not found"}
+    assert quotes[3] == {"error": "Invalid amount: lots"}
+
+
+def test_batch_size_is_capped(server):
+    client = TestClient(server.app)
+    response = client.post("/api/quotes/batch", json=[quote_request()] * (server.MAX_BATCH_QUOTES + 1))
+    assert response.status_code == 400
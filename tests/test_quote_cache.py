@@ -0,0 +1,74 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from quote_cache import QuoteCache
+
+
+class Request:
+    def __init__(self, amount="1", from_token="ETH", to_token="USDC"):
+        self.from_chain = "ethereum"
+        self.to_chain = "solana"
+        self.from_token = from_token
+        self.to_token = to_token
+        self.amount = amount
+        self.slippage = 0.5
+
+
+def test_key_ignores_amount_and_slippage():
+    cache = QuoteCache()
+    small, large = Request("1"), Request("1000.0004")
+    large.slippage = 3.0
+    assert cache.make_key(small) == cache.make_key(large)
+    assert cache.make_key(small) != cache.make_key(Request(to_token="SOL"))
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = QuoteCache(max_size=2, ttl=60)
+    a, b, c = (cache.make_key(Request(to_token=symbol)) for symbol in ("USDC", "USDT", "SOL"))
+    cache.set(a, "a")
+    cache.set(b, "b")
+    assert cache.get(a) == "a"
+    cache.set(c, "c")
+    assert cache.get(b) is None
+    assert cache.get(a) == "a" and cache.get(c) == "c"
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = QuoteCache(ttl=5)
+    key = cache.make_key(Request())
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set(key, "quote")
+    monkeypatch.setattr(time, "monotonic", lambda: now + 5)
+    assert cache.get(key) is None
+    assert cache.expirations == 1
+
+
+def test_price_change_invalidates_only_quotes_using_the_token():
+    cache = QuoteCache(ttl=60)
+    eth = cache.make_key(Request(from_token="ETH"))
+    usdt = cache.make_key(Request(from_token="USDT", to_token="SOL"))
+    cache.set(eth, "eth")
+    cache.set(usdt, "usdt")
+    cache.invalidate_token("solana", "USDC", 1.0)
+    assert cache.get(eth) is None
+    assert cache.get(usdt) == "usdt"
+    assert len(cache) == 1
+
+
+def test_cached_plan_is_priced_for_the_requested_amount(server):
+    client = TestClient(server.app)
+    body = {"from_chain": "ethereum", "to_chain": "solana", "from_token": "ETH", "to_token": "USDC",
+            "slippage": 0.5, "user_address": "0xabc"}
+
+    client.post("/api/quote", json={**body, "amount": "1000"})
+    hits = server.quote_cache.hits
+    cached = client.post("/api/quote", json={**body, "amount": "1000.0004", "slippage": 1.0}).json()["quote"]
+    assert server.quote_cache.hits == hits + 1
+
+    server.quote_cache.clear()
+    fresh = client.post("/api/quote", json={**body, "amount": "1000.0004", "slippage": 1.0}).json()["quote"]
+    assert cached == fresh
+    assert cached["from_amount"] == "1000.0004" and cached["slippage"] == 1.0
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from response_cache import ResponseCache, dumps, etag_matches, make_etag
+
+
+def test_payload_is_built_once_per_version():
+    cache = ResponseCache()
+    data = {"n": 1}
+    calls = []
+
+    def build():
+        calls.append(dict(data))
+        return data
+
+    first = cache.get("key", 1, build)
+    data["n"] = 2
+    # Same version: the stale bytes are served without calling build
+    assert cache.get("key", 1, build) == first
+    second = cache.get("key", 2, build)
+    assert second[0] == b'{"n":2}' and second[1] != first[1]
+    assert calls == [{"n": 1}, {"n": 2}] and cache.builds == 2
+
+
+def test_invalidate_forces_a_rebuild_at_the_same_version():
+    cache = ResponseCache()
+    data = {"n": 1}
+    cache.get("key", 0, lambda: data)
+    data["n"] = 2
+    cache.invalidate("key")
+    cache.invalidate("missing")
+    assert cache.get("key", 0, lambda: data)[0] == b'{"n":2}'
+
+
+def test_keys_are_cached_independently():
+    cache = ResponseCache()
+    cache.get(("tokens", "ethereum"), 0, lambda: {"chain": "ethereum"})
+    body, _ = cache.get(("tokens", "solana"), 0, lambda: {"chain": "solana"})
+    assert body == b'{"chain":"solana"}' and cache.builds == 2
+
+
+def test_etag_is_strong_and_compared_weakly():
+    etag = make_etag(b"{}")
+    assert etag.startswith('"') and etag.endswith('"') and etag == make_etag(b"{}")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+
+def test_cached_bytes_equal_a_fresh_serialization(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    payload = {"chains": list(server.SUPPORTED_CHAINS.values())}
+    for _ in range(2):
+        response = client.get("/api/chains")
+        assert response.content == dumps(payload)
+    # The pre-encoded body is what FastAPI's own encoder would have produced
+    assert json.loads(response.content) == jsonable_encoder(payload)
+
+    chain_id = next(iter(server.SUPPORTED_CHAINS))
+    tokens = client.get(f"/api/tokens/{chain_id}").content
+    fresh = {"chain": chain_id, "tokens": [t.to_dict() for t in server.token_registry.tokens_for_chain(chain_id)]}
+    assert tokens == dumps(fresh)
+
+
+def test_etag_round_trip_returns_a_bodiless_304(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    first = client.get("/api/chains")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    again = client.get("/api/chains", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    assert again.headers["cache-control"] == first.headers["cache-control"]
+    assert client.get("/api/chains", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_cache_control_per_endpoint(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    assert client.get("/api/chains").headers["cache-control"] == \
+        "public, max-age=300, stale-while-revalidate=86400"
+    assert client.get("/api/tokens/ethereum").headers["cache-control"] == \
+        "public, max-age=60, stale-while-revalidate=600"
+    # Prices are fresh for one oracle poll interval
+    assert client.get("/api/prices").headers["cache-control"] == \
+        f"public, max-age={max(1, int(server.price_oracle.interval))}, stale-while-revalidate=30"
+
+
+def test_prices_etag_changes_when_the_oracle_publishes(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from price_oracle import PriceOracle, StaticPriceSource
+
+    source = StaticPriceSource()
+    monkeypatch.setattr(server, "price_oracle", PriceOracle(source))
+    monkeypatch.setattr(server, "response_cache", ResponseCache())
+    client = TestClient(server.app)
+
+    before = client.get("/api/prices")
+    etag = before.headers["etag"]
+    assert before.json()["version"] == 0
+    source.set_price("ethereum", "ETH", 3300.0)
+    asyncio.run(server.price_oracle.refresh())
+
+    after = client.get("/api/prices", headers={"If-None-Match": etag})
+    assert after.status_code == 200 and after.headers["etag"] != etag
+    assert after.json()["version"] == 1
+    assert after.json()["prices"]["ethereum"]["ETH"]["price"] == 3300.0
+    assert client.get("/api/prices", headers={"If-None-Match": after.headers["etag"]}).status_code == 304
@@ -0,0 +1,57 @@
+import random
+
+from routing import RouteGraph
+
+CHAINS = ["ethereum", "polygon", "arbitrum", "optimism", "solana", "bsc", "avalanche", "fantom"]
+
+
+def weights(graph, pair):
+    return [round(route.weight, 9) for route in graph.best_routes(*pair)]
+
+
+def rebuilt(graph):
+    """A graph with the same edges, computed from scratch."""
+    fresh = RouteGraph(k=graph.k)
+    for chain_id in CHAINS:
+        fresh.add_chain(chain_id)
+    for edges in graph._adj.values():
+        for edge in edges.values():
+            fresh.add_bridge(edge.from_chain, edge.to_chain, edge.bridge, edge.latency, edge.fee, edge.cost,
+                             bidirectional=False)
+    fresh.precompute()
+    return fresh
+
+
+def test_best_route_prefers_lowest_weight():
+    graph = RouteGraph.from_bridges(CHAINS)
+    route = graph.best_route("polygon", "arbitrum")
+    assert route.chains == ["polygon", "arbitrum"]
+    assert graph.best_route("ethereum", "ethereum") is None
+    assert len(graph.best_routes("bsc", "solana")) == graph.k
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = random.Random(7)
+    graph = RouteGraph.from_bridges(CHAINS)
+    keys = [key for edges in graph._adj.values() for key in edges]
+    for step in range(300):
+        from_chain, to_chain, bridge = rng.choice(keys)
+        if step % 25 == 24 and (from_chain, to_chain, bridge) in graph._adj[from_chain]:
+            graph.remove_edge(from_chain, to_chain, bridge)
+        elif (from_chain, to_chain, bridge) in graph._adj[from_chain]:
+            graph.update_edge(from_chain, to_chain, bridge, latency=rng.uniform(1, 90), fee=rng.choice([0.0005, 0.001, 0.002]))
+        else:
+            graph.add_bridge(from_chain, to_chain, bridge, rng.uniform(1, 90), 0.001, bidirectional=False)
+        if step % 20 == 19:
+            fresh = rebuilt(graph)
+            for pair in ((a, b) for a in CHAINS for b in CHAINS if a != b):
+                assert weights(graph, pair) == weights(fresh, pair), (step, pair)
+
+
+def test_new_chain_starts_without_routes():
+    graph = RouteGraph.from_bridges(CHAINS)
+    graph.add_chain("base")
+    assert graph.best_routes("base", "ethereum") == []
+    graph.add_bridge("base", "ethereum", "Across", 3, 0.001)
+    assert graph.best_route("base", "ethereum").chains == ["base", "ethereum"]
+    assert graph.best_route("base", "polygon").chains == ["base", "ethereum", "polygon"]
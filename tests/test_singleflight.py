@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "quote"
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do("eth->sol", compute) for _ in range(10)))
+        # Finished flights are forgotten, so a later call executes again
+        results.append(await flights.do("eth->sol", compute))
+        return results
+
+    assert asyncio.run(scenario()) == ["quote"] * 11
+    assert len(runs) == 2
+    assert flights.stats() == {"calls": 11, "executions": 2, "coalesced": 9, "in_flight": 0}
+
+
+def test_distinct_keys_run_separately():
+    flights = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(flights.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flights.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flights.executions == 2
+
+
+def test_exception_reaches_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("rpc down")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(e) for e in errors] == ["rpc down"] * 3
+    assert flights.executions == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_flight():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def scenario():
+        first = asyncio.create_task(flights.do("k", compute))
+        second = asyncio.create_task(flights.do("k", compute))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == 42
+    assert flights.executions == 1
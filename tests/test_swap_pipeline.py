@@ -0,0 +1,232 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from swap_pipeline import (
+    BRIDGING, COMPLETED, FAILED, PENDING, SUBMITTED, FakeSwapExecutor, SwapPipeline,
+)
+
+
+def transaction(tx_id, from_chain="ethereum", to_chain="solana", minutes_ago=0):
+    return {
+        "_id": tx_id, "id": tx_id, "status": PENDING, "from_chain": from_chain, "to_chain": to_chain,
+        "created_at": datetime.utcnow() - timedelta(minutes=minutes_ago), "lease_until": None,
+    }
+
+
+def pipeline_for(collection, executor, **kwargs):
+    kwargs = {"workers": 2, "poll_interval": 0.01, "lease": 5.0, **kwargs}
+    pipeline = SwapPipeline(lambda: collection, executor, **kwargs)
+    transitions = []
+
+    async def record(tx, previous):
+        transitions.append((tx["id"], previous, tx["status"]))
+
+    pipeline.add_listener(record)
+    return pipeline, transitions
+
+
+async def drain(pipeline, collection, timeout=5.0):
+    pipeline.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while await collection.count_documents({"status": {"$in": [PENDING, SUBMITTED, BRIDGING]}}):
+            assert asyncio.get_running_loop().time() < deadline, "pipeline did not drain"
+            await asyncio.sleep(0.01)
+    finally:
+        await pipeline.stop()
+
+
+def test_states_are_persisted_in_order():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_many([transaction("cross"), transaction("same", to_chain="ethereum", minutes_ago=1)])
+        pipeline, transitions = pipeline_for(collection, FakeSwapExecutor(step_delay=0))
+        await drain(pipeline, collection)
+        return pipeline, transitions, {doc["_id"]: doc async for doc in collection.find()}
+
+    pipeline, transitions, docs = asyncio.run(scenario())
+    assert [t for t in transitions if t[0] == "cross"] == [
+        ("cross", PENDING, SUBMITTED), ("cross", SUBMITTED, BRIDGING), ("cross", BRIDGING, COMPLETED),
+    ]
+    assert [t for t in transitions if t[0] == "same"] == [("same", PENDING, SUBMITTED), ("same", SUBMITTED, COMPLETED)]
+    assert docs["cross"]["tx_hash"].startswith("0x") and docs["cross"]["bridge_tx_hash"].startswith("0x")
+    assert "bridge_tx_hash" not in docs["same"]
+    for doc in docs.values():
+        assert doc["status"] == COMPLETED and doc["completed_at"] is not None
+        assert "lease_until" not in doc and "worker" not in doc and "lease" not in doc
+    assert pipeline.stats()["completed"] == 2 and pipeline.claimed == 2
+
+
+class FlakyExecutor(FakeSwapExecutor):
+    """Raises a transient error on the first ``failures`` submissions."""
+
+    def __init__(self, failures):
+        super().__init__(step_delay=0)
+        self.failures = failures
+        self.submissions = []
+
+    async def submit(self, tx):
+        self.submissions.append(datetime.utcnow())
+        if len(self.submissions) <= self.failures:
+            raise ConnectionError("rpc timeout")
+        return await super().submit(tx)
+
+
+def test_transient_errors_are_retried_after_a_backoff():
+    executor = FlakyExecutor(failures=2)
+
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx", to_chain="ethereum"))
+        pipeline, transitions = pipeline_for(collection, executor, retry_backoff=0.05, max_attempts=3)
+        await drain(pipeline, collection)
+        return pipeline, transitions, await collection.find_one({"_id": "tx"})
+
+    pipeline, transitions, doc = asyncio.run(scenario())
+    assert doc["status"] == COMPLETED
+    assert doc["attempts"] == 2 and doc["last_error"] == "rpc timeout"
+    assert pipeline.retries == 2
+    # Attempt n waits retry_backoff * n before any worker may claim it again
+    gaps = [(b - a).total_seconds() for a, b in zip(executor.submissions, executor.submissions[1:])]
+    assert gaps[0] >= 0.04 and gaps[1] >= 0.09
+    assert transitions == [("tx", PENDING, SUBMITTED), ("tx", SUBMITTED, COMPLETED)]
+
+
+def test_failures_are_terminal():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_many([transaction("reverted")])
+        pipeline, transitions = pipeline_for(collection, FakeSwapExecutor(step_delay=0, failure_rate=1.0))
+        await drain(pipeline, collection)
+
+        exhausted = AsyncMongoMockClient().db.transactions
+        await exhausted.insert_one(transaction("exhausted"))
+        retrying, _ = pipeline_for(exhausted, FlakyExecutor(failures=10), retry_backoff=0.01, max_attempts=2)
+        await drain(retrying, exhausted)
+        return (pipeline, transitions, await collection.find_one({"_id": "reverted"}),
+                await exhausted.find_one({"_id": "exhausted"}))
+
+    pipeline, transitions, reverted, exhausted = asyncio.run(scenario())
+    assert transitions == [("reverted", PENDING, FAILED)]
+    assert reverted["error"] == "Simulated transaction revert" and pipeline.failed == 1
+    assert exhausted["status"] == FAILED
+    assert exhausted["error"] == "submit failed after 2 attempts: rpc timeout"
+
+
+def test_worker_that_lost_its_lease_cannot_write():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx"))
+        first, first_transitions = pipeline_for(collection, FakeSwapExecutor(step_delay=0), lease=0.05)
+        second, _ = pipeline_for(collection, FakeSwapExecutor(step_delay=0), lease=5.0)
+
+        claimed = await first._claim()
+        assert await second._claim() is None  # lease still held
+        await asyncio.sleep(0.06)
+        taken = await second._claim()
+        assert taken["worker"] == second.worker_id
+
+        assert not await first._transition(claimed, SUBMITTED, {"tx_hash": "0xstale"})
+        await first._fail(claimed, "stale worker")
+        return first, first_transitions, await collection.find_one({"_id": "tx"})
+
+    first, transitions, doc = asyncio.run(scenario())
+    assert doc["status"] == PENDING and "tx_hash" not in doc and "error" not in doc
+    assert first.lost_leases == 2 and first.failed == 0
+    assert transitions == []
+
+
+class SlowExecutor(FakeSwapExecutor):
+    def __init__(self, step_delay):
+        super().__init__(step_delay=step_delay)
+        self.cancelled = False
+
+    async def submit(self, tx):
+        try:
+            return await super().submit(tx)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_heartbeat_keeps_the_lease_during_a_long_step():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx", to_chain="ethereum"))
+        pipeline, _ = pipeline_for(collection, SlowExecutor(step_delay=0.3), lease=0.1, workers=1)
+        other, _ = pipeline_for(collection, FakeSwapExecutor(step_delay=0))
+        pipeline.start()
+        try:
+            await asyncio.sleep(0.2)  # twice the lease, mid-step
+            stolen = await other._claim()
+        finally:
+            await pipeline.stop()
+        return stolen, pipeline
+
+    stolen, pipeline = asyncio.run(scenario())
+    assert stolen is None
+    assert pipeline.lost_leases == 0
+
+
+def test_step_is_cancelled_when_the_lease_is_taken_over():
+    executor = SlowExecutor(step_delay=5.0)
+
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx"))
+        pipeline, transitions = pipeline_for(collection, executor, lease=0.09, workers=1)
+        claimed = await pipeline._claim()
+        processing = asyncio.create_task(pipeline._process(claimed))
+        await asyncio.sleep(0.01)
+        await collection.update_one({"_id": "tx"}, {"$set": {"lease": "other"}})
+        await asyncio.wait_for(processing, timeout=1.0)
+        return pipeline, transitions, await collection.find_one({"_id": "tx"})
+
+    pipeline, transitions, doc = asyncio.run(scenario())
+    assert executor.cancelled
+    assert pipeline.lost_leases == 1
+    assert transitions == [] and doc["status"] == PENDING and doc["lease"] == "other"
+
+
+
+def test_sibling_coroutine_reclaiming_the_transaction_fences_the_first_claim():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx"))
+        pipeline, transitions = pipeline_for(collection, FakeSwapExecutor(step_delay=0), lease=0.05)
+
+        stale = await pipeline._claim()
+        await asyncio.sleep(0.06)
+        # Same process, same worker_id: only the lease token tells the two claims apart
+        current = await pipeline._claim()
+        assert current["worker"] == stale["worker"] and current["lease"] != stale["lease"]
+
+        assert not await pipeline._renew(stale)
+        assert not await pipeline._transition(stale, SUBMITTED, {"tx_hash": "0xstale"})
+        assert await pipeline._transition(current, SUBMITTED, {"tx_hash": "0xcurrent"})
+        return pipeline, transitions, await collection.find_one({"_id": "tx"})
+
+    pipeline, transitions, doc = asyncio.run(scenario())
+    assert doc["status"] == SUBMITTED and doc["tx_hash"] == "0xcurrent"
+    assert transitions == [("tx", PENDING, SUBMITTED)]
+    assert pipeline.lost_leases == 1
+
+
+def test_retry_after_a_lost_lease_is_not_recorded():
+    executor = FlakyExecutor(failures=1)
+
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one(transaction("tx"))
+        pipeline, _ = pipeline_for(collection, executor, lease=5.0)
+        claimed = await pipeline._claim()
+        await collection.update_one({"_id": "tx"}, {"$set": {"lease": "other"}})
+        await pipeline._process(claimed)
+        return pipeline, await collection.find_one({"_id": "tx"})
+
+    pipeline, doc = asyncio.run(scenario())
+    assert len(executor.submissions) == 1
+    assert "attempts" not in doc and "last_error" not in doc
+    assert pipeline.retries == 0 and pipeline.lost_leases == 1
@@ -0,0 +1,48 @@
+from token_registry import TokenRecord, TokenRegistry
+
+
+def make(symbol, address, chain_id="ethereum", price_usd=None):
+    return TokenRecord(symbol, symbol, address, 18, chain_id, price_usd=price_usd)
+
+
+def test_lookup_by_symbol_and_case_insensitive_evm_address():
+    registry = TokenRegistry()
+    token = registry.add(make("USDC", "0xAbC"))
+    assert registry.get_by_symbol("ethereum", "USDC") is token
+    assert registry.get_by_address("ethereum", "0xabc") is token
+    assert registry.tokens_for_chain("ethereum") == [token]
+
+
+def test_first_token_keeps_symbol_slot():
+    registry = TokenRegistry()
+    first = registry.add(make("USDC", "0x1"))
+    registry.add(make("USDC", "0x2"))
+    assert registry.get_by_symbol("ethereum", "USDC") is first
+    assert len(registry) == 2
+
+
+def test_readding_with_new_symbol_moves_symbol_index():
+    registry = TokenRegistry()
+    token = registry.add(make("OLD", "0x1"))
+    registry.add(make("NEW", "0x1"))
+    assert registry.get_by_symbol("ethereum", "NEW") is token
+    assert registry.get_by_symbol("ethereum", "OLD") is None
+    assert len(registry) == 1
+
+
+def test_renamed_token_hands_symbol_to_next_holder():
+    registry = TokenRegistry()
+    registry.add(make("USDC", "0x1"))
+    second = registry.add(make("USDC", "0x2"))
+    registry.add(make("USDC.e", "0x1"))
+    assert registry.get_by_symbol("ethereum", "USDC") is second
+
+
+def test_update_price_notifies_listeners_only_on_change():
+    registry = TokenRegistry()
+    registry.add(make("ETH", "0x0", price_usd=1.0))
+    seen = []
+    registry.add_price_listener(lambda chain_id, symbol, price: seen.append((chain_id, symbol, price)))
+    assert registry.update_price("ethereum", "ETH", 2.0)
+    assert not registry.update_price("ethereum", "ETH", 2.0)
+    assert seen == [("ethereum", "ETH", 2.0)]
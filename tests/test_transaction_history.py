@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from transaction_history import InvalidCursor, decode_cursor, format_datetime, history_pipeline, paginate
+
+
+async def seed(collection, count, user_address="0xabc"):
+    start = datetime(2024, 1, 1)
+    # Pairs of equal timestamps exercise the _id tie-break; sub-second steps the cursor's precision
+    await collection.insert_many([
+        {"id": f"tx{i}", "user_address": user_address, "status": "completed",
+         "created_at": start + timedelta(milliseconds=250 * (i // 2)), "completed_at": None}
+        for i in range(count)
+    ])
+
+
+async def read_all_pages(collection, user_address, limit):
+    pages, before = [], None
+    while True:
+        rows = await collection.aggregate(history_pipeline(user_address, before, limit)).to_list(limit + 1)
+        page, before = paginate(rows, limit)
+        pages.append(page)
+        if before is None:
+            return pages
+
+
+def test_keyset_pages_cover_history_newest_first_without_gaps():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await seed(collection, 23)
+        await seed(collection, 5, user_address="0xother")
+        pages = await read_all_pages(collection, "0xabc", 5)
+        ids = [row["id"] for page in pages for row in page]
+        assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+        assert sorted(ids) == sorted(f"tx{i}" for i in range(23))
+        created = [row["created_at"] for page in pages for row in page]
+        assert created == sorted(created, reverse=True)
+        assert all(isinstance(row["_id"], str) and row["completed_at"] is None for page in pages for row in page)
+        assert created[-3:] == ["2024-01-01T00:00:00.250", "2024-01-01T00:00:00.000", "2024-01-01T00:00:00.000"]
+
+    asyncio.run(scenario())
+
+
+def test_cursor_carries_the_stored_datetime_to_the_millisecond():
+    rows = [
+        {"_id": "65a000000000000000000002", "created_at": datetime(2024, 5, 6, 7, 8, 9, 123000)},
+        {"_id": "65a000000000000000000001", "created_at": datetime(2024, 5, 6, 7, 8, 9, 122000)},
+    ]
+    page, cursor = paginate(rows, 1)
+    assert page[0]["created_at"] == "2024-05-06T07:08:09.123" and page[0]["completed_at"] is None
+    created_at, object_id = decode_cursor(cursor)
+    assert created_at == datetime(2024, 5, 6, 7, 8, 9, 123000)
+    assert str(object_id) == "65a000000000000000000002"
+
+
+def test_failed_transactions_include_their_error():
+    async def scenario():
+        collection = AsyncMongoMockClient().db.transactions
+        await collection.insert_one({"id": "tx0", "user_address": "0xabc", "status": "failed",
+                                     "error": "bridge timeout", "created_at": datetime(2024, 1, 1)})
+        rows = await collection.aggregate(history_pipeline("0xabc", None, 10)).to_list(11)
+        return paginate(rows, 10)
+
+    [row], cursor = asyncio.run(scenario())
+    assert row["error"] == "bridge timeout" and cursor is None
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(InvalidCursor):
+        history_pipeline("0xabc", "bm9waXBl", 10)
+
+
+def test_export_streams_orjson_lines_with_listing_date_format(server):
+    from fastapi.testclient import TestClient
+    import orjson
+
+    asyncio.run(seed(server.db.transactions, 7))
+    client = TestClient(server.app)
+    listing = client.get("/api/transactions/0xabc", params={"limit": 50}).json()["transactions"]
+    response = client.get("/api/transactions/0xabc/export")
+    exported = [orjson.loads(line) for line in response.content.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [row["id"] for row in exported] == [f"tx{i}" for i in range(7)]
+    by_id = {row["id"]: row["created_at"] for row in listing}
+    assert all(row["created_at"] == by_id[row["id"]] for row in exported)
+    csv_rows = client.get("/api/transactions/0xabc/export", params={"format": "csv"}).text.splitlines()
+    assert len(csv_rows) == 8 and csv_rows[0].startswith("id,user_address")
+
+
+def test_format_datetime_renders_milliseconds():
+    assert format_datetime(datetime(2024, 5, 6, 7, 8, 9, 123456)) == "2024-05-06T07:08:09.123"
+    assert format_datetime(datetime(2024, 5, 6, 7, 8, 9)) == "2024-05-06T07:08:09.000"
+
+
+def test_export_filename_is_sanitized(server):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(server.app)
+    response = client.get("/api/transactions/%E2%9C%93%22%3B%20x/export")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"transactions-x.ndjson\"; "
+        "filename*=UTF-8''transactions-%E2%9C%93%22%3B%20x.ndjson"
+    )
+    plain = client.get("/api/transactions/0xAbC/export", params={"format": "csv"})
+    assert plain.headers["content-disposition"].startswith('attachment; filename="transactions-0xAbC.csv"')
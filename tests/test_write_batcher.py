@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from write_batcher import BatcherStopped, InsertBatcher
+
+
+class RecordingCollection:
+    """Wraps a mongomock collection and records each insert_many batch size."""
+
+    def __init__(self):
+        self.collection = AsyncMongoMockClient().db.transactions
+        self.batches = []
+        self.block = None
+
+    async def insert_many(self, documents, ordered=True):
+        self.batches.append(len(documents))
+        if self.block is not None:
+            await self.block.wait()
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+def test_concurrent_inserts_resolve_with_ids_in_configured_batches():
+    async def scenario():
+        target = RecordingCollection()
+        batcher = InsertBatcher(lambda: target, max_batch=4, max_delay=0.05)
+        batcher.start()
+        ids = await asyncio.gather(*[batcher.insert({"n": i}) for i in range(10)])
+        await batcher.stop()
+        assert target.batches == [4, 4, 2]
+        stored = {doc["_id"]: doc["n"] for doc in await target.collection.find({}).to_list(None)}
+        assert [stored[_id] for _id in ids] == list(range(10))
+        assert batcher.stats()["documents_written"] == 10
+
+    asyncio.run(scenario())
+
+
+def test_stop_during_write_fails_in_flight_callers_and_drains_queue():
+    async def scenario():
+        target = RecordingCollection()
+        target.block = asyncio.Event()
+        batcher = InsertBatcher(lambda: target, max_batch=2, max_delay=0.001)
+        batcher.start()
+        in_flight = [asyncio.ensure_future(batcher.insert({"n": i})) for i in range(2)]
+        await asyncio.sleep(0.01)  # first batch is now blocked inside insert_many
+        queued = [asyncio.ensure_future(batcher.insert({"n": i})) for i in range(2, 5)]
+        target.block = None
+        await asyncio.wait_for(batcher.stop(), 1)
+        for future in in_flight:
+            with pytest.raises(BatcherStopped):
+                await future
+        assert len(await asyncio.gather(*queued)) == 3
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_outside_stop_fails_queued_callers():
+    async def scenario():
+        target = RecordingCollection()
+        target.block = asyncio.Event()
+        batcher = InsertBatcher(lambda: target, max_batch=1, max_delay=0.001)
+        batcher.start()
+        futures = [asyncio.ensure_future(batcher.insert({"n": i})) for i in range(3)]
+        await asyncio.sleep(0.01)
+        batcher._task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), 1)
+        assert all(isinstance(result, BatcherStopped) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_write_through_when_not_started():
+    async def scenario():
+        target = AsyncMongoMockClient().db.transactions
+        batcher = InsertBatcher(lambda: target)
+        inserted_id = await batcher.insert({"n": 1})
+        assert (await target.find_one({"_id": inserted_id}))["n"] == 1
+
+    asyncio.run(scenario())